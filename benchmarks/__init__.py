@@ -0,0 +1,3 @@
+"""
+Benchmarks for SBX (not part of the installed package)
+"""
@@ -0,0 +1,123 @@
+"""
+Synthetic deck generator
+
+Usage: `python -m benchmarks.deckgen PATH COUNT`
+"""
+import json
+import os
+import random
+import sys
+from typing import List
+
+from sbx.core.card import PAST_STAT_COUNT
+from sbx.core.utility import DAY_IN_SECONDS, unix_time
+
+CARDS_PER_DIRECTORY = 200
+TOPICS = 20
+WORDS = (
+    "array list map set queue stack heap tree graph node edge key value "
+    "hash sort search index pointer memory cache thread lock process "
+    "function class method object type module package loop branch"
+).split()
+LANGUAGES = ["python", "c", "java", "bash", "javascript", ""]
+
+
+def _sentence(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words))
+
+
+def _header(rnd: random.Random, now: int) -> dict:
+    reps = rnd.choice([0, 0, 1, 2, 3, 5, 8, 13, 21, 30])
+    if reps == 0:
+        return {
+            "reps": 0,
+            "last": -1,
+            "next": -1,
+            "pastq": "",
+            "algo": "sm2",
+            "sbx": "v1",
+        }
+    past = [rnd.choice([0, 1, 2, 3, 3, 4, 4, 4, 5, 5]) for _ in range(reps)]
+    repetitions = 0
+    for quality in past:
+        repetitions = 0 if quality < 3 else repetitions + 1
+    easiness = round(rnd.uniform(1.3, 2.8), 6)
+    interval = 1 if repetitions <= 1 else 6
+    if repetitions > 2:
+        interval = round(min(6 * easiness ** (repetitions - 2), 3650), 6)
+    # WHY: Most cards should be scheduled in future, like a maintained deck
+    days_ago = rnd.randint(0, int(interval * 1.2) + 1)
+    last = now - days_ago * DAY_IN_SECONDS - rnd.randint(0, 86399)
+    return {
+        "a": repetitions,
+        "b": interval,
+        "c": easiness,
+        "reps": reps,
+        "last": last,
+        "next": last + int(interval) * DAY_IN_SECONDS,
+        "pastq": "".join(str(x) for x in past[-PAST_STAT_COUNT:]),
+        "algo": "sm2",
+        "sbx": "v1",
+    }
+
+
+def _body(rnd: random.Random) -> List[str]:
+    lines = ["<!-- [[FRONT]] -->", "# " + _sentence(rnd, rnd.randint(3, 12))]
+    lines.append("<!-- [[BACK]] -->")
+    for _ in range(rnd.randint(1, 6)):
+        lines.append("* " + _sentence(rnd, rnd.randint(3, 15)))
+    # WHY: About a third of real cards have a code block, some big ones
+    if rnd.random() < 0.3:
+        lines.append("```" + rnd.choice(LANGUAGES))
+        for _ in range(int(rnd.lognormvariate(2, 1)) + 1):
+            lines.append("    " + _sentence(rnd, rnd.randint(2, 8)))
+        lines.append("```")
+    return lines
+
+
+def card_path(root: str, number: int) -> str:
+    """
+    Get path of a generated card
+
+    * `root` - root directory of the deck
+    * `number` - number of the card
+    """
+    directory = number // CARDS_PER_DIRECTORY
+    return os.path.join(
+        root,
+        "topic-{:02d}".format(directory % TOPICS),
+        "part-{:04d}".format(directory),
+        "card-{:07d}.md".format(number),
+    )
+
+
+def generate_deck(root: str, count: int, seed: int = 0) -> List[str]:
+    """
+    Write a deck of synthetic cards
+
+    * `root` - directory to write cards to
+    * `count` - number of cards
+    * `seed` - random seed (same seed creates same deck)
+
+    Returns paths of created cards.
+    """
+    rnd = random.Random(seed)
+    now = unix_time()
+    paths = []
+    for number in range(count):
+        path = card_path(root, number)
+        if number % CARDS_PER_DIRECTORY == 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        lines = ["<!-- | " + json.dumps(_header(rnd, now)) + " | -->"]
+        lines.extend(_body(rnd))
+        with open(path, "w", encoding="utf-8") as h:
+            h.write("\n".join(lines) + "\n")
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.strip())
+        sys.exit(-1)
+    generate_deck(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,240 @@
+"""
+End-to-end benchmarks, results are written as JSON
+
+Usage: `python -m benchmarks.run [--sizes 1000,10000] [--output FILE]`
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from typing import Callable, List
+
+from benchmarks.deckgen import generate_deck
+from sbx.cli import run
+from sbx.core.card import (
+    ALGO_SM2,
+    ALGO_SM2_PLUS,
+    ALGO_SM4,
+    ALGORITHMS,
+    Card,
+    CardAlgo,
+    CardMeta,
+    mark_batch,
+    read_header,
+)
+from sbx.core.columns import MetaColumns
+from sbx.core.index import INDEX_FILE_NAME
+from sbx.core.study import CardStack
+
+DEFAULT_SIZES = [1000, 10000]
+SAVE_COUNT = 200
+MARK_COUNT = 10000
+DEVNULL = open(os.devnull, "w")
+
+
+def _best_of(repeat: int, fnc: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fnc()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _drop_index(path: str):
+    try:
+        os.remove(os.path.join(path, INDEX_FILE_NAME))
+    except OSError:
+        pass
+
+
+def _list_cards(path: str, *options: str):
+    # WHY: prompt_toolkit keeps using the first stdout it sees
+    with redirect_stdout(DEVNULL):
+        run(["list", "-r"] + list(options) + [path])
+
+
+def _stats(path: str):
+    with redirect_stdout(DEVNULL):
+        run(["stats", "-r", path])
+
+
+def _cli_startup(path: str):
+    subprocess.run(
+        [sys.executable, "-m", "sbx", "list", "-n", path],
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+
+
+def _study_startup(path: str):
+    from prompt_toolkit.application import create_app_session
+    from prompt_toolkit.input import create_pipe_input
+    from prompt_toolkit.output import DummyOutput
+
+    from sbx.ui.study import StudyInterface
+
+    with create_pipe_input() as pipe_input:
+        with create_app_session(input=pipe_input, output=DummyOutput()):
+            StudyInterface(CardStack(path, True, True))
+
+
+def _save_cards(paths: List[str]):
+    for path in paths:
+        card = Card(path)
+        card.mark(4)
+        card.save()
+
+
+def _mark_metas(
+    algorithm: CardAlgo, metas: List[CardMeta], qualities: List[int]
+):
+    for meta, quality in zip(metas, qualities):
+        algorithm.mark(meta, quality)
+
+
+def _mark_mixed(metas: List[CardMeta], qualities: List[int]):
+    columns = MetaColumns.from_metas(metas)
+    mark_batch(columns, qualities)
+
+
+def bench_size(count: int, repeat: int) -> List[dict]:
+    """
+    Run all benchmarks on a generated deck
+
+    * `count` - number of cards in the deck
+    * `repeat` - number of times each benchmark is repeated (best is kept)
+    """
+    results = []
+
+    def record(name: str, fnc: Callable[[], object], times: int = repeat):
+        seconds = _best_of(times, fnc)
+        results.append(
+            {"name": name, "cards": count, "seconds": round(seconds, 6)}
+        )
+        print(
+            "{:>8} cards  {:<28} {:>10.4f}s".format(count, name, seconds),
+            file=sys.stderr,
+        )
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = generate_deck(root, count)
+
+        record("read_header_all", lambda: [read_header(x) for x in paths])
+
+        def scan(**kwargs):
+            return list(CardStack(root, True, **kwargs).iter())
+
+        record(
+            "stack_iter_all_no_index",
+            lambda: scan(include_unscheduled=True, use_index=False),
+        )
+        record("stack_iter_due_no_index", lambda: scan(use_index=False))
+        _drop_index(root)
+        record("stack_iter_build_index", lambda: scan(), times=1)
+        record("stack_iter_all_index", lambda: scan(include_unscheduled=True))
+        record("stack_iter_due_index", lambda: scan())
+        record(
+            "stack_iter_leech_index",
+            lambda: scan(include_unscheduled=True, filter_to_leech=True),
+        )
+        record("list_names", lambda: _list_cards(root, "-ni"))
+        record("list_plain", lambda: _list_cards(root, "-i", "--no-color"))
+        record("list_pretty", lambda: _list_cards(root, "-i"))
+        for output_format in ["jsonl", "tsv", "null"]:
+            record(
+                "list_" + output_format,
+                lambda: _list_cards(root, "-i", "--format", output_format),
+            )
+        record("stats", lambda: _stats(root))
+        # Process startup only, cards are not in top directory of the deck
+        record("cli_startup_list_names", lambda: _cli_startup(root))
+        record("study_startup", lambda: _study_startup(root), times=1)
+
+        sample = random.Random(0).sample(paths, min(SAVE_COUNT, count))
+        record(
+            "card_save_x{}".format(len(sample)), lambda: _save_cards(sample)
+        )
+
+    generator = random.Random(1)
+    qualities = [generator.randint(0, 5) for _ in range(MARK_COUNT)]
+    # WHY: Same cards marked one at a time & in one batch, columns are
+    #    created before timing (as a scan gives them already)
+    for name, algorithm in ALGORITHMS.items():
+        metas = [CardMeta() for _ in range(MARK_COUNT)]
+        for meta in metas:
+            meta.algo = name
+        columns = MetaColumns.from_metas(metas)
+        record(
+            "{}_mark_x{}".format(name, MARK_COUNT),
+            lambda: _mark_metas(algorithm, metas, qualities),
+        )
+        record(
+            "{}_mark_batch_x{}".format(name, MARK_COUNT),
+            lambda: algorithm.mark_batch(columns, qualities),
+        )
+    # WHY: A third of the cards for each algorithm, so every algorithm
+    #    makes a pass over the columns
+    mixed = [CardMeta() for _ in range(MARK_COUNT)]
+    for number, meta in enumerate(mixed):
+        meta.algo = [ALGO_SM2, ALGO_SM2_PLUS, ALGO_SM4][number % 3]
+    record(
+        "mixed_mark_batch_x{}".format(MARK_COUNT),
+        lambda: _mark_mixed(mixed, qualities),
+    )
+    return results
+
+
+def _version() -> str:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+
+        return version("sbx")
+    except (ImportError, PackageNotFoundError):
+        return "unknown"
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda x: [int(y) for y in x.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated deck sizes (default: 1000,10000),"
+        " use 1000,10000,100000 for a full run",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="repeat each benchmark"
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="write JSON to this file"
+    )
+    args = parser.parse_args()
+
+    results = []
+    for count in args.sizes:
+        results.extend(bench_size(count, args.repeat))
+    report = {
+        "sbx": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": int(time.time()),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as h:
+            h.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
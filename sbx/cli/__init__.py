@@ -2,33 +2,78 @@
 SBX Command line interface functionality
 """
 
+import json
+import math
 import os
+import signal
 import sys
 import typing
-from argparse import ArgumentParser, Namespace
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
 from pathlib import Path
 
-from sbx.core.card import Card
-from sbx.core.study import CardStack
+from sbx.core.card import ALGORITHMS, DEFAULT_ALGO, Card
+from sbx.core.daemon import (
+    DeckServer,
+    RemoteCardStack,
+    connect,
+    is_supported,
+    socket_path,
+)
+from sbx.core.forecast import forecast, parse_date
+from sbx.core.importer import (
+    SOURCE_FORMATS,
+    InvalidSource,
+    import_cards,
+    read_source,
+    set_content,
+    source_format,
+)
+from sbx.core.metrics import METRICS
+from sbx.core.pack import InvalidPack, export_deck, import_pack
+from sbx.core.query import FIELDS, ORDERS, InvalidExpression, Where
+from sbx.core.render import (
+    FORMAT_PLAIN,
+    FORMAT_PRETTY,
+    FORMATS,
+    STREAM_FORMATS,
+    CardRenderer,
+)
+from sbx.core.reviewlog import LOG_DIRECTORY_NAME, InvalidReviewLog, ReviewLog
+from sbx.core.stats import MATURE_INTERVAL, DeckStats, Histogram, deck_stats
+from sbx.core.storage import (
+    SQLITE_FILE_NAME,
+    STORAGES,
+    MetaStorage,
+    StorageError,
+    find_root,
+    open_storage,
+)
+from sbx.core.study import EXECUTOR_THREAD, EXECUTORS, CardStack
+from sbx.core.trace import STDERR, TRACE_ENV, tracer_from_settings
 from sbx.core.utility import Unbuffered
-from sbx.ui.editor import EditorInterface
-from sbx.ui.study import StudyInterface
+from sbx.core.walk import DEFAULT_EXCLUDES, PathFilter, walk_cards
+
+FORECAST_BAR_MAX = 50
+STATS_BAR_MAX = 40
+DEFAULT_IMPORT_JOBS = 4
+# Paths of skipped cards printed, only the count is given for the rest
+MAX_SKIPPED_SHOWN = 10
+# Source name of standard input
+STDIN = "-"
 
 
 def editor(args: Namespace):
     """Edit file command"""
-    EditorInterface(Card(args.file)).run()
-
+    # WHY: UI (prompt_toolkit & Pygments) is slow to import,
+    #    only load it for commands that need it
+    from sbx.ui.editor import EditorInterface
 
-def _set_content(card: Card, content: typing.List[str], style: bool):
-    title_prefix = ""
-    answer_prefix = ""
-    if style:
-        title_prefix = "# "
-        answer_prefix = "* "
-    card.front = title_prefix + content[0]
-    if len(content) > 1:
-        card.back = os.linesep.join([answer_prefix + x for x in content[1:]])
+    storage = _card_storage(args.file)
+    try:
+        EditorInterface(Card(args.file, storage=storage)).run()
+    finally:
+        if storage is not None:
+            storage.close()
 
 
 def create(args: Namespace):
@@ -38,65 +83,471 @@ def create(args: Namespace):
     if path.is_file() or path.exists():
         print("File {!r} already exists!".format(str(path)))
         sys.exit(-1)
-    card = Card(str(path))
-    card.front = "Enter front of the card here ..."
-    card.back = "Enter back of the card here..."
-    if content:
-        _set_content(card, content, args.markdown)
-    card.save()
+    storage = _card_storage(str(path))
+    try:
+        card = Card(str(path), storage=storage)
+        # WHY: Storage may still have a header of a removed card
+        card.reset(args.algorithm)
+        card.front = "Enter front of the card here ..."
+        card.back = "Enter back of the card here..."
+        if content:
+            set_content(card, content, args.markdown)
+        card.save()
+    finally:
+        if storage is not None:
+            storage.close()
     print("File written to {!r}".format(str(path)))
 
 
+def import_(args: Namespace):
+    """Import cards command"""
+    stream: typing.TextIO = sys.stdin
+    try:
+        format_ = args.format or source_format(args.source)
+        if args.source != STDIN:
+            stream = open(args.source, "r", encoding="utf-8", newline="")
+        try:
+            rows = read_source(
+                stream, format_, args.front, args.back, args.header
+            )
+            storage = _card_storage(os.path.join(args.directory, ""))
+            try:
+                result = import_cards(
+                    rows,
+                    args.directory,
+                    args.markdown,
+                    args.jobs,
+                    args.algorithm,
+                    storage,
+                )
+            finally:
+                if storage is not None:
+                    storage.close()
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    except (OSError, InvalidSource) as ex:
+        print(str(ex))
+        sys.exit(-1)
+    print(
+        "Imported {} cards to {!r} ({} duplicates & {} invalid rows"
+        " skipped)".format(
+            len(result.created),
+            args.directory,
+            result.duplicates,
+            result.invalid,
+        )
+    )
+    for path, error in result.failed:
+        print("Cannot write {!r} - {}".format(path, error))
+    if result.failed:
+        sys.exit(-1)
+
+
+def export(args: Namespace):
+    """Export deck command"""
+    stack = CardStack(
+        args.path,
+        args.rec,
+        include_unscheduled=True,
+        use_index=not args.no_index,
+        jobs=args.jobs,
+        executor=args.executor,
+        exclude=args.exclude,
+        include=args.include,
+        storage=_storage(args),
+    )
+    try:
+        result = export_deck(stack.iter(), args.path, args.output)
+    except OSError as ex:
+        print(str(ex), file=sys.stderr)
+        sys.exit(-1)
+    # WHY: Pack may be written to standard output
+    print(
+        "Exported {} cards to {!r} ({} unreadable cards skipped)".format(
+            result.cards, args.output, result.skipped
+        ),
+        file=sys.stderr,
+    )
+
+
+def import_pack_(args: Namespace):
+    """Import pack command"""
+    try:
+        storage = _card_storage(os.path.join(args.path, ""))
+        try:
+            result = import_pack(args.pack, args.path, args.force, storage)
+        finally:
+            if storage is not None:
+                storage.close()
+    except (OSError, InvalidPack) as ex:
+        print(str(ex))
+        sys.exit(-1)
+    print(
+        "Restored {} cards to {!r} ({} existing cards skipped)".format(
+            result.cards, args.path, result.skipped
+        )
+    )
+    for path in result.invalid:
+        print(
+            "Existing card {!r} cannot be read, not overwritten".format(path)
+        )
+
+
 def reset(args: Namespace):
     """Reset file command"""
     path = Path(os.path.abspath(args.file))
     if not (path.is_file() and path.exists()):
         print("File {!r} doesn't exist".format(str(path)))
         sys.exit(-1)
-    card = Card(str(path))
-    card.reset()
-    card.save()
+    storage = _card_storage(str(path))
+    try:
+        card = Card(str(path), storage=storage)
+        card.reset(args.algorithm)
+        card.save()
+    finally:
+        if storage is not None:
+            storage.close()
     print("File written to {!r}".format(str(path)))
 
 
+def _storage(args: Namespace) -> typing.Optional[MetaStorage]:
+    # WHY: A directory inside a deck uses the storage of the whole deck
+    return _open_storage(find_root(args.path), getattr(args, "storage", None))
+
+
+def _open_storage(
+    root: str, storage: typing.Optional[str] = None
+) -> typing.Optional[MetaStorage]:
+    try:
+        return open_storage(root, storage)
+    except StorageError as ex:
+        print("Cannot open storage of {!r} - {}".format(root, ex))
+        sys.exit(-1)
+
+
+def _card_storage(path: str) -> typing.Optional[MetaStorage]:
+    # WHY: Commands on a single card are not given the deck root, storage
+    #    of the deck it is in is found from the card
+    return _open_storage(find_root(os.path.dirname(os.path.abspath(path))))
+
+
+def _card_stack(
+    args: Namespace, review_log: typing.Optional[ReviewLog] = None
+):
+    storage = _storage(args)
+    # WHY: A running `sbx serve` has every header in memory already
+    if not (
+        storage is not None
+        or args.no_daemon
+        or args.exclude
+        or args.include
+        or getattr(args, "watch", False)
+    ):
+        client = connect(args.path)
+        if client is not None:
+            return RemoteCardStack(
+                client,
+                args.path,
+                args.rec,
+                args.all,
+                args.leech,
+                args.zero,
+                where=args.where,
+                order=args.order,
+                limit=args.limit,
+                review_log=review_log,
+            )
+    return CardStack(
+        args.path,
+        args.rec,
+        args.all,
+        args.leech,
+        args.zero,
+        use_index=not args.no_index,
+        jobs=args.jobs,
+        executor=args.executor,
+        exclude=args.exclude,
+        include=args.include,
+        where=args.where,
+        order=args.order,
+        limit=args.limit,
+        storage=storage,
+        review_log=review_log,
+    )
+
+
+def _review_log(args: Namespace) -> typing.Optional[ReviewLog]:
+    # WHY: Log is opt-in, but once started it is kept complete
+    if args.no_log:
+        return None
+    if args.log or os.path.isdir(os.path.join(args.path, LOG_DIRECTORY_NAME)):
+        return ReviewLog(args.path)
+    return None
+
+
+def _report_skipped(skipped: typing.List[str]):
+    if not skipped:
+        return
+    print(
+        "Skipped {} card(s) with an invalid header or an unknown"
+        " algorithm:".format(len(skipped)),
+        file=sys.stderr,
+    )
+    for path in skipped[:MAX_SKIPPED_SHOWN]:
+        print("  " + path, file=sys.stderr)
+    if len(skipped) > MAX_SKIPPED_SHOWN:
+        print("  ...", file=sys.stderr)
+
+
 def study(args: Namespace):
     """Study cards command"""
-    StudyInterface(
-        CardStack(args.path, args.rec, args.all, args.leech, args.zero)
-    ).run()
+    from sbx.ui.study import StudyInterface
+
+    review_log = _review_log(args)
+    stk = _card_stack(args, review_log)
+    try:
+        StudyInterface(
+            stk,
+            streaming=args.stream,
+            write_behind=args.write_behind,
+        ).run()
+    finally:
+        if review_log is not None:
+            review_log.close()
+    _report_skipped(stk.skipped)
+
+
+def compact_log(args: Namespace):
+    """Compact review log command"""
+    review_log = ReviewLog(args.path)
+    keep = None
+    if args.prune:
+        keep = walk_cards(args.path, True, PathFilter(DEFAULT_EXCLUDES))
+    try:
+        result = review_log.compact(keep)
+    except (OSError, InvalidReviewLog) as ex:
+        print(str(ex))
+        sys.exit(-1)
+    if not result.segments:
+        print("Nothing to compact in {!r}".format(review_log.directory))
+        return
+    print(
+        "Compacted {} segments of {!r} ({} reviews kept, {} reviews of"
+        " removed cards dropped)".format(
+            result.segments,
+            review_log.directory,
+            result.reviews,
+            result.dropped,
+        )
+    )
+
+
+def forecast_cards(args: Namespace):
+    """Forecast command"""
+    result = forecast(_card_stack(args).to_columns(), args.days, args.as_of)
+    width = len(str(max(result.due)))
+    row = "{:<14} : {}"
+    print(row.format("Never studied", result.never_studied))
+    print(row.format("Overdue", result.overdue))
+    for offset, count in enumerate(result.due):
+        day = result.day(offset).strftime("%Y-%m-%d %a")
+        bar = "#" * min(count, FORECAST_BAR_MAX)
+        print(row.format(day, str(count).rjust(width) + " " + bar).rstrip())
+    print(row.format("Later", result.later))
+
+
+def _percent(ratio: typing.Optional[float]) -> str:
+    return "-" if ratio is None else "{:.1f}%".format(ratio * 100)
+
+
+def _print_histogram(title: str, histogram: Histogram):
+    print()
+    print(title)
+    largest = max([count for _, count in histogram] + [1])
+    width = len(str(largest))
+    for label, count in histogram:
+        bar = "#" * math.ceil(count * STATS_BAR_MAX / largest)
+        print("{:<14} : {} {}".format(label, str(count).rjust(width), bar))
+
+
+def _print_stats(result: DeckStats):
+    row = "{:<14} : {}"
+    print(row.format("Cards", result.cards))
+    print(row.format("Studied", result.studied))
+    print(row.format("Never studied", result.never_studied))
+    print(
+        row.format(
+            "Leech",
+            "{} ({})".format(result.leech, _percent(result.leech_ratio)),
+        )
+    )
+    print(
+        row.format(
+            "Last zero",
+            "{} ({})".format(result.zero, _percent(result.zero_ratio)),
+        )
+    )
+    print()
+    print("Retention (quality 3 or more)")
+    print(
+        row.format(
+            "Past reviews",
+            "{} of {}".format(_percent(result.retention), result.reviews),
+        )
+    )
+    print(
+        row.format(
+            "Last review",
+            "{} of {} cards".format(
+                _percent(result.last_retention), result.studied
+            ),
+        )
+    )
+    print(
+        row.format(
+            "Mature cards",
+            "{} of {} cards (interval {}+ days)".format(
+                _percent(result.mature_retention),
+                result.mature,
+                MATURE_INTERVAL,
+            ),
+        )
+    )
+    _print_histogram("Easiness (studied cards)", result.easiness)
+    _print_histogram("Interval (studied cards)", result.intervals)
+    _print_histogram(
+        "Quality (past reviews)",
+        [(str(x), y) for x, y in enumerate(result.quality)],
+    )
+    print()
+    print("Repetitions (all cards)")
+    for percentile, reps in result.repetitions.items():
+        label = "max" if percentile == 100 else "p{}".format(percentile)
+        print(row.format(label, reps))
+
+
+def stats(args: Namespace):
+    """Statistics command"""
+    result = deck_stats(_card_stack(args).to_columns())
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=2))
+    else:
+        _print_stats(result)
+
+
+def serve(args: Namespace):
+    """Deck server command"""
+    if not is_supported():
+        print("sbx serve needs Unix domain sockets", file=sys.stderr)
+        sys.exit(-1)
+    if args.stop:
+        client = connect(args.path)
+        if client is None:
+            print("No server is running for {!r}".format(args.path))
+            sys.exit(-1)
+        client.call("shutdown")
+        return
+    from sbx.core.watch import is_supported as watch_supported
+
+    storage = _storage(args)
+    server = DeckServer(
+        args.path,
+        args.jobs,
+        watch=not args.no_watch and watch_supported(),
+        review_log=_review_log(args),
+        storage=storage,
+    )
+    server.load()
+    _report_skipped(server.skipped)
+    # WHY: Stop cleanly (socket is removed) when killed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(
+        "Serving {} cards of {!r} at {!r}".format(
+            len(server), server.root, socket_path(server.root)
+        ),
+        file=sys.stderr,
+    )
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    except OSError as ex:
+        print(str(ex), file=sys.stderr)
+        sys.exit(-1)
+    finally:
+        if storage is not None:
+            storage.close()
 
 
 def list_cards(args: Namespace):
     """List cards command"""
-    stk = CardStack(args.path, args.rec, args.all, args.leech, args.zero)
-    file_only = args.file_only
+    output_format = args.format
+    if args.no_color and output_format == FORMAT_PRETTY:
+        output_format = FORMAT_PLAIN
+    if args.watch and output_format not in STREAM_FORMATS:
+        print("--format {} cannot be used with --watch".format(output_format))
+        sys.exit(-1)
+    stk = _card_stack(args)
+    watcher = None
+    if args.watch:
+        try:
+            # WHY: Start watching before listing, so no change is missed
+            watcher = stk.watch()
+        except OSError as ex:
+            print("Cannot watch {!r} - {}".format(args.path, ex))
+            sys.exit(-1)
 
-    for card in stk.iter():
-        if file_only:
-            print(card.path)
-        elif args.no_color:
-            print("- - - - - " * 4)
-            print(str(card))
-        else:
-            print("- - - - - " * 4)
-            card.to_formatted().print()
+    with CardRenderer(sys.stdout, output_format, args.file_only) as out:
+        for card in stk.iter():
+            out.write(card)
+        out.flush()
+        _report_skipped(stk.skipped)
+        if watcher is None:
+            return
+        with watcher:
+            try:
+                while True:
+                    changes = watcher.poll()
+                    if changes.overflow:
+                        cards = stk.iter()
+                    else:
+                        cards = stk.refresh(changes.paths)
+                    for card in cards:
+                        out.write(card)
+                    out.flush()
+            except KeyboardInterrupt:
+                pass
 
 
-def _add_filtering_args(sub_parser):
-    # Note these are common for both list & study commands
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError("{!r} is not a positive number".format(value))
+    return number
+
+
+def _where(value: str) -> Where:
+    try:
+        return Where(value)
+    except InvalidExpression as ex:
+        raise ArgumentTypeError(str(ex))
+
+
+def _date(value: str) -> int:
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise ArgumentTypeError("{!r} is not a YYYY-MM-DD date".format(value))
+
+
+def _add_scan_args(sub_parser):
+    # Note these are common for all commands that scan a deck
     sub_parser.add_argument(
         "path",
         type=str,
         help="path with collection of sbx flash-card format .md files",
     )
-    sub_parser.add_argument(
-        "-i",
-        "--include-not-scheduled",
-        dest="all",
-        default=False,
-        action="store_true",
-        help="include cards that are not scheduled for today's study session",
-    )
     sub_parser.add_argument(
         "-r",
         "--recursive",
@@ -105,6 +556,75 @@ def _add_filtering_args(sub_parser):
         action="store_true",
         help="scan all sub directories for .md files",
     )
+    sub_parser.add_argument(
+        "--no-index",
+        dest="no_index",
+        default=False,
+        action="store_true",
+        help="don't read or update the header index (.sbx-index) in path",
+    )
+    sub_parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=_positive_int,
+        default=1,
+        help="number of workers used to read card headers in parallel",
+    )
+    sub_parser.add_argument(
+        "--executor",
+        dest="executor",
+        choices=EXECUTORS,
+        default=EXECUTOR_THREAD,
+        help="kind of workers used with --jobs (default: thread)",
+    )
+    sub_parser.add_argument(
+        "--exclude",
+        dest="exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="skip files & directories matching this glob pattern"
+        " (can be repeated, .sbxignore in path is also used)",
+    )
+    sub_parser.add_argument(
+        "--include",
+        dest="include",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="only use files matching this glob pattern (can be repeated)",
+    )
+    sub_parser.add_argument(
+        "--storage",
+        dest="storage",
+        choices=STORAGES,
+        default=None,
+        help="where card headers are kept, sqlite keeps them in "
+        + SQLITE_FILE_NAME
+        + " in path and leaves card files untouched when studying"
+        " (default: sqlite if path has one, otherwise file)",
+    )
+    sub_parser.add_argument(
+        "--no-daemon",
+        dest="no_daemon",
+        default=False,
+        action="store_true",
+        help="scan path even if sbx serve is running for it",
+    )
+
+
+def _add_filtering_args(sub_parser):
+    # Note these are common for both list & study commands
+    _add_scan_args(sub_parser)
+    sub_parser.add_argument(
+        "-i",
+        "--include-not-scheduled",
+        dest="all",
+        default=False,
+        action="store_true",
+        help="include cards that are not scheduled for today's study session",
+    )
     sub_parser.add_argument(
         "-l",
         "--leech",
@@ -122,6 +642,66 @@ def _add_filtering_args(sub_parser):
         help="select cards that were marked zero"
         " last time (of current subset)",
     )
+    sub_parser.add_argument(
+        "--where",
+        dest="where",
+        type=_where,
+        default=None,
+        metavar="EXPRESSION",
+        help="only use cards matching this expression, for example"
+        " 'reps > 5 and easiness < 1.6 and overdue_days >= 3' (fields: "
+        + ", ".join(FIELDS)
+        + ")",
+    )
+    sub_parser.add_argument(
+        "--order",
+        dest="order",
+        choices=list(ORDERS),
+        default=None,
+        help="order of cards: "
+        + ", ".join(
+            "{} ({})".format(name, x[1]) for name, x in ORDERS.items()
+        ),
+    )
+    sub_parser.add_argument(
+        "--limit",
+        dest="limit",
+        type=_positive_int,
+        default=None,
+        metavar="N",
+        help="use only first N cards (of current order)",
+    )
+
+
+def _add_log_args(sub_parser):
+    group = sub_parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--log",
+        dest="log",
+        default=False,
+        action="store_true",
+        help="append marked cards to a review log ("
+        + LOG_DIRECTORY_NAME
+        + ") in path, later runs keep appending to it",
+    )
+    group.add_argument(
+        "--no-log",
+        dest="no_log",
+        default=False,
+        action="store_true",
+        help="don't append marked cards to the review log, even if there"
+        " is one",
+    )
+
+
+def _add_algorithm_arg(sub_parser, default: typing.Optional[str], help_: str):
+    sub_parser.add_argument(
+        "--algorithm",
+        dest="algorithm",
+        choices=sorted(ALGORITHMS),
+        default=default,
+        help=help_,
+    )
 
 
 def run(arguments: typing.List[str]):
@@ -145,6 +725,32 @@ def run(arguments: typing.List[str]):
         help="ensure output is unbuffered",
     )
 
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        default=False,
+        action="store_true",
+        help="time scanning, parsing, saving & rendering phases and print"
+        " a summary to stderr (same as SBX_TRACE=1)",
+    )
+    parser.add_argument(
+        "--profile-out",
+        dest="profile_out",
+        default=None,
+        metavar="FILE",
+        help="write profile summary to FILE instead, a .json FILE gets a"
+        " Chrome trace (same as SBX_TRACE=FILE)",
+    )
+
+    parser.add_argument(
+        "--metrics-out",
+        dest="metrics_out",
+        default=None,
+        metavar="FILE",
+        help="write counters of work done to FILE when done, a .prom FILE"
+        " gets Prometheus text format, any other FILE gets JSON",
+    )
+
     subparsers = parser.add_subparsers(dest="action")
     subparsers.required = True
 
@@ -182,8 +788,120 @@ def run(arguments: typing.List[str]):
         help="if content is provided this will prepend card front content"
         "with a '# ' and all lines in back with '* '",
     )
+    _add_algorithm_arg(
+        create_parser,
+        DEFAULT_ALGO,
+        "scheduling algorithm of the card (default: {})".format(DEFAULT_ALGO),
+    )
     create_parser.set_defaults(func=create)
 
+    # Import
+    import_parser = subparsers.add_parser(
+        "import", help="create cards from rows of a CSV, TSV or JSONL file"
+    )
+    import_parser.add_argument(
+        "source",
+        type=str,
+        help="file to import (- to read standard input)",
+    )
+    import_parser.add_argument(
+        "directory", type=str, help="directory to create cards in"
+    )
+    import_parser.add_argument(
+        "--format",
+        dest="format",
+        choices=SOURCE_FORMATS,
+        default=None,
+        help="format of source (default: guessed from file name)",
+    )
+    import_parser.add_argument(
+        "--header",
+        dest="header",
+        default=False,
+        action="store_true",
+        help="first row of a CSV or TSV source contains column names",
+    )
+    import_parser.add_argument(
+        "--front",
+        dest="front",
+        type=str,
+        default=None,
+        metavar="COLUMN",
+        help="column (name or number starting from 1) or JSONL key used"
+        " as front (default: first column or 'front')",
+    )
+    import_parser.add_argument(
+        "--back",
+        dest="back",
+        type=str,
+        action="append",
+        default=None,
+        metavar="COLUMN",
+        help="column or JSONL key added to back, can be repeated"
+        " (default: all other columns or 'back')",
+    )
+    import_parser.add_argument(
+        "-m",
+        "--markdown-header-and-bullet",
+        dest="markdown",
+        default=False,
+        action="store_true",
+        help="prepend card front with a '# ' and all lines in back"
+        " with '* '",
+    )
+    import_parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=_positive_int,
+        default=DEFAULT_IMPORT_JOBS,
+        help="number of threads writing cards (default: {})".format(
+            DEFAULT_IMPORT_JOBS
+        ),
+    )
+    _add_algorithm_arg(
+        import_parser,
+        DEFAULT_ALGO,
+        "scheduling algorithm of created cards (default: {})".format(
+            DEFAULT_ALGO
+        ),
+    )
+    import_parser.set_defaults(func=import_)
+
+    # Export
+    export_parser = subparsers.add_parser(
+        "export",
+        help="write all cards of a deck to a single JSONL pack"
+        " (gzip compressed if it ends with .gz)",
+    )
+    _add_scan_args(export_parser)
+    export_parser.add_argument(
+        "output",
+        type=str,
+        help="pack to write, such as deck.jsonl.gz (- for standard output)",
+    )
+    export_parser.set_defaults(func=export, no_daemon=True)
+
+    # Import pack
+    import_pack_parser = subparsers.add_parser(
+        "import-pack", help="restore cards of a pack written by export"
+    )
+    import_pack_parser.add_argument(
+        "pack", type=str, help="pack to read (- for standard input)"
+    )
+    import_pack_parser.add_argument(
+        "path", type=str, help="directory to restore cards to"
+    )
+    import_pack_parser.add_argument(
+        "-f",
+        "--force",
+        dest="force",
+        default=False,
+        action="store_true",
+        help="replace cards that already exist",
+    )
+    import_pack_parser.set_defaults(func=import_pack_)
+
     # Reset
     reset_parser = subparsers.add_parser("reset", help="reset a card")
     reset_parser.add_argument(
@@ -192,6 +910,12 @@ def run(arguments: typing.List[str]):
         help="card file (ensure it's a .md so "
         "you can use it in study mode)",
     )
+    _add_algorithm_arg(
+        reset_parser,
+        None,
+        "switch the card to this scheduling algorithm (default: keep the"
+        " current one)",
+    )
     reset_parser.set_defaults(func=reset)
 
     # Study
@@ -199,6 +923,24 @@ def run(arguments: typing.List[str]):
         "study", help="start a study session on given path"
     )
     _add_filtering_args(study_parser)
+    study_parser.add_argument(
+        "-s",
+        "--stream",
+        dest="stream",
+        default=False,
+        action="store_true",
+        help="show first card as soon as it is found"
+        " and keep scanning in background",
+    )
+    study_parser.add_argument(
+        "-w",
+        "--write-behind",
+        dest="write_behind",
+        default=False,
+        action="store_true",
+        help="save cards in background (journaled, replayed after a crash)",
+    )
+    _add_log_args(study_parser)
     study_parser.set_defaults(func=study)
 
     # List Cards
@@ -217,13 +959,151 @@ def run(arguments: typing.List[str]):
         dest="no_color",
         default=False,
         action="store_true",
-        help="don't use colours",
+        help="don't use colours (same as --format plain)",
+    )
+    list_parser.add_argument(
+        "--format",
+        dest="format",
+        choices=FORMATS,
+        default=FORMAT_PRETTY,
+        help="output format, json, jsonl & tsv only use card headers"
+        " (default: pretty)",
+    )
+    list_parser.add_argument(
+        "-w",
+        "--watch",
+        dest="watch",
+        default=False,
+        action="store_true",
+        help="keep running and list cards again as they are created or"
+        " changed (Linux only)",
     )
     list_parser.set_defaults(func=list_cards)
 
+    # Serve
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="keep card headers of a deck in memory, so list, study &"
+        " forecast of the same path don't scan it",
+    )
+    serve_parser.add_argument(
+        "path", type=str, help="root directory of the deck"
+    )
+    serve_parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=_positive_int,
+        default=1,
+        help="number of workers used to read card headers in parallel",
+    )
+    serve_parser.add_argument(
+        "--no-watch",
+        dest="no_watch",
+        default=False,
+        action="store_true",
+        help="don't watch the deck for cards changed by other programs"
+        " (use the rescan method instead)",
+    )
+    serve_parser.add_argument(
+        "--stop",
+        dest="stop",
+        default=False,
+        action="store_true",
+        help="stop the server running for path",
+    )
+    _add_log_args(serve_parser)
+    serve_parser.set_defaults(func=serve)
+
+    # Compact review log
+    compact_log_parser = subparsers.add_parser(
+        "compact-log",
+        help="merge older segments of the review log ("
+        + LOG_DIRECTORY_NAME
+        + ") of a deck into one",
+    )
+    compact_log_parser.add_argument(
+        "path", type=str, help="root directory of the deck"
+    )
+    compact_log_parser.add_argument(
+        "--prune",
+        dest="prune",
+        default=False,
+        action="store_true",
+        help="drop reviews of cards that no longer exist in path",
+    )
+    compact_log_parser.set_defaults(func=compact_log)
+
+    # Forecast
+    forecast_parser = subparsers.add_parser(
+        "forecast", help="show number of cards due each day"
+    )
+    _add_scan_args(forecast_parser)
+    forecast_parser.add_argument(
+        "--days",
+        dest="days",
+        type=_positive_int,
+        default=14,
+        help="number of days to show (default: 14)",
+    )
+    forecast_parser.add_argument(
+        "--as-of",
+        dest="as_of",
+        type=_date,
+        default=None,
+        metavar="YYYY-MM-DD",
+        help="first day of the forecast (default: today)",
+    )
+    forecast_parser.set_defaults(
+        func=forecast_cards,
+        all=True,
+        leech=False,
+        zero=False,
+        where=None,
+        order=None,
+        limit=None,
+    )
+
+    # Stats
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="show easiness, interval, quality & retention statistics of"
+        " all cards",
+    )
+    _add_scan_args(stats_parser)
+    stats_parser.add_argument(
+        "--json",
+        dest="json",
+        default=False,
+        action="store_true",
+        help="print statistics as JSON",
+    )
+    stats_parser.set_defaults(
+        func=stats,
+        all=True,
+        leech=False,
+        zero=False,
+        where=None,
+        order=None,
+        limit=None,
+    )
+
     result = parser.parse_args(arguments)
 
     if result.unbuffered:
         sys.stdout = Unbuffered(sys.stdout)  # type: ignore
 
-    result.func(result)
+    profile = result.profile_out
+    if profile is None and result.profile:
+        profile = STDERR
+    tracer = tracer_from_settings(profile, os.environ.get(TRACE_ENV))
+    if tracer is not None:
+        tracer.start()
+    try:
+        result.func(result)
+    finally:
+        if tracer is not None:
+            tracer.stop()
+            tracer.write()
+        if result.metrics_out is not None:
+            METRICS.write(result.metrics_out)
@@ -2,11 +2,35 @@
 Contains important `Card`, `CardMeta`, `CardAlgo` classes
 """
 import abc
+import codecs
 import json
+import os
+import shutil
+import tempfile
 from abc import ABCMeta
-from typing import Dict, List, Optional, Union
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+from sbx.core.metrics import (
+    BODIES_LOADED,
+    BYTES_READ,
+    BYTES_WRITTEN,
+    HEADER_ONLY_SAVES,
+    METRICS,
+    SAVES,
+)
+from sbx.core.reviewlog import ReviewLog, scheduling
 from sbx.core.utility import (
+    DAY_IN_SECONDS,
     Text,
     in_days,
     is_today,
@@ -17,12 +41,24 @@ from sbx.core.utility import (
     unpack_int_list,
 )
 
+if TYPE_CHECKING:
+    from sbx.core.columns import MetaColumns
+    from sbx.core.storage import MetaStorage
+
 BAD_QUALITY_THRESHOLD = 3
 PAST_STAT_COUNT = 20
 LEECH_MIN_QUALITY = 3
 
+# Names of scheduling algorithms (`algo` of a card), see `ALGORITHMS`
+ALGO_SM2 = "sm2"
+ALGO_SM2_PLUS = "sm2+"
+ALGO_SM4 = "sm4"
+DEFAULT_ALGO = ALGO_SM2
+
 NEWLINE = "\n"
 CARD_VERSION = "v1"
+COPY_BUFFER_SIZE = 64 * 1024
+TEMP_FILE_SUFFIX = ".sbx-tmp"
 REQUIRED_FIELDS = ["reps", "last", "next", "pastq", "algo", "sbx"]
 
 
@@ -32,9 +68,98 @@ class InvalidCardLoadAttempted(Exception):
     pass
 
 
+# Number of bytes read at once to find the header line
+HEADER_BLOCK_SIZE = 4096
+# Encodings where header can be parsed as raw bytes
+_ASCII_ENCODINGS = {"utf-8", "ascii"}
+
+
+def _read_first_line(path: str) -> Tuple[bytes, int]:
+    """
+    Get first line of a file (without line ending) & number of bytes read
+
+    * `path` - path of the file
+    """
+    handle = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "pread"):
+            block = os.pread(handle, HEADER_BLOCK_SIZE, 0)
+        else:
+            block = os.read(handle, HEADER_BLOCK_SIZE)
+    finally:
+        os.close(handle)
+    line_end = block.find(b"\n")
+    if line_end != -1:
+        line = block[:line_end]
+        # WHY: Same as text mode, a lone `\r` also ends a line
+        carriage_return = line.find(b"\r")
+        if carriage_return != -1:
+            line = line[:carriage_return]
+        return line, len(block)
+    if len(block) < HEADER_BLOCK_SIZE:
+        return block, len(block)
+    # Unusually long header
+    with open(path, "rb") as h:
+        line = h.readline()
+    return line.rstrip(b"\r\n"), len(line)
+
+
+def _read_header_text(path: str, encoding: str) -> dict:
+    with open(path, "r", encoding=encoding) as h:
+        data = h.readline()
+    # WHY: Headers are JSON with ASCII only characters
+    METRICS.inc(BYTES_READ, len(data))
+    try:
+        _, json_data, _ = data.split("|")
+        header = json.loads(json_data.strip())
+    except ValueError as ex:
+        raise InvalidCardLoadAttempted(
+            "Unable to load file: {!r}".format(path)
+        ) from ex
+    if not isinstance(header, dict):
+        raise InvalidCardLoadAttempted(
+            "Unable to load file: {!r}".format(path)
+        )
+    return header
+
+
+def read_header(path: str, encoding: str = "utf-8") -> dict:
+    """
+    Read and parse the JSON header in the first line of a card file
+
+    * `path` - path of the card file
+    * `encoding` - encoding of the card file
+
+    Raises `FileNotFoundError` if the file is missing and
+    `InvalidCardLoadAttempted` if first line is not a valid header.
+
+    Only the first block of the file is read. For UTF-8 (or ASCII) cards
+    it is read as bytes and only the JSON part of the line is decoded.
+    """
+    if codecs.lookup(encoding).name not in _ASCII_ENCODINGS:
+        return _read_header_text(path, encoding)
+    line, size = _read_first_line(path)
+    METRICS.inc(BYTES_READ, size)
+    try:
+        _, json_data, _ = line.split(b"|")
+        header = json.loads(json_data.decode(encoding))
+    except ValueError as ex:
+        raise InvalidCardLoadAttempted(
+            "Unable to load file: {!r}".format(path)
+        ) from ex
+    if not isinstance(header, dict):
+        raise InvalidCardLoadAttempted(
+            "Unable to load file: {!r}".format(path)
+        )
+    return header
+
+
 class CardAlgo(metaclass=ABCMeta):
     """Card Scheduling Algorithm"""
 
+    # Is register `c` easiness (such as for statistics)
+    uses_easiness = True
+
     @abc.abstractmethod
     def mark(self, meta: "CardMeta", quality: int):
         """
@@ -45,6 +170,23 @@ class CardAlgo(metaclass=ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def mark_batch(
+        self,
+        columns: "MetaColumns",
+        qualities: Sequence[int],
+        now: Optional[int] = None,
+    ):
+        """
+        Same as `mark` for every row of given columns
+
+        * `columns` - meta data of cards (this is mutated)
+        * `qualities` - quality for each row, rows with a negative
+            quality are not marked
+        * `now` - current UNIX timestamp (defaults to current time)
+        """
+        pass
+
     def can_study_now(self, meta: "CardMeta") -> bool:
         """Is this card scheduled for now?"""
         # WHY: You already studied today, come again tomorrow!
@@ -54,6 +196,59 @@ class CardAlgo(metaclass=ABCMeta):
             return True
         return is_today_or_earlier(meta.next_session)
 
+    def can_study_now_batch(
+        self, columns: "MetaColumns", now: Optional[int] = None
+    ) -> bytearray:
+        """
+        Same as `can_study_now` for every row of given columns
+
+        * `columns` - meta data of cards
+        * `now` - current UNIX timestamp (defaults to current time)
+
+        Returns a mask with `1` for cards scheduled for now.
+        """
+        if now is None:
+            now = unix_time()
+        today = now // DAY_IN_SECONDS
+        mask = bytearray(len(columns))
+        for row, (last, next_, reps) in enumerate(
+            zip(columns.last, columns.next, columns.actual_repetitions)
+        ):
+            # UTC day numbers, same as comparing dates in `is_today`
+            if last // DAY_IN_SECONDS == today:
+                continue
+            if next_ == -1 or reps == 0 or next_ // DAY_IN_SECONDS <= today:
+                mask[row] = 1
+        return mask
+
+    def is_leech_batch(self, columns: "MetaColumns") -> bytearray:
+        """
+        Same as `is_leech` for every row of given columns
+
+        * `columns` - meta data of cards
+        """
+        bad = {str(x) for x in range(BAD_QUALITY_THRESHOLD)}
+        mask = bytearray(len(columns))
+        for row, past in enumerate(columns.past_quality):
+            if (
+                len(past) >= LEECH_MIN_QUALITY
+                and past[-1] in bad
+                and past[-2] in bad
+                and past[-3] in bad
+            ):
+                mask[row] = 1
+        return mask
+
+    def is_last_zero_batch(self, columns: "MetaColumns") -> bytearray:
+        """
+        Same as `is_last_zero` for every row of given columns
+
+        * `columns` - meta data of cards
+        """
+        return bytearray(
+            1 if past[-1:] == "0" else 0 for past in columns.past_quality
+        )
+
     def is_leech(self, meta: "CardMeta") -> bool:
         """Is this card a leech?"""
         if len(meta.past_quality) < LEECH_MIN_QUALITY:
@@ -81,7 +276,7 @@ class CardMeta:
         self.last_session: int = -1
         self.past_quality: List[int] = []
         self.version = "v1"
-        self.algo = "sm2"
+        self.algo = DEFAULT_ALGO
         if data:
             self.update_from_dict(data)
 
@@ -114,6 +309,8 @@ class CardMeta:
 
         * `data` - dictionary to read data from
         """
+        if data["algo"] not in ALGORITHMS:
+            raise ValueError("Unknown algorithm {!r}".format(data["algo"]))
         self.algo = data["algo"]
         self.version = data["sbx"]
         self.next_session = data["next"]
@@ -136,6 +333,27 @@ class CardMeta:
         return "CardStat(" + repr(data) + ")"
 
 
+# Every quality a card can be marked with
+_QUALITIES = range(6)
+
+
+def _store_columns(
+    columns: "MetaColumns",
+    repetitions: List[int],
+    interval: List[float],
+    register_c: List[float],
+    last: List[int],
+    next_: List[int],
+    reps: List[int],
+):
+    columns.repetitions[:] = array("q", repetitions)
+    columns.interval[:] = array("d", interval)
+    columns.easiness[:] = array("d", register_c)
+    columns.last[:] = array("q", last)
+    columns.next[:] = array("q", next_)
+    columns.actual_repetitions[:] = array("q", reps)
+
+
 class Sm2(CardAlgo):
     """
     Super Memo 2 Algorithm for Card Scheduling
@@ -189,19 +407,417 @@ class Sm2(CardAlgo):
         state["b"] = interval
         state["c"] = easiness
 
+    def mark_batch(
+        self,
+        columns: "MetaColumns",
+        qualities: Sequence[int],
+        now: Optional[int] = None,
+    ):
+        """
+        Same as `mark` for every row of given columns
+
+        * `columns` - meta data of cards (this is mutated)
+        * `qualities` - quality for each row, rows with a negative
+            quality are not marked
+        * `now` - current UNIX timestamp (defaults to current time)
+        """
+        if len(qualities) != len(columns):
+            raise ValueError("Need exactly one quality for each card")
+        if now is None:
+            now = unix_time()
+        keep = PAST_STAT_COUNT - 1
+        # WHY: Lists are faster to read & write than `array`, each column
+        #    is converted once and written back in one go
+        repetitions_column = columns.repetitions.tolist()
+        interval_column = columns.interval.tolist()
+        easiness_column = columns.easiness.tolist()
+        last_column = columns.last.tolist()
+        next_column = columns.next.tolist()
+        reps_column = columns.actual_repetitions.tolist()
+        past_column = columns.past_quality
+        # Parts of the new easiness that only depend on quality (same
+        #    float operations as `mark`)
+        gains = [0.28 * quality for quality in _QUALITIES]
+        losses = [0.02 * quality * quality for quality in _QUALITIES]
+        marks = [str(quality) for quality in _QUALITIES]
+        for row, quality in enumerate(qualities):
+            if quality < 0:
+                continue
+            easiness = (
+                easiness_column[row] - 0.8 + gains[quality] - losses[quality]
+            )
+            if easiness < 1.3:
+                easiness = 1.3
+            if quality < BAD_QUALITY_THRESHOLD:
+                repetitions = 0
+                interval = 1.0
+            else:
+                repetitions = repetitions_column[row] + 1
+                if repetitions == 1:
+                    interval = 1.0
+                elif repetitions == 2:
+                    interval = 6.0
+                else:
+                    interval = interval_column[row] * easiness
+            past_column[row] = past_column[row][-keep:] + marks[quality]
+            last = last_column[row]
+            next_column[row] = (last if last > now else now) + int(
+                interval
+            ) * DAY_IN_SECONDS
+            last_column[row] = now
+            reps_column[row] += 1
+            repetitions_column[row] = repetitions
+            interval_column[row] = interval
+            easiness_column[row] = easiness
+        _store_columns(
+            columns,
+            repetitions_column,
+            interval_column,
+            easiness_column,
+            last_column,
+            next_column,
+            reps_column,
+        )
+
+
+# Difficulty of a card never studied with SM-2+
+SM2_PLUS_DIFFICULTY = 0.3
+# Share of the interval actually used that is taken by SM-4
+SM4_FRACTION = 0.5
+# Registers of a card never studied, same as a new `Sm2` card
+_NEW_REGISTERS = (0, 1.0, 2.5)
+
+
+def _elapsed_days(last: int, now: int, reps: int, interval: float) -> float:
+    # WHY: A card never studied is reviewed on time
+    if reps == 0 or last <= 0:
+        return interval
+    return max(0.0, (now - last) / DAY_IN_SECONDS)
+
+
+def _sm2_plus_step(
+    repetitions: int,
+    interval: float,
+    difficulty: float,
+    elapsed: float,
+    quality: int,
+) -> Tuple[int, float, float]:
+    performance = quality / 5
+    correct = quality >= BAD_QUALITY_THRESHOLD
+    overdue = min(2.0, elapsed / interval) if correct else 1.0
+    difficulty += overdue / 17 * (8 - 9 * performance)
+    difficulty = min(1.0, max(0.0, difficulty))
+    weight = 3 - 1.7 * difficulty
+    if correct:
+        interval *= 1 + (weight - 1) * overdue
+        return repetitions + 1, interval, difficulty
+    return 0, max(1.0, interval / (weight * weight)), difficulty
+
+
+def _sm4_step(
+    repetitions: int,
+    interval: float,
+    easiness: float,
+    elapsed: float,
+    quality: int,
+) -> Tuple[int, float, float]:
+    # WHY: Unlike SM-2, easiness is not changed by a failed repetition
+    if quality < BAD_QUALITY_THRESHOLD:
+        return 0, 1.0, easiness
+    easiness = easiness - 0.8 + 0.28 * quality - 0.02 * quality * quality
+    easiness = max(1.3, easiness)
+    repetitions += 1
+    if repetitions == 1:
+        return repetitions, 1.0, easiness
+    if repetitions == 2:
+        return repetitions, 6.0, easiness
+    optimal = elapsed + elapsed * (1 - 1 / easiness) / 2 * (0.25 * quality - 1)
+    interval = (1 - SM4_FRACTION) * interval + SM4_FRACTION * optimal
+    return repetitions, max(1.0, interval * easiness), easiness
+
+
+class _SteppedAlgo(CardAlgo):
+    """
+    Algorithm where a mark only depends on registers `a`, `b` & `c`,
+    days since last review & quality (same step for `mark` & `mark_batch`)
+    """
+
+    # Registers `a`, `b` & `c` of a card never studied
+    new_registers = _NEW_REGISTERS
+
+    # Function of (`a`, `b`, `c`, days elapsed, quality) giving new
+    #    (`a`, `b`, `c`)
+    _step: Callable[[int, float, float, float, int], Tuple[int, float, float]]
+
+    def mark(self, meta: "CardMeta", quality: int):
+        """
+        Update card meta data based on given quality
+
+        * `meta` -  saved details of this given card
+        * `quality` -  how good you remember it
+            0-5 inclusive -> 0 - blackout, 5 - remember clearly
+
+        This will mutate meta data object
+        """
+        state = meta.algo_state
+        if meta.actual_repetitions == 0:
+            repetitions, interval, register_c = self.new_registers
+        else:
+            repetitions = int(state.get("a", self.new_registers[0]))
+            interval = float(state.get("b", self.new_registers[1]))
+            register_c = float(state.get("c", self.new_registers[2]))
+        current_time = unix_time()
+        elapsed = _elapsed_days(
+            meta.last_session,
+            current_time,
+            meta.actual_repetitions,
+            interval,
+        )
+        repetitions, interval, register_c = self._step(
+            repetitions, interval, register_c, elapsed, quality
+        )
+        tmp = PAST_STAT_COUNT - 1
+        meta.past_quality = meta.past_quality[-tmp:] + [quality]
+        meta.next_session = in_days(
+            max(meta.last_session, current_time), days=int(interval)
+        )
+        meta.last_session = current_time
+        meta.actual_repetitions += 1
+        state["a"] = repetitions
+        state["b"] = interval
+        state["c"] = register_c
+
+    def mark_batch(
+        self,
+        columns: "MetaColumns",
+        qualities: Sequence[int],
+        now: Optional[int] = None,
+    ):
+        if len(qualities) != len(columns):
+            raise ValueError("Need exactly one quality for each card")
+        if now is None:
+            now = unix_time()
+        keep = PAST_STAT_COUNT - 1
+        step = self._step
+        new_registers = self.new_registers
+        # WHY: Same as `Sm2.mark_batch`, lists are faster than `array`
+        repetitions_column = columns.repetitions.tolist()
+        interval_column = columns.interval.tolist()
+        c_column = columns.easiness.tolist()
+        last_column = columns.last.tolist()
+        next_column = columns.next.tolist()
+        reps_column = columns.actual_repetitions.tolist()
+        past_column = columns.past_quality
+        marks = [str(quality) for quality in _QUALITIES]
+        for row, quality in enumerate(qualities):
+            if quality < 0:
+                continue
+            reps = reps_column[row]
+            last = last_column[row]
+            if reps == 0:
+                repetitions, interval, register_c = new_registers
+            else:
+                repetitions = repetitions_column[row]
+                interval = interval_column[row]
+                register_c = c_column[row]
+            repetitions, interval, register_c = step(
+                repetitions,
+                interval,
+                register_c,
+                _elapsed_days(last, now, reps, interval),
+                quality,
+            )
+            past_column[row] = past_column[row][-keep:] + marks[quality]
+            next_column[row] = (last if last > now else now) + int(
+                interval
+            ) * DAY_IN_SECONDS
+            last_column[row] = now
+            reps_column[row] = reps + 1
+            repetitions_column[row] = repetitions
+            interval_column[row] = interval
+            c_column[row] = register_c
+        _store_columns(
+            columns,
+            repetitions_column,
+            interval_column,
+            c_column,
+            last_column,
+            next_column,
+            reps_column,
+        )
+
+
+class Sm2Plus(_SteppedAlgo):
+    """
+    SM-2+ Algorithm for Card Scheduling, a correct answer of an overdue
+    card grows its interval more & difficulty is a share of how overdue
+    based on - http://www.blueraja.com/blog/477/a-better-spaced-repetition-learning-algorithm-sm2
+
+    Registers: `a` - correct answers in a row, `b` - interval (days) &
+    `c` - difficulty (`0`-`1`). Random part of the interval is left out,
+    so same marks always give same schedule.
+    """
+
+    uses_easiness = False
+    new_registers = (0, 1.0, SM2_PLUS_DIFFICULTY)
+    _step = staticmethod(_sm2_plus_step)
+
+
+class Sm4(_SteppedAlgo):
+    """
+    Super Memo 4 Algorithm for Card Scheduling
+    based on - https://www.supermemo.com/en/archives1990-2015/english/ol/sm4
+
+    Registers are same as `Sm2`. SM-4 learns a matrix of optimal intervals
+    shared by all cards, cards here are stateless so each card moves its
+    own interval towards the interval actually used instead (so reviewing
+    late with a good quality gives a longer interval).
+    """
+
+    _step = staticmethod(_sm4_step)
+
+
+# Shared instance of each scheduling algorithm by name (`algo` of a card),
+#    algorithms keep no state so one instance serves every card
+ALGORITHMS: Dict[str, CardAlgo] = {
+    ALGO_SM2: Sm2(),
+    ALGO_SM2_PLUS: Sm2Plus(),
+    ALGO_SM4: Sm4(),
+}
+
+
+def get_algorithm(name: str) -> CardAlgo:
+    """
+    Get scheduling algorithm of given name
+
+    * `name` - one of `ALGORITHMS`
+    """
+    algorithm = ALGORITHMS.get(name)
+    if algorithm is None:
+        raise ValueError("Unknown algorithm {!r}".format(name))
+    return algorithm
+
+
+def _mixed_mask(columns: "MetaColumns", method: str, *args) -> bytearray:
+    names = set(columns.algo)
+    if len(names) <= 1:
+        algorithm = get_algorithm(names.pop() if names else DEFAULT_ALGO)
+        mask: bytearray = getattr(algorithm, method)(columns, *args)
+        return mask
+    masks = {
+        x: getattr(get_algorithm(x), method)(columns, *args) for x in names
+    }
+    return bytearray(masks[x][row] for row, x in enumerate(columns.algo))
+
+
+def can_study_now_batch(
+    columns: "MetaColumns", now: Optional[int] = None
+) -> bytearray:
+    """
+    Same as `CardAlgo.can_study_now_batch`, each row is checked by the
+    algorithm of the card
+
+    * `columns` - meta data of cards
+    * `now` - current UNIX timestamp (defaults to current time)
+    """
+    if now is None:
+        now = unix_time()
+    return _mixed_mask(columns, "can_study_now_batch", now)
+
+
+def is_leech_batch(columns: "MetaColumns") -> bytearray:
+    """
+    Same as `CardAlgo.is_leech_batch`, each row is checked by the
+    algorithm of the card
+
+    * `columns` - meta data of cards
+    """
+    return _mixed_mask(columns, "is_leech_batch")
+
+
+def is_last_zero_batch(columns: "MetaColumns") -> bytearray:
+    """
+    Same as `CardAlgo.is_last_zero_batch`, each row is checked by the
+    algorithm of the card
+
+    * `columns` - meta data of cards
+    """
+    return _mixed_mask(columns, "is_last_zero_batch")
+
+
+def mark_batch(
+    columns: "MetaColumns",
+    qualities: Sequence[int],
+    now: Optional[int] = None,
+):
+    """
+    Same as `CardAlgo.mark_batch`, each row is marked by the algorithm of
+    the card (one pass for each algorithm used)
+
+    * `columns` - meta data of cards (this is mutated)
+    * `qualities` - quality for each row, rows with a negative quality
+        are not marked
+    * `now` - current UNIX timestamp (defaults to current time)
+    """
+    if len(qualities) != len(columns):
+        raise ValueError("Need exactly one quality for each card")
+    if now is None:
+        now = unix_time()
+    names = set(columns.algo)
+    if len(names) == 1:
+        get_algorithm(names.pop()).mark_batch(columns, qualities, now)
+        return
+    for name in names:
+        # WHY: Rows of other algorithms are skipped with a negative quality
+        selected = [
+            quality if algo == name else -1
+            for quality, algo in zip(qualities, columns.algo)
+        ]
+        get_algorithm(name).mark_batch(columns, selected, now)
+
 
 class Card:
     """A flash card"""
 
-    def __init__(self, path_: str, algorithm_factory=Sm2, encoding="utf-8"):
+    def __init__(
+        self,
+        path_: str,
+        algorithm_factory=None,
+        encoding="utf-8",
+        headers: Optional[dict] = None,
+        index=None,
+        storage: Optional["MetaStorage"] = None,
+        review_log: Optional[ReviewLog] = None,
+    ):
+        """
+        Create a card for given path
+
+        * `path_` - path of the card file
+        * `algorithm_factory` - scheduling algorithm class, if not given
+            the shared algorithm named by `algo` of the card is used
+            (see `ALGORITHMS`)
+        * `encoding` - encoding of the card file
+        * `headers` - already parsed header, if given file is not read
+        * `index` - `sbx.core.index.HeaderIndex` to update on save
+        * `storage` - keep header in this storage instead of the card
+            file (header in the file is only used if storage has none)
+        * `review_log` - `sbx.core.reviewlog.ReviewLog` every mark is
+            appended to
+        """
         self._front: str = ""
         self._back: str = ""
         self._encoding = encoding
         self._stat = CardMeta()
         self._path = path_
         self._fully_loaded = False
-        self._algorithm: CardAlgo = algorithm_factory()
-        self._load_headers()
+        self._body_dirty = False
+        self._index = index
+        self._storage = storage
+        self._review_log = review_log
+        self._algorithm: Optional[CardAlgo] = None
+        if algorithm_factory is not None:
+            self._algorithm = algorithm_factory()
+        self._load_headers(headers)
 
     @property
     def meta(self) -> CardMeta:
@@ -213,6 +829,13 @@ class Card:
         """Get path of the card"""
         return self._path
 
+    @property
+    def algorithm(self) -> CardAlgo:
+        """Get scheduling algorithm of the card"""
+        if self._algorithm is not None:
+            return self._algorithm
+        return ALGORITHMS[self._stat.algo]
+
     def _pack(self):
         return self._stat.to_dict()
 
@@ -226,22 +849,33 @@ class Card:
         * `quality` - 0-5 (inclusive) level of how much you remember
         """
         assert 0 <= quality <= 5
-        self._algorithm.mark(self._stat, quality)
+        if self._review_log is None:
+            self.algorithm.mark(self._stat, quality)
+            return
+        before = scheduling(self._stat)
+        self.algorithm.mark(self._stat, quality)
+        self._review_log.append(
+            self._path,
+            self._stat.last_session,
+            quality,
+            before,
+            scheduling(self._stat),
+        )
 
     @property
     def today(self) -> bool:
         """Is this card scheduled for today?"""
-        return self._algorithm.can_study_now(self._stat)
+        return self.algorithm.can_study_now(self._stat)
 
     @property
     def leech(self) -> bool:
         """Is this card a leech?"""
-        return self._algorithm.is_leech(self._stat)
+        return self.algorithm.is_leech(self._stat)
 
     @property
     def zero(self) -> bool:
         """Is this card's last quality is set to zero?"""
-        return self._algorithm.is_last_zero(self._stat)
+        return self.algorithm.is_last_zero(self._stat)
 
     @property
     def front(self) -> str:
@@ -259,7 +893,10 @@ class Card:
         """
         if not new_front:
             raise ValueError("Cannot be empty")
+        if not self._fully_loaded:
+            self._load()
         self._front = new_front
+        self._body_dirty = True
 
     @property
     def back(self) -> str:
@@ -277,11 +914,24 @@ class Card:
         """
         if not new_back:
             raise ValueError("Cannot be empty")
+        if not self._fully_loaded:
+            self._load()
         self._back = new_back
+        self._body_dirty = True
 
-    def reset(self):
-        """Reset card's meta data"""
+    def reset(self, algo: Optional[str] = None):
+        """
+        Reset card's meta data
+
+        * `algo` - scheduling algorithm to use from now on (card keeps
+            its algorithm if not given)
+        """
+        if algo is None:
+            algo = self._stat.algo
+        # WHY: Fail before anything changes for an unknown algorithm
+        get_algorithm(algo)
         self._stat = CardMeta()
+        self._stat.algo = algo
 
     @property
     def human_readable_info(self) -> str:
@@ -366,14 +1016,61 @@ class Card:
         formatted = formatted.cyan("path").normal("=").normal(self.path)
         return formatted
 
+    def _header_line(self) -> str:
+        return "<!-- | " + json.dumps(self._pack()) + " | -->"
+
     def save(self):
-        """Save card to storage"""
+        """
+        Save card to storage
+
+        If front & back are not changed only the header is replaced,
+        rest of the file is copied as it is (without parsing it). With a
+        storage the file is left untouched in this case.
+        """
+        if self._body_dirty or not os.path.isfile(self._path):
+            self._save_all()
+        elif self._storage is None:
+            self._save_headers()
+        if self._storage is not None:
+            self._storage.write(self._path, self._pack())
+        self._body_dirty = False
+        METRICS.inc(SAVES)
+        if self._index is not None:
+            self._index.update(self)
+
+    def _save_headers(self):
+        directory = os.path.dirname(os.path.abspath(self._path))
+        handle, temp_path = tempfile.mkstemp(
+            prefix=".", suffix=TEMP_FILE_SUFFIX, dir=directory
+        )
+        try:
+            with open(handle, "wb") as target:
+                with open(self._path, "rb") as source:
+                    old_header = source.readline()
+                    newline = (
+                        b"\r\n" if old_header.endswith(b"\r\n") else b"\n"
+                    )
+                    target.write(self._header_line().encode(self._encoding))
+                    target.write(newline)
+                    shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+                    METRICS.inc(BYTES_READ, source.tell())
+                    METRICS.inc(BYTES_WRITTEN, target.tell())
+            shutil.copymode(self._path, temp_path)
+            # WHY: Card is either fully old or fully new, even on a crash
+            os.replace(temp_path, self._path)
+            METRICS.inc(HEADER_ONLY_SAVES)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _save_all(self):
         if not self._fully_loaded:
             self._load()
         with open(self._path, "w+", encoding=self._encoding) as h:
-            h.write("<!-- | ")
-            h.write(json.dumps(self._pack()))
-            h.write(" | -->")
+            h.write(self._header_line())
             h.write(NEWLINE)
             h.write("<!-- [[FRONT]] -->")
             h.write(NEWLINE)
@@ -383,13 +1080,16 @@ class Card:
             h.write(NEWLINE)
             h.write(self._back)
             h.write(NEWLINE)
+            h.flush()
+            METRICS.inc(BYTES_WRITTEN, os.fstat(h.fileno()).st_size)
 
-    def _load_headers(self):
+    def _load_headers(self, headers: Optional[dict] = None):
         try:
-            with open(self._path, "r", encoding=self._encoding) as h:
-                data = h.readline()
-                _, json_data, _ = data.split("|")
-                self._unpack(json.loads(json_data.strip()))
+            if headers is None and self._storage is not None:
+                headers = self._storage.read(self._path)
+            if headers is None:
+                headers = read_header(self._path, self._encoding)
+            self._unpack(headers)
         except FileNotFoundError:
             self._fully_loaded = True
         except (ValueError, KeyError) as ex:
@@ -419,5 +1119,7 @@ class Card:
 
             self._front = NEWLINE.join(front)
             self._back = NEWLINE.join(back)
+            METRICS.inc(BYTES_READ, os.fstat(h.fileno()).st_size)
 
         self._fully_loaded = True
+        METRICS.inc(BODIES_LOADED)
@@ -0,0 +1,317 @@
+"""
+Columnar storage of card meta data, used for batch scheduling of decks
+"""
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sbx.core.card import ALGO_SM2, REQUIRED_FIELDS, Card, CardMeta
+
+# Default values of algorithm registers (same as `sbx.core.card.Sm2`)
+DEFAULT_REPETITIONS = 0
+DEFAULT_INTERVAL = 1.0
+DEFAULT_EASINESS = 2.5
+_KNOWN_KEYS = set(REQUIRED_FIELDS + ["a", "b", "c"])
+
+
+class MetaColumns:
+    """
+    Meta data of many cards, one array per field
+
+    * `repetitions` - register `a` (`array` of `int`)
+    * `interval` - register `b` (`array` of `float`)
+    * `easiness` - register `c` (`array` of `float`)
+    * `last` - last session as UNIX timestamp (`array` of `int`)
+    * `next` - next session as UNIX timestamp (`array` of `int`)
+    * `actual_repetitions` - actual repetitions (`array` of `int`)
+    * `past_quality` - packed past qualities (`list` of `str`)
+    * `algo` - name of scheduling algorithm (`list` of interned `str`)
+
+    Row `i` of every column belongs to the same card.
+    """
+
+    def __init__(self):
+        self.repetitions = array("q")
+        self.interval = array("d")
+        self.easiness = array("d")
+        self.last = array("q")
+        self.next = array("q")
+        self.actual_repetitions = array("q")
+        self.past_quality: List[str] = []
+        self.algo: List[str] = []
+
+    @classmethod
+    def from_metas(cls, metas: Iterable[CardMeta]) -> "MetaColumns":
+        """
+        Create columns from card meta data objects
+
+        * `metas` - card meta data objects
+        """
+        columns = cls()
+        for meta in metas:
+            columns.append(meta)
+        return columns
+
+    def __len__(self):
+        return len(self.last)
+
+    def append(self, meta: CardMeta):
+        """
+        Add a row for given card meta data
+
+        * `meta` - card meta data
+        """
+        self.append_header(meta.to_dict())
+
+    def append_header(self, header: dict):
+        """
+        Add a row for a card header (such as `CardMeta.to_dict` output)
+
+        * `header` - header dictionary
+        """
+        self.repetitions.append(int(header.get("a", DEFAULT_REPETITIONS)))
+        self.interval.append(float(header.get("b", DEFAULT_INTERVAL)))
+        self.easiness.append(float(header.get("c", DEFAULT_EASINESS)))
+        self.last.append(header["last"])
+        self.next.append(header["next"])
+        self.actual_repetitions.append(
+            header.get("reps", len(header["pastq"]))
+        )
+        self.past_quality.append(header["pastq"])
+        self.algo.append(sys.intern(header["algo"]))
+
+    def store(self, row: int, meta: CardMeta):
+        """
+        Write a row back to a card meta data object
+
+        * `row` - row to read
+        * `meta` - card meta data to update (registers `a`, `b` & `c`
+            are always written)
+        """
+        repetitions = self.repetitions[row]
+        interval: float = self.interval[row]
+        meta.last_session = self.last[row]
+        meta.next_session = self.next[row]
+        meta.actual_repetitions = self.actual_repetitions[row]
+        meta.past_quality = [int(x) for x in self.past_quality[row]]
+        meta.algo = self.algo[row]
+        meta.algo_state["a"] = repetitions
+        # WHY: Sm2 keeps fixed intervals of first two repetitions as `int`,
+        #    other algorithms always keep a `float` (same as their `mark`)
+        if meta.algo == ALGO_SM2 and repetitions <= 2:
+            meta.algo_state["b"] = int(interval)
+        else:
+            meta.algo_state["b"] = interval
+        meta.algo_state["c"] = self.easiness[row]
+
+
+# Flags of registers present in a header
+REGISTER_A = 1
+REGISTER_B = 2
+REGISTER_C = 4
+REGISTER_B_INT = 8
+REGISTER_C_INT = 16
+
+
+def _registers(header: dict) -> int:
+    registers = 0
+    if "a" in header:
+        registers |= REGISTER_A
+    # WHY: Only Sm2 has `int` registers, other algorithms are given the
+    #    `float` their `mark` would give them
+    sm2 = header.get("algo") == ALGO_SM2
+    if "b" in header:
+        registers |= REGISTER_B
+        if sm2 and isinstance(header["b"], int):
+            registers |= REGISTER_B_INT
+    if "c" in header:
+        registers |= REGISTER_C
+        if sm2 and isinstance(header["c"], int):
+            registers |= REGISTER_C_INT
+    return registers
+
+
+class DeckColumns(MetaColumns):
+    """
+    Compact in-memory deck created by `sbx.core.study.CardStack.to_columns`
+
+    In addition to `MetaColumns`:
+
+    * Paths are stored as an index to a table of directories and
+        an interned file name.
+    * `algo` & `version` are interned strings.
+    * Registers other than `a`, `b` & `c` are only stored for the few cards
+        that have them.
+
+    Use `card` to create a `sbx.core.card.Card` for a row when needed.
+    """
+
+    def __init__(self, index=None):
+        """
+        Create an empty deck
+
+        * `index` - `sbx.core.index.HeaderIndex` given to created cards
+        """
+        super().__init__()
+        self._index = index
+        self._directories: List[str] = []
+        self._directory_ids: Dict[str, int] = {}
+        self.directory = array("l")
+        self.name: List[str] = []
+        self.version: List[str] = []
+        self.registers = bytearray()
+        self.extra: Dict[int, dict] = {}
+
+    def append_card(self, path: str, header: dict):
+        """
+        Add a card
+
+        * `path` - path of the card
+        * `header` - parsed header of the card
+        """
+        row = len(self)
+        self.append_header(header)
+        directory, name = os.path.split(path)
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = len(self._directories)
+            self._directories.append(directory)
+            self._directory_ids[directory] = directory_id
+        self.directory.append(directory_id)
+        self.name.append(sys.intern(name))
+        self.version.append(sys.intern(header["sbx"]))
+        # WHY: Many cards share same past qualities (specially new cards)
+        self.past_quality[row] = sys.intern(self.past_quality[row])
+        self.registers.append(_registers(header))
+        extra = {k: v for k, v in header.items() if k not in _KNOWN_KEYS}
+        if extra:
+            self.extra[row] = extra
+
+    def set_header(self, row: int, header: dict):
+        """
+        Replace header of a card (such as after it is marked)
+
+        * `row` - row of the card
+        * `header` - new header of the card
+        """
+        self.repetitions[row] = int(header.get("a", DEFAULT_REPETITIONS))
+        self.interval[row] = float(header.get("b", DEFAULT_INTERVAL))
+        self.easiness[row] = float(header.get("c", DEFAULT_EASINESS))
+        self.last[row] = header["last"]
+        self.next[row] = header["next"]
+        self.actual_repetitions[row] = header.get("reps", len(header["pastq"]))
+        self.past_quality[row] = sys.intern(header["pastq"])
+        self.algo[row] = sys.intern(header["algo"])
+        self.version[row] = sys.intern(header["sbx"])
+        self.registers[row] = _registers(header)
+        extra = {k: v for k, v in header.items() if k not in _KNOWN_KEYS}
+        if extra:
+            self.extra[row] = extra
+        else:
+            self.extra.pop(row, None)
+
+    def remove(self, row: int) -> Optional[str]:
+        """
+        Remove a card, last card is moved to its row
+
+        * `row` - row of the card
+
+        Returns path of the card that was moved (`None` if it was the last).
+        """
+        last = len(self) - 1
+        moved = None
+        if row != last:
+            moved = self.path(last)
+            self.set_header(row, self.header(last))
+            self.directory[row] = self.directory[last]
+            self.name[row] = self.name[last]
+        for column in [
+            self.repetitions,
+            self.interval,
+            self.easiness,
+            self.last,
+            self.next,
+            self.actual_repetitions,
+            self.past_quality,
+            self.directory,
+            self.name,
+            self.algo,
+            self.version,
+            self.registers,
+        ]:
+            del column[last]
+        self.extra.pop(last, None)
+        return moved
+
+    def path(self, row: int) -> str:
+        """
+        Get path of a card
+
+        * `row` - row of the card
+        """
+        return os.path.join(
+            self._directories[self.directory[row]], self.name[row]
+        )
+
+    def paths(self) -> Iterator[str]:
+        """Get path of every card"""
+        directories = self._directories
+        for directory, name in zip(self.directory, self.name):
+            yield os.path.join(directories[directory], name)
+
+    def header(self, row: int) -> dict:
+        """
+        Get header of a card (same as it was given to `append_card`)
+
+        * `row` - row of the card
+        """
+        registers = self.registers[row]
+        header: Dict[str, Any] = {}
+        if registers & REGISTER_A:
+            header["a"] = self.repetitions[row]
+        if registers & REGISTER_B:
+            interval = self.interval[row]
+            if registers & REGISTER_B_INT:
+                interval = int(interval)
+            header["b"] = interval
+        if registers & REGISTER_C:
+            easiness = self.easiness[row]
+            if registers & REGISTER_C_INT:
+                easiness = int(easiness)
+            header["c"] = easiness
+        header.update(self.extra.get(row, {}))
+        header["reps"] = self.actual_repetitions[row]
+        header["last"] = self.last[row]
+        header["next"] = self.next[row]
+        header["pastq"] = self.past_quality[row]
+        header["algo"] = self.algo[row]
+        header["sbx"] = self.version[row]
+        return header
+
+    def card(self, row: int) -> Card:
+        """
+        Create a card for a row (card file is not read)
+
+        * `row` - row of the card
+        """
+        return Card(
+            self.path(row), headers=self.header(row), index=self._index
+        )
+
+    def cards(self) -> Iterator[Card]:
+        """Create a card for every row"""
+        for row in range(len(self)):
+            yield self.card(row)
+
+    def select(self, mask: bytearray) -> "DeckColumns":
+        """
+        Create a new deck with only the rows set in given mask
+
+        * `mask` - `1` for rows to keep
+        """
+        deck = DeckColumns(self._index)
+        for row, keep in enumerate(mask):
+            if keep:
+                deck.append_card(self.path(row), self.header(row))
+        return deck
@@ -0,0 +1,606 @@
+"""
+Resident deck server, keeps headers of a deck in memory and answers
+queries over a local Unix socket
+
+Protocol is JSON-RPC 2.0, one JSON document per line in both directions.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from sbx.core.card import Card, CardMeta
+from sbx.core.columns import DeckColumns
+from sbx.core.forecast import forecast
+from sbx.core.index import HeaderIndex
+from sbx.core.query import Where, order_cards
+from sbx.core.reviewlog import ReviewLog
+from sbx.core.study import CardStack, selection_mask
+from sbx.core.walk import CARD_SUFFIX
+
+if TYPE_CHECKING:
+    from sbx.core.storage import MetaStorage
+    from sbx.core.watch import Changes, DeckWatcher
+
+NEWLINE = b"\n"
+SOCKET_PREFIX = "sbx-"
+SOCKET_SUFFIX = ".sock"
+SOCKET_MODE = 0o600
+# Seconds to wait for an answer from the server
+CLIENT_TIMEOUT = 30.0
+# Seconds between checks for stopping while watching a deck
+WATCH_INTERVAL = 0.5
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class DaemonError(Exception):
+    """Type of exception raised when the server returns an error"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def is_supported() -> bool:
+    """Can a deck server run on this platform?"""
+    import socket
+
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def socket_path(root: str) -> str:
+    """
+    Get path of the socket of the server for a deck
+
+    * `root` - root directory of the deck
+
+    Path depends on the user & absolute path of the deck, so each deck
+    has its own server.
+    """
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()
+    name = "{}{}-{}{}".format(
+        SOCKET_PREFIX, os.getuid(), digest[:16], SOCKET_SUFFIX
+    )
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+class DeckServer:
+    """
+    Headers of every card in a deck (scanned recursively) and the
+    methods that can be called on them
+
+    * `ping` - check server is alive, returns root of the deck
+    * `list` - path (relative to root) & header of selected cards
+    * `forecast` - same as `sbx.core.forecast.forecast`
+    * `mark` - mark a card with a quality & save it
+    * `update` - replace header of a card after a client saved it
+    * `rescan` - scan the deck again (such as after cards are added)
+    * `shutdown` - stop the server
+    """
+
+    def __init__(
+        self,
+        root: str,
+        jobs: int = 1,
+        watch: bool = False,
+        review_log: Optional[ReviewLog] = None,
+        storage: Optional["MetaStorage"] = None,
+    ):
+        """
+        Create a server for a deck (nothing is scanned until `load`)
+
+        * `root` - root directory of the deck
+        * `jobs` - number of workers used to read headers
+        * `watch` - watch the deck while serving, so cards created,
+            changed or removed by other programs are picked up
+            (see `sbx.core.watch.DeckWatcher`)
+        * `review_log` - log every card marked with the `mark` method
+        * `storage` - storage headers of the deck are kept in (same as
+            `sbx.core.study.CardStack`)
+        """
+        self._root = os.path.abspath(root)
+        self._jobs = jobs
+        self._watch = watch
+        self._review_log = review_log
+        self._storage = storage
+        self._watcher: Optional["DeckWatcher"] = None
+        self._stack: Optional[CardStack] = None
+        self._lock = threading.Lock()
+        self._index: Optional[HeaderIndex] = None
+        if storage is None:
+            self._index = HeaderIndex(self._root)
+        self._deck = DeckColumns(index=self._index)
+        self._rows: Dict[str, int] = {}
+        self._server: Any = None
+        self._methods: Dict[str, Callable[..., Any]] = {
+            "ping": self._ping,
+            "list": self._list,
+            "forecast": self._forecast,
+            "mark": self._mark,
+            "update": self._update,
+            "rescan": self._rescan,
+            "shutdown": self._shutdown,
+        }
+
+    @property
+    def root(self) -> str:
+        """Get root directory of the deck"""
+        return self._root
+
+    @property
+    def skipped(self) -> List[str]:
+        """Get paths of cards skipped by last scan (invalid headers)"""
+        return [] if self._stack is None else self._stack.skipped
+
+    def __len__(self):
+        return len(self._deck)
+
+    def load(self):
+        """Scan the deck (header index is used & updated)"""
+        stack = CardStack(
+            self._root, True, True, jobs=self._jobs, storage=self._storage
+        )
+        if self._watch and self._watcher is None:
+            # WHY: Start watching first so no change made during scan is lost
+            self._watcher = stack.watch()
+        deck = stack.to_columns()
+        rows = {path: row for row, path in enumerate(deck.paths())}
+        with self._lock:
+            self._stack = stack
+            self._index = stack.index
+            self._deck = deck
+            self._rows = rows
+
+    def apply(self, changes: "Changes"):
+        """
+        Update cards changed since they were scanned
+
+        * `changes` - changes found by a `sbx.core.watch.DeckWatcher`
+        """
+        if changes.overflow or self._stack is None:
+            self.load()
+            return
+        with self._lock:
+            for directory in changes.directories:
+                prefix = os.path.join(os.path.abspath(directory), "")
+                for path in [x for x in self._rows if x.startswith(prefix)]:
+                    self._remove(path)
+                    if self._index is not None:
+                        self._index.discard(path)
+            for path in changes.paths:
+                header = self._stack.read(path)
+                path = os.path.abspath(path)
+                row = self._rows.get(path)
+                if header is None:
+                    if row is not None:
+                        self._remove(path)
+                elif row is None:
+                    self._rows[path] = len(self._deck)
+                    self._deck.append_card(path, header)
+                else:
+                    self._deck.set_header(row, header)
+
+    def _remove(self, path: str):
+        row = self._rows.pop(path)
+        moved = self._deck.remove(row)
+        if moved is not None:
+            self._rows[moved] = row
+
+    def handle(self, request: Any) -> Optional[dict]:
+        """
+        Answer a single JSON-RPC request
+
+        * `request` - parsed request
+
+        Returns the response, `None` for notifications (no `id`).
+        """
+        if not isinstance(request, dict) or not isinstance(
+            request.get("method"), str
+        ):
+            return _error(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get("id")
+        method = self._methods.get(request["method"])
+        if method is None:
+            return _error(request_id, METHOD_NOT_FOUND, "Method not found")
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            return _error(request_id, INVALID_PARAMS, "Invalid params")
+        try:
+            result = method(**params)
+        except KeyError as ex:
+            return _error(request_id, INVALID_PARAMS, str(ex.args[0]))
+        except (TypeError, ValueError) as ex:
+            return _error(request_id, INVALID_PARAMS, str(ex))
+        except Exception as ex:  # noqa
+            return _error(request_id, SERVER_ERROR, str(ex))
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _ping(self) -> str:
+        return self._root
+
+    def _relative(self, path: str) -> str:
+        return path[len(self._root) + 1 :]
+
+    def _list(
+        self,
+        recursive: bool = True,
+        include_unscheduled: bool = False,
+        filter_to_leech: bool = False,
+        filter_to_last_zero: bool = False,
+        where: Optional[str] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, dict]]:
+        matcher = Where(where) if where is not None else None
+
+        def selected(deck: DeckColumns) -> Iterator[Tuple[str, dict]]:
+            mask = selection_mask(
+                deck, include_unscheduled, filter_to_leech, filter_to_last_zero
+            )
+            for row, keep in enumerate(mask):
+                if not keep:
+                    continue
+                relative = self._relative(deck.path(row))
+                if not recursive and os.sep in relative:
+                    continue
+                header = deck.header(row)
+                if matcher is None or matcher.matches(header):
+                    yield relative, header
+
+        with self._lock:
+            return list(order_cards(selected(self._deck), order, limit))
+
+    def _forecast(self, days: int = 14, as_of: Optional[int] = None) -> dict:
+        with self._lock:
+            result = forecast(self._deck, days, as_of)
+        return {
+            "start": result.start,
+            "due": result.due,
+            "overdue": result.overdue,
+            "never_studied": result.never_studied,
+            "later": result.later,
+        }
+
+    def _row(self, path: str) -> int:
+        row = self._rows.get(os.path.abspath(path))
+        if row is None:
+            raise KeyError("Unknown card {!r}".format(path))
+        return row
+
+    def _mark(self, path: str, quality: int) -> dict:
+        if not 0 <= quality <= 5:
+            raise ValueError("Quality must be 0-5 (inclusive)")
+        with self._lock:
+            row = self._row(path)
+            card = Card(
+                self._deck.path(row),
+                headers=self._deck.header(row),
+                index=self._index,
+                storage=self._storage,
+                review_log=self._review_log,
+            )
+            card.mark(quality)
+            card.save()
+            header = card.meta.to_dict()
+            self._deck.set_header(row, header)
+            return header
+
+    def _update(self, path: str, header: dict):
+        CardMeta().update_from_dict(header)
+        path = os.path.abspath(path)
+        if not path.startswith(os.path.join(self._root, "")):
+            raise ValueError("Card {!r} is not in this deck".format(path))
+        if not path.endswith(CARD_SUFFIX):
+            raise ValueError("Card {!r} is not a card file".format(path))
+        with self._lock:
+            row = self._rows.get(path)
+            if row is None:
+                self._rows[path] = len(self._deck)
+                self._deck.append_card(path, header)
+            else:
+                self._deck.set_header(row, header)
+            if self._index is not None:
+                self._index.update(Card(path, headers=header))
+            if self._storage is not None:
+                self._storage.write(path, header)
+
+    def _rescan(self) -> int:
+        self.load()
+        return len(self._deck)
+
+    def _shutdown(self):
+        if self._server is not None:
+            # WHY: `shutdown` waits for the serving loop, which is busy
+            #    answering this request, so do it in another thread
+            threading.Thread(target=self._server.shutdown).start()
+
+    def serve(self, path: Optional[str] = None):
+        """
+        Serve until `shutdown` is called (deck should be loaded first)
+
+        * `path` - path of the socket (defaults to `socket_path(root)`)
+
+        Raises `OSError` if a server is already running for the deck.
+        """
+        import socketserver
+
+        if path is None:
+            path = socket_path(self._root)
+        if os.path.exists(path):
+            if connect(self._root, path) is not None:
+                raise OSError("A server is already running at " + path)
+            # Left behind by a server that did not stop cleanly
+            os.unlink(path)
+        deck = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                    except ValueError:
+                        response = _error(None, PARSE_ERROR, "Parse error")
+                    else:
+                        response = deck.handle(request)
+                    if response is not None:
+                        self.wfile.write(
+                            json.dumps(response).encode("utf-8") + NEWLINE
+                        )
+                        self.wfile.flush()
+
+        class Server(
+            socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+        ):
+            daemon_threads = True
+
+        # WHY: Only this user should be able to read or mark cards
+        umask = os.umask(0o177)
+        try:
+            self._server = Server(path, Handler)
+        finally:
+            os.umask(umask)
+        stop = threading.Event()
+        watcher = None
+        if self._watch:
+            if self._watcher is None:
+                self.load()
+            watcher = threading.Thread(
+                target=self._watch_changes, args=(stop,), daemon=True
+            )
+            watcher.start()
+        try:
+            os.chmod(path, SOCKET_MODE)
+            self._server.serve_forever()
+        finally:
+            stop.set()
+            if watcher is not None:
+                watcher.join()
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            with self._lock:
+                if self._index is not None:
+                    self._index.save()
+
+    def _watch_changes(self, stop: threading.Event):
+        while not stop.is_set() and self._watcher is not None:
+            changes = self._watcher.poll(WATCH_INTERVAL)
+            if not changes:
+                continue
+            try:
+                self.apply(changes)
+            except OSError:
+                # WHY: A card can change again while it is read
+                continue
+
+
+def _error(request_id: Any, code: int, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
+
+
+class DeckClient:
+    """Connection to a deck server"""
+
+    def __init__(self, sock):
+        """
+        Create a client for a connected socket, use `connect` instead
+
+        * `sock` - connected socket
+        """
+        self._socket = sock
+        self._file = sock.makefile("rwb")
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Call a method of the server and wait for its result
+
+        * `method` - name of the method
+        * `params` - parameters of the method
+
+        Raises `DaemonError` if the server returns an error and
+        `OSError` if the connection is lost.
+        """
+        with self._lock:
+            self._next_id += 1
+            request = {
+                "jsonrpc": "2.0",
+                "id": self._next_id,
+                "method": method,
+                "params": params,
+            }
+            self._file.write(json.dumps(request).encode("utf-8") + NEWLINE)
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("Deck server closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            error = response["error"]
+            raise DaemonError(error["code"], error["message"])
+        return response["result"]
+
+    def update(self, card: Card):
+        """
+        Send header of a card after it is saved, so a client can be used
+        as the `index` of a `sbx.core.card.Card`
+
+        * `card` - a card that was just written
+        """
+        try:
+            self.call(
+                "update",
+                path=os.path.abspath(card.path),
+                header=card.meta.to_dict(),
+            )
+        except (OSError, ValueError, DaemonError):
+            # WHY: Card is already saved, server only has a copy of it
+            pass
+
+    def close(self):
+        """Close the connection"""
+        self._file.close()
+        self._socket.close()
+
+
+def connect(root: str, path: Optional[str] = None) -> Optional[DeckClient]:
+    """
+    Connect to the server of a deck, `None` if it is not running
+
+    * `root` - root directory of the deck
+    * `path` - path of the socket (defaults to `socket_path(root)`)
+    """
+    if not is_supported():
+        return None
+    if path is None:
+        path = socket_path(root)
+    if not os.path.exists(path):
+        return None
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return DeckClient(sock)
+
+
+class RemoteCardStack:
+    """Same as `sbx.core.study.CardStack` but answered by a deck server"""
+
+    def __init__(
+        self,
+        client: DeckClient,
+        path: str,
+        recursive: bool = False,
+        include_unscheduled: bool = False,
+        filter_to_leech: bool = False,
+        filter_to_last_zero: bool = False,
+        where: Optional[Where] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        review_log: Optional[ReviewLog] = None,
+    ):
+        """
+        Create a stack
+
+        * `client` - client connected to the server of `path`
+        * `path` - root directory of the deck
+        * other parameters are same as `sbx.core.study.CardStack`
+        """
+        self._client = client
+        self._path = os.path.normpath(path)
+        self._review_log = review_log
+        self._params: Dict[str, Any] = {
+            "recursive": recursive,
+            "include_unscheduled": include_unscheduled,
+            "filter_to_leech": filter_to_leech,
+            "filter_to_last_zero": filter_to_last_zero,
+        }
+        if where is not None:
+            self._params["where"] = where.expression
+        # WHY: Only `iter` is ordered & limited, same as `CardStack`
+        self._order_params: Dict[str, Any] = {}
+        if order is not None:
+            self._order_params["order"] = order
+        if limit is not None:
+            self._order_params["limit"] = limit
+
+    @property
+    def path(self) -> str:
+        """Get path this stack is for"""
+        return self._path
+
+    @property
+    def index(self) -> DeckClient:
+        """Get client, cards created by this stack update the server"""
+        return self._client
+
+    @property
+    def storage(self) -> None:
+        """Get storage, headers are always kept in card files"""
+        return None
+
+    @property
+    def skipped(self) -> List[str]:
+        """Get skipped cards, these are reported by the server instead"""
+        return []
+
+    def _iter_headers(self, **params: Any) -> Iterator[Tuple[str, dict]]:
+        # WHY: Same paths as `sbx.core.walk.walk_cards`
+        prefix = (
+            "" if self._path == os.curdir else os.path.join(self._path, "")
+        )
+        params.update(self._params)
+        for relative, header in self._client.call("list", **params):
+            yield prefix + relative, header
+
+    def iter(self) -> Iterator[Card]:
+        """Get cards we need to study"""
+        for path, header in self._iter_headers(**self._order_params):
+            yield Card(
+                path,
+                headers=header,
+                index=self._client,
+                review_log=self._review_log,
+            )
+
+    def to_columns(self) -> DeckColumns:
+        """Get cards we need to study as a `sbx.core.columns.DeckColumns`"""
+        deck = DeckColumns(index=self._client)
+        for path, header in self._iter_headers():
+            deck.append_card(path, header)
+        return deck
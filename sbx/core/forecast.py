@@ -0,0 +1,89 @@
+"""
+Projection of number of cards due each day
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sbx.core.columns import MetaColumns
+from sbx.core.utility import DAY_IN_SECONDS, UTC_TIMEZONE, unix_time
+
+
+class Forecast:
+    """
+    Number of cards due each day, starting from a given day
+
+    * `start` - UNIX timestamp of the start of first day (UTC)
+    * `due` - number of cards due on each day (`due[0]` is first day)
+    * `overdue` - cards that were due before first day
+    * `never_studied` - cards that were never studied (always due)
+    * `later` - cards due after last day
+    """
+
+    def __init__(self, start: int, days: int):
+        self.start = start
+        self.due: List[int] = [0] * days
+        self.overdue = 0
+        self.never_studied = 0
+        self.later = 0
+
+    @property
+    def total(self) -> int:
+        """Get total number of cards counted"""
+        return sum(self.due) + self.overdue + self.never_studied + self.later
+
+    def day(self, offset: int) -> datetime:
+        """
+        Get a day of the forecast
+
+        * `offset` - index of the day in `due`
+        """
+        return datetime.fromtimestamp(
+            self.start + offset * DAY_IN_SECONDS, UTC_TIMEZONE
+        )
+
+
+def parse_date(text: str) -> int:
+    """
+    Parse a `YYYY-MM-DD` date to UNIX timestamp of its start (UTC)
+
+    * `text` - date as a string
+    """
+    date = datetime.strptime(text, "%Y-%m-%d")
+    return int(date.replace(tzinfo=UTC_TIMEZONE).timestamp())
+
+
+def forecast(
+    columns: MetaColumns, days: int = 14, as_of: Optional[int] = None
+) -> Forecast:
+    """
+    Count cards due each day in a single pass over given columns
+
+    * `columns` - meta data of cards
+    * `days` - number of days to forecast
+    * `as_of` - UNIX timestamp of the first day (defaults to now)
+
+    Days are UTC days, same as the days used for scheduling.
+    """
+    if days < 1:
+        raise ValueError("Need to forecast at least one day")
+    if as_of is None:
+        as_of = unix_time()
+    today = as_of // DAY_IN_SECONDS
+    result = Forecast(today * DAY_IN_SECONDS, days)
+    due = result.due
+    overdue = never_studied = later = 0
+    for next_, reps in zip(columns.next, columns.actual_repetitions):
+        if next_ == -1 or reps == 0:
+            never_studied += 1
+            continue
+        offset = next_ // DAY_IN_SECONDS - today
+        if offset < 0:
+            overdue += 1
+        elif offset < days:
+            due[offset] += 1
+        else:
+            later += 1
+    result.overdue = overdue
+    result.never_studied = never_studied
+    result.later = later
+    return result
@@ -0,0 +1,337 @@
+"""
+Create many cards at once from CSV, TSV or JSONL rows
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+from sbx.core.card import DEFAULT_ALGO, Card, get_algorithm
+from sbx.core.walk import CARD_SUFFIX
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from sbx.core.storage import MetaStorage
+
+SOURCE_CSV = "csv"
+SOURCE_TSV = "tsv"
+SOURCE_JSONL = "jsonl"
+SOURCE_FORMATS = [SOURCE_CSV, SOURCE_TSV, SOURCE_JSONL]
+# File name suffix -> format of the source
+SOURCE_SUFFIXES = {
+    ".csv": SOURCE_CSV,
+    ".tsv": SOURCE_TSV,
+    ".tab": SOURCE_TSV,
+    ".jsonl": SOURCE_JSONL,
+    ".ndjson": SOURCE_JSONL,
+}
+# Keys of a JSONL object used when none are given
+DEFAULT_FRONT_KEY = "front"
+DEFAULT_BACK_KEY = "back"
+# Characters of the front used in a file name
+NAME_LENGTH = 40
+# Characters of the hash of the front used in a file name
+HASH_LENGTH = 10
+# Cards written by a single task of a writer thread
+WRITE_CHUNK_SIZE = 32
+# Tasks queued for each writer thread, bounds memory of huge sources
+CHUNKS_PER_WORKER = 4
+
+_NOT_NAME = re.compile(r"[\W_]+")
+
+# (path, content) of a card to write
+CardContent = Tuple[str, List[str]]
+
+
+class InvalidSource(ValueError):
+    """Type of exception raised for a source that cannot be imported"""
+
+    pass
+
+
+class ImportResult:
+    """
+    Outcome of `import_cards`
+
+    * `created` - paths of cards written
+    * `duplicates` - rows skipped as their card already exists
+    * `invalid` - rows skipped as they have no front or no back
+    * `failed` - `(path, exception)` of cards that could not be written
+    """
+
+    def __init__(self):
+        self.created: List[str] = []
+        self.duplicates = 0
+        self.invalid = 0
+        self.failed: List[Tuple[str, Exception]] = []
+
+
+def source_format(path: str) -> str:
+    """
+    Guess format of a source from its file name
+
+    * `path` - path of the source
+
+    Raises `InvalidSource` if the format is not known.
+    """
+    _, suffix = os.path.splitext(path)
+    try:
+        return SOURCE_SUFFIXES[suffix.lower()]
+    except KeyError:
+        raise InvalidSource(
+            "Cannot guess format of {!r}, use one of: {}".format(
+                path, ", ".join(SOURCE_FORMATS)
+            )
+        )
+
+
+def set_content(card: Card, content: List[str], style: bool):
+    """
+    Set front & back of a card
+
+    * `card` - card to change
+    * `content` - first element is the front, rest are lines of the back
+    * `style` - prepend front with `# ` and each line of back with `* `
+    """
+    title_prefix = ""
+    answer_prefix = ""
+    if style:
+        title_prefix = "# "
+        answer_prefix = "* "
+    card.front = title_prefix + content[0]
+    if len(content) > 1:
+        card.back = os.linesep.join([answer_prefix + x for x in content[1:]])
+
+
+def card_name(front: str) -> str:
+    """
+    Get file name of a card, same front always gets the same name
+
+    * `front` - front of the card
+    """
+    front = front.strip()
+    digest = hashlib.sha1(front.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    slug = _NOT_NAME.sub("-", front.lower())[:NAME_LENGTH].strip("-")
+    return "{}-{}{}".format(slug or "card", digest, CARD_SUFFIX)
+
+
+def _column(spec: str, names: Optional[List[str]]) -> int:
+    if spec.isdigit() and int(spec) > 0:
+        return int(spec) - 1
+    if names is None:
+        raise InvalidSource(
+            "Column {!r} must be a number (starting from 1) without a"
+            " header row".format(spec)
+        )
+    try:
+        return names.index(spec)
+    except ValueError:
+        raise InvalidSource("Unknown column {!r}".format(spec))
+
+
+def _front(value: object) -> List[str]:
+    front = "" if value is None else str(value).strip()
+    return [front] if front else []
+
+
+def _text(value: object) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [y for x in value for y in _text(x)]
+    return [x.strip() for x in str(value).splitlines() if x.strip()]
+
+
+def _read_table(
+    stream: TextIO,
+    delimiter: str,
+    front: Optional[str],
+    back: Optional[List[str]],
+    header: bool,
+) -> Iterator[List[str]]:
+    reader = csv.reader(stream, delimiter=delimiter)
+    names = None
+    if header:
+        names = next(reader, None)
+        if names is None:
+            return
+        names = [x.strip() for x in names]
+    front_column = _column(front, names) if front else 0
+    back_columns = [_column(x, names) for x in back] if back else None
+    for row in reader:
+        if not row:
+            continue
+        value = row[front_column] if front_column < len(row) else None
+        content = _front(value)
+        if not content:
+            yield content
+            continue
+        if back_columns is None:
+            columns = [x for x in range(len(row)) if x != front_column]
+        else:
+            columns = [x for x in back_columns if x < len(row)]
+        yield content + [y for x in columns for y in _text(row[x])]
+
+
+def _read_jsonl(
+    stream: TextIO, front: Optional[str], back: Optional[List[str]]
+) -> Iterator[List[str]]:
+    front = front or DEFAULT_FRONT_KEY
+    back = back or [DEFAULT_BACK_KEY]
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as ex:
+            raise InvalidSource(
+                "Line {} is not valid JSON: {}".format(number, ex)
+            )
+        if not isinstance(row, dict):
+            raise InvalidSource("Line {} is not an object".format(number))
+        content = _front(row.get(front))
+        if not content:
+            yield content
+            continue
+        yield content + [y for x in back for y in _text(row.get(x))]
+
+
+def read_source(
+    stream: TextIO,
+    format_: str,
+    front: Optional[str] = None,
+    back: Optional[List[str]] = None,
+    header: bool = False,
+) -> Iterator[List[str]]:
+    """
+    Read rows of a source as content of cards (see `set_content`)
+
+    * `stream` - source to read
+    * `format_` - one of `SOURCE_FORMATS`
+    * `front` - column (name or number starting from 1) or JSONL key of
+        the front (defaults to first column or `front`)
+    * `back` - columns or JSONL keys of the back (defaults to all other
+        columns or `back`), each non-empty line of them is a line of back
+    * `header` - first row of a CSV or TSV source contains column names
+
+    Rows are read one at a time, a row without a front or back gives a
+    list with less than two elements.
+    """
+    if format_ == SOURCE_JSONL:
+        return _read_jsonl(stream, front, back)
+    if format_ not in SOURCE_FORMATS:
+        raise InvalidSource("Unknown format {!r}".format(format_))
+    delimiter = "\t" if format_ == SOURCE_TSV else ","
+    return _read_table(stream, delimiter, front, back, header)
+
+
+def _write_cards(
+    cards: List[CardContent],
+    style: bool,
+    algo: str = DEFAULT_ALGO,
+    storage: Optional["MetaStorage"] = None,
+) -> List[Tuple[str, Optional[Exception]]]:
+    results: List[Tuple[str, Optional[Exception]]] = []
+    for path, content in cards:
+        try:
+            card = Card(path, storage=storage)
+            # WHY: Storage may still have a header of a removed card
+            card.reset(algo)
+            set_content(card, content, style)
+            card.save()
+            results.append((path, None))
+        except (IOError, OSError) as ex:
+            results.append((path, ex))
+    return results
+
+
+def import_cards(
+    rows: Iterable[List[str]],
+    directory: str,
+    style: bool = False,
+    jobs: int = 1,
+    algo: str = DEFAULT_ALGO,
+    storage: Optional["MetaStorage"] = None,
+) -> ImportResult:
+    """
+    Write a card for each row
+
+    * `rows` - content of each card (see `read_source`)
+    * `directory` - directory to write cards to (created if missing)
+    * `style` - same as `set_content`
+    * `jobs` - number of threads writing cards
+    * `algo` - scheduling algorithm of created cards (one of
+        `sbx.core.card.ALGORITHMS`)
+    * `storage` - storage headers of the deck are kept in (same as
+        `sbx.core.card.Card`)
+
+    Cards are named with `card_name`, so a row is skipped as a duplicate
+    if its card already exists (such as when a source is imported again).
+    """
+    if jobs < 1:
+        raise ValueError("Number of jobs must be at least 1")
+    get_algorithm(algo)
+    os.makedirs(directory, exist_ok=True)
+    result = ImportResult()
+    seen: Set[str] = set()
+
+    def cards() -> Iterator[CardContent]:
+        for content in rows:
+            if len(content) < 2:
+                result.invalid += 1
+                continue
+            name = card_name(content[0])
+            path = os.path.join(directory, name)
+            if name in seen or os.path.exists(path):
+                result.duplicates += 1
+                continue
+            seen.add(name)
+            yield path, content
+
+    def collect(results: List[Tuple[str, Optional[Exception]]]):
+        for path, error in results:
+            if error is None:
+                result.created.append(path)
+            else:
+                result.failed.append((path, error))
+
+    if jobs == 1:
+        for card in cards():
+            collect(_write_cards([card], style, algo, storage))
+        return result
+    # WHY: Only imported when needed as it is slow to import
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    max_pending = jobs * CHUNKS_PER_WORKER
+    pending: Set["Future"] = set()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        chunk: List[CardContent] = []
+        for card in cards():
+            chunk.append(card)
+            if len(chunk) < WRITE_CHUNK_SIZE:
+                continue
+            pending.add(pool.submit(_write_cards, chunk, style, algo, storage))
+            chunk = []
+            # WHY: Keep reading the source while cards are written, but
+            #    only keep a bounded amount of cards in memory
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+        if chunk:
+            pending.add(pool.submit(_write_cards, chunk, style, algo, storage))
+        for future in pending:
+            collect(future.result())
+    return result
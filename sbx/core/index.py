@@ -0,0 +1,273 @@
+"""
+Persistent header index, so unchanged cards are not reopened on every scan
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILE_NAME = ".sbx-index"
+# Increased when cached headers are no longer valid (2 - `algo` is checked)
+INDEX_VERSION = 2
+COMPACT_SLACK = 100
+NEWLINE = "\n"
+
+# Parts of a path (following a separator) that make it not relative or
+#    not normalized
+_NOT_PLAIN = [os.sep + os.curdir, os.sep + os.sep]
+if os.altsep:
+    _NOT_PLAIN.append(os.altsep)
+if os.name == "nt":
+    _NOT_PLAIN.append(":")
+
+# Position of values in an index entry
+MTIME_CELL = 0
+SIZE_CELL = 1
+HEADER_CELL = 2
+
+
+def _dump_entry(key: str, entry: List) -> str:
+    return json.dumps([key] + entry, separators=(",", ":")) + NEWLINE
+
+
+def _is_plain(relative: str) -> bool:
+    """Is given path relative & normalized (no `.`, `..` or empty parts)"""
+    # WHY: A leading separator so first part is checked as well
+    path = os.sep + relative
+    for part in _NOT_PLAIN:
+        if part in path:
+            return False
+    return bool(relative)
+
+
+class HeaderIndex:
+    """
+    Index of card headers stored at the root of a deck
+
+    Each entry is keyed by path (relative to root) and holds modification
+    time, size and parsed header of the card. Header is `None` for files
+    that are not valid cards. An entry is only used if both modification
+    time & size of the file are unchanged.
+
+    Index file is a JSON document per line, first line is a version marker
+    and each following line is `[path, mtime_ns, size, header]`. Later lines
+    replace earlier lines for the same path, and `[path]` removes it.
+
+    Safe to use from many threads (such as a background scan and a saver).
+    """
+
+    def __init__(self, root: str):
+        """
+        Create an index for a deck
+
+        * `root` - root directory of the deck (index file is stored here)
+        """
+        self._root = os.path.abspath(root)
+        # Same prefix as paths found by `sbx.core.walk.walk_cards` of root
+        root = os.path.normpath(root)
+        self._prefix = "" if root == os.curdir else os.path.join(root, "")
+        self._file = os.path.join(self._root, INDEX_FILE_NAME)
+        self._entries: Dict[str, List] = {}
+        self._loaded = False
+        self._dirty = False
+        # WHY: Reentrant, public methods call each other (such as `record`
+        #    calling `put`)
+        self._lock = threading.RLock()
+
+    @property
+    def file(self) -> str:
+        """Get path of the index file"""
+        return self._file
+
+    def __len__(self):
+        with self._lock:
+            self.load()
+            return len(self._entries)
+
+    def _key(self, path: str) -> str:
+        # WHY: `os.path.relpath` is slow, keys of paths found by a scan of
+        #    root are taken by removing the prefix instead
+        if path.startswith(self._prefix):
+            relative = path[len(self._prefix) :]
+            if _is_plain(relative):
+                return relative
+        return os.path.relpath(os.path.abspath(path), self._root)
+
+    def load(self):
+        """Load index from disk (a missing or broken index is ignored)"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            lines = 0
+            try:
+                with open(self._file, "r", encoding="utf-8") as h:
+                    marker = json.loads(h.readline())
+                    if marker != {"sbx-index": INDEX_VERSION}:
+                        return
+                    for line in h:
+                        entry = json.loads(line)
+                        lines += 1
+                        if len(entry) == 1:
+                            # Removed entry
+                            self._entries.pop(entry[0], None)
+                            continue
+                        key, mtime, size, header = entry
+                        self._entries[key] = [mtime, size, header]
+            except (OSError, ValueError, TypeError):
+                self._entries = {}
+                return
+            # WHY: Updates are appended, rewrite index if there are too many
+            if lines > 2 * len(self._entries) + COMPACT_SLACK:
+                self._dirty = True
+
+    def save(self):
+        """Write index to disk if it has changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            temp_file = self._file + ".tmp"
+            try:
+                with open(temp_file, "w", encoding="utf-8") as h:
+                    h.write(json.dumps({"sbx-index": INDEX_VERSION}))
+                    h.write(NEWLINE)
+                    for key, entry in self._entries.items():
+                        h.write(_dump_entry(key, entry))
+                os.replace(temp_file, self._file)
+                self._dirty = False
+            except OSError:
+                # WHY: Index is only a cache, a read only deck still works
+                pass
+
+    def _append(self, key: str):
+        if self._dirty or not os.path.isfile(self._file):
+            # Entry will be written with next save
+            self._dirty = True
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            line = json.dumps([key]) + NEWLINE
+        else:
+            line = _dump_entry(key, entry)
+        try:
+            with open(self._file, "a", encoding="utf-8") as h:
+                h.write(line)
+        except OSError:
+            pass
+
+    def lookup(
+        self, path: str, stat_result: os.stat_result
+    ) -> Tuple[bool, Optional[dict]]:
+        """
+        Find header of a card if the index is up to date for it
+
+        * `path` - path of the card
+        * `stat_result` - current `os.stat` result of the card
+
+        Returns a tuple of `(hit, header)`, `header` is `None` for
+        files known to be invalid cards.
+        """
+        with self._lock:
+            self.load()
+            entry = self._entries.get(self._key(path))
+            if (
+                entry is None
+                or entry[MTIME_CELL] != stat_result.st_mtime_ns
+                or entry[SIZE_CELL] != stat_result.st_size
+            ):
+                return False, None
+            return True, entry[HEADER_CELL]
+
+    def signature(self, path: str) -> Optional[Tuple[int, int]]:
+        """
+        Get `(mtime_ns, size)` a card had when it was indexed
+
+        * `path` - path of the card
+        """
+        with self._lock:
+            self.load()
+            entry = self._entries.get(self._key(path))
+            if entry is None:
+                return None
+            return entry[MTIME_CELL], entry[SIZE_CELL]
+
+    def put(
+        self, path: str, stat_result: os.stat_result, header: Optional[dict]
+    ):
+        """
+        Store header of a card
+
+        * `path` - path of the card
+        * `stat_result` - `os.stat` result of the card when header was read
+        * `header` - parsed header, `None` if it's not a valid card
+        """
+        with self._lock:
+            self.load()
+            self._entries[self._key(path)] = [
+                stat_result.st_mtime_ns,
+                stat_result.st_size,
+                header,
+            ]
+            self._dirty = True
+
+    def discard(self, path: str):
+        """
+        Remove a card from the index
+        (This is appended to the index file right away)
+
+        * `path` - path of the card
+        """
+        with self._lock:
+            self.load()
+            key = self._key(path)
+            if self._entries.pop(key, None) is not None:
+                self._append(key)
+
+    def record(
+        self, path: str, stat_result: os.stat_result, header: Optional[dict]
+    ):
+        """
+        Same as `put`, but entry is appended to the index file right away
+
+        * `path` - path of the card
+        * `stat_result` - `os.stat` result of the card when header was read
+        * `header` - parsed header, `None` if it's not a valid card
+        """
+        with self._lock:
+            dirty = self._dirty
+            self.put(path, stat_result, header)
+            self._dirty = dirty
+            self._append(self._key(path))
+
+    def update(self, card):
+        """
+        Refresh entry of a card after it is saved
+        (This is appended to the index file right away)
+
+        * `card` - a `sbx.core.card.Card` that was just written
+        """
+        try:
+            stat_result = os.stat(card.path)
+        except OSError:
+            self.discard(card.path)
+            return
+        self.record(card.path, stat_result, card.meta.to_dict())
+
+    def prune(self, seen: Iterable[str], recursive: bool):
+        """
+        Remove entries of files that no longer exist
+
+        * `seen` - paths of all files found in a complete scan
+        * `recursive` - was the scan recursive
+            (if not only top level entries are pruned)
+        """
+        with self._lock:
+            self.load()
+            keep = {self._key(x) for x in seen}
+            for key in list(self._entries.keys()):
+                if key in keep:
+                    continue
+                if not recursive and os.sep in key:
+                    continue
+                del self._entries[key]
+                self._dirty = True
@@ -0,0 +1,133 @@
+"""
+Counters of work done while scanning decks & studying cards
+
+Counters are always on (incrementing one is a dictionary update), read
+them with `METRICS.snapshot()` or write them with `METRICS.write(path)`.
+
+Bytes read by `process` scan workers are not counted as they are read in
+another process, all other counters are updated in this process.
+"""
+import json
+import os
+import tempfile
+import threading
+from typing import Dict
+
+FILES_VISITED = "files_visited"
+HEADERS_PARSED = "headers_parsed"
+HEADERS_INVALID = "headers_invalid"
+INDEX_HITS = "index_hits"
+INDEX_MISSES = "index_misses"
+BODIES_LOADED = "bodies_loaded"
+BYTES_READ = "bytes_read"
+BYTES_WRITTEN = "bytes_written"
+SAVES = "saves"
+HEADER_ONLY_SAVES = "header_only_saves"
+CARDS_SHOWN = "cards_shown"
+CARDS_ANSWERED = "cards_answered"
+SAVE_FAILURES = "save_failures"
+REVIEWS_LOGGED = "reviews_logged"
+
+# Name & description of every counter
+COUNTERS = {
+    FILES_VISITED: "Card files found while walking a deck",
+    HEADERS_PARSED: "Card headers read & parsed from files",
+    HEADERS_INVALID: "Card files skipped due to an invalid header",
+    INDEX_HITS: "Card headers taken from the header index",
+    INDEX_MISSES: "Card headers not found or outdated in the header index",
+    BODIES_LOADED: "Card files fully loaded (front & back)",
+    BYTES_READ: "Bytes read from card files",
+    BYTES_WRITTEN: "Bytes written to card files",
+    SAVES: "Cards saved",
+    HEADER_ONLY_SAVES: "Cards saved by replacing only the header",
+    CARDS_SHOWN: "Cards shown in study sessions",
+    CARDS_ANSWERED: "Cards marked in study sessions",
+    SAVE_FAILURES: "Cards that could not be saved in study sessions",
+    REVIEWS_LOGGED: "Reviews appended to the review log",
+}
+PROMETHEUS_PREFIX = "sbx_"
+PROMETHEUS_SUFFIX = ".prom"
+FILE_MODE = 0o644
+
+
+class Metrics:
+    """Registry of counters, safe to use from many threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+
+    def inc(self, name: str, amount: int = 1):
+        """
+        Increment a counter
+
+        * `name` - name of the counter (one of `COUNTERS`)
+        * `amount` - amount to add
+        """
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, name: str) -> int:
+        """
+        Get current value of a counter
+
+        * `name` - name of the counter
+        """
+        with self._lock:
+            return self._counters[name]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Get a copy of all counters"""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Set all counters to zero"""
+        with self._lock:
+            self._counters = dict.fromkeys(COUNTERS, 0)
+
+    def to_json(self) -> str:
+        """Get all counters as a JSON object"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Get all counters in Prometheus text format"""
+        lines = []
+        for name, value in self.snapshot().items():
+            metric = PROMETHEUS_PREFIX + name + "_total"
+            lines.append("# HELP {} {}".format(metric, COUNTERS[name]))
+            lines.append("# TYPE {} counter".format(metric))
+            lines.append("{} {}".format(metric, value))
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """
+        Write all counters to a file
+
+        * `path` - a `.prom` file gets Prometheus text format (for the
+            textfile collector of node exporter), any other file gets JSON
+
+        File is replaced atomically so a collector never sees half of it.
+        """
+        if path.endswith(PROMETHEUS_SUFFIX):
+            text = self.to_prometheus()
+        else:
+            text = self.to_json()
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temp_path = tempfile.mkstemp(prefix=".", dir=directory)
+        try:
+            with open(handle, "w", encoding="utf-8") as h:
+                h.write(text + "\n")
+            # WHY: `mkstemp` creates files only readable by the owner
+            os.chmod(temp_path, FILE_MODE)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+
+# Registry used by SBX
+METRICS = Metrics()
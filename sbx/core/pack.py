@@ -0,0 +1,291 @@
+"""
+Pack a whole deck into a single JSONL file (optionally gzip compressed)
+and restore it
+
+First line of a pack is `{"sbx-pack": "v1"}`, every other line is a card:
+`{"path": "relative/card.md", "header": {...}, "front": ..., "back": ...}`
+"""
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+from sbx.core.card import Card, InvalidCardLoadAttempted
+
+if TYPE_CHECKING:
+    from sbx.core.storage import MetaStorage
+
+PACK_KEY = "sbx-pack"
+PACK_VERSION = "v1"
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_SUFFIX = ".gz"
+# Write to or read from standard output / input
+STDIO = "-"
+# Bytes buffered while reading or writing a pack
+BUFFER_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+FILE_MODE = 0o644
+NEWLINE = "\n"
+# Characters a packed path cannot have, these are separators (or drive
+#    prefixes) on Windows
+UNSAFE_PATH_CHARACTERS = "\\:"
+
+# (relative path, header, front, back) of a packed card
+PackedCard = Tuple[str, dict, str, str]
+
+
+class InvalidPack(ValueError):
+    """Type of exception raised for a file that is not a valid pack"""
+
+    pass
+
+
+class PackResult:
+    """
+    Outcome of `export_deck` or `import_pack`
+
+    * `cards` - cards written
+    * `skipped` - cards not written (invalid cards when exporting, cards
+        that already exist when importing)
+    * `invalid` - paths of existing cards that are not overwritten when
+        importing as they cannot be read (these are not in `skipped`)
+    """
+
+    def __init__(self):
+        self.cards = 0
+        self.skipped = 0
+        self.invalid: List[str] = []
+
+
+def _relative(path: str, root: str) -> str:
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def write_pack(cards: Iterable[Card], root: str, stream: TextIO) -> PackResult:
+    """
+    Write cards to a stream as a pack
+
+    * `cards` - cards to write
+    * `root` - root directory of the deck, paths are stored relative to it
+    * `stream` - stream to write to
+
+    Cards are read & written one at a time.
+    """
+    result = PackResult()
+    stream.write(json.dumps({PACK_KEY: PACK_VERSION}) + NEWLINE)
+    for card in cards:
+        try:
+            record = {
+                "path": _relative(card.path, root),
+                "header": card.meta.to_dict(),
+                "front": card.front,
+                "back": card.back,
+            }
+        except (OSError, UnicodeDecodeError, InvalidCardLoadAttempted):
+            # WHY: Card was removed or broken after it was found
+            result.skipped += 1
+            continue
+        stream.write(json.dumps(record) + NEWLINE)
+        result.cards += 1
+    return result
+
+
+def _text_writer(raw: BinaryIO, compress: bool) -> io.TextIOWrapper:
+    output: BinaryIO = raw
+    if compress:
+        output = gzip.GzipFile(  # type: ignore
+            fileobj=raw, mode="wb", compresslevel=COMPRESS_LEVEL
+        )
+    return io.TextIOWrapper(
+        io.BufferedWriter(output, BUFFER_SIZE),  # type: ignore
+        encoding="utf-8",
+    )
+
+
+def export_deck(
+    cards: Iterable[Card],
+    root: str,
+    path: str,
+    compress: Optional[bool] = None,
+) -> PackResult:
+    """
+    Write cards to a pack file
+
+    * `cards` - cards to write
+    * `root` - root directory of the deck
+    * `path` - pack to write (`"-"` for standard output)
+    * `compress` - compress with gzip (defaults to `True` if `path`
+        ends with `.gz`)
+
+    File is replaced atomically, a failed export leaves no partial pack.
+    """
+    if compress is None:
+        compress = path.endswith(GZIP_SUFFIX)
+    if path == STDIO:
+        stdout = sys.stdout.buffer
+        stream = _text_writer(stdout, compress)
+        try:
+            return write_pack(cards, root, stream)
+        finally:
+            # WHY: Finish gzip stream but keep standard output open
+            output = stream.detach().detach()  # type: ignore
+            if output is not stdout:
+                output.close()
+            stdout.flush()
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(prefix=".", dir=directory)
+    try:
+        with open(handle, "wb") as raw:
+            with _text_writer(raw, compress) as stream:
+                result = write_pack(cards, root, stream)
+        # WHY: `mkstemp` creates files only readable by the owner
+        os.chmod(temp_path, FILE_MODE)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return result
+
+
+def read_pack(stream: TextIO) -> Iterator[PackedCard]:
+    """
+    Read cards of a pack one at a time
+
+    * `stream` - stream to read from
+
+    Raises `InvalidPack` if the stream is not a valid pack.
+    """
+    try:
+        first = json.loads(stream.readline() or "null")
+    except ValueError:
+        first = None
+    if not isinstance(first, dict) or first.get(PACK_KEY) != PACK_VERSION:
+        raise InvalidPack("Not a {} sbx pack".format(PACK_VERSION))
+    for number, line in enumerate(stream, 2):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            path = record["path"]
+            header = record["header"]
+            front = record["front"]
+            back = record["back"]
+        except (ValueError, KeyError, TypeError) as ex:
+            raise InvalidPack(
+                "Line {} is not a valid card: {}".format(number, ex)
+            )
+        parts = path.split("/") if isinstance(path, str) else []
+        if (
+            not parts
+            or path.startswith("/")
+            or any(x in ("", os.curdir, os.pardir) for x in parts)
+            or any(x in path for x in UNSAFE_PATH_CHARACTERS)
+        ):
+            raise InvalidPack("Line {} has an invalid path".format(number))
+        yield "/".join(parts), header, str(front), str(back)
+
+
+def _text_reader(raw: BinaryIO) -> io.TextIOWrapper:
+    reader = io.BufferedReader(raw, BUFFER_SIZE)  # type: ignore
+    source: BinaryIO = reader  # type: ignore
+    # WHY: Compression is detected from content, so standard input works
+    if reader.peek(len(GZIP_MAGIC))[: len(GZIP_MAGIC)] == GZIP_MAGIC:
+        source = io.BufferedReader(
+            gzip.GzipFile(fileobj=reader, mode="rb"),  # type: ignore
+            BUFFER_SIZE,
+        )
+    return io.TextIOWrapper(source, encoding="utf-8")  # type: ignore
+
+
+def restore_cards(
+    cards: Iterable[PackedCard],
+    root: str,
+    overwrite: bool = False,
+    storage: Optional["MetaStorage"] = None,
+) -> PackResult:
+    """
+    Write packed cards to a deck
+
+    * `cards` - cards to write (see `read_pack`)
+    * `root` - root directory of the deck (created if missing)
+    * `overwrite` - replace cards that already exist
+    * `storage` - storage headers of the deck are kept in (same as
+        `sbx.core.card.Card`)
+
+    Raises `InvalidPack` for a card that would be written outside `root`.
+    """
+    result = PackResult()
+    directories: Set[str] = set()
+    prefix = os.path.join(os.path.abspath(root), "")
+    for relative, header, front, back in cards:
+        path = os.path.join(root, *relative.split("/"))
+        if not os.path.abspath(path).startswith(prefix):
+            raise InvalidPack("Card {!r} is outside the deck".format(relative))
+        directory = os.path.dirname(path)
+        if directory not in directories:
+            os.makedirs(directory, exist_ok=True)
+            directories.add(directory)
+        if not overwrite and os.path.exists(path):
+            result.skipped += 1
+            continue
+        try:
+            card = Card(path, storage=storage)
+        except InvalidCardLoadAttempted:
+            result.invalid.append(path)
+            continue
+        try:
+            card.meta.update_from_dict(header)
+        except (KeyError, TypeError, ValueError) as ex:
+            raise InvalidPack(
+                "Card {!r} has an invalid header: {}".format(relative, ex)
+            )
+        if front:
+            card.front = front
+        if back:
+            card.back = back
+        card.save()
+        result.cards += 1
+    return result
+
+
+def import_pack(
+    path: str,
+    root: str,
+    overwrite: bool = False,
+    storage: Optional["MetaStorage"] = None,
+) -> PackResult:
+    """
+    Restore a pack file to a deck
+
+    * `path` - pack to read, plain or gzip compressed (`"-"` for
+        standard input)
+    * `root` - root directory of the deck (created if missing)
+    * `overwrite` - replace cards that already exist
+    * `storage` - same as `restore_cards`
+    """
+    if path == STDIO:
+        stream = _text_reader(sys.stdin.buffer)
+        try:
+            return restore_cards(read_pack(stream), root, overwrite, storage)
+        finally:
+            # WHY: Keep standard input open
+            stream.detach()
+    with open(path, "rb", buffering=0) as raw:
+        with _text_reader(raw) as stream:
+            return restore_cards(read_pack(stream), root, overwrite, storage)
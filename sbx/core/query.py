@@ -0,0 +1,396 @@
+"""
+Filter expressions over card headers, such as
+`reps > 5 and easiness < 1.6 and overdue_days >= 3`
+
+Expressions use a small subset of Python (comparisons, `and`, `or`,
+`not`, `in`, arithmetic, numbers & strings) and are compiled once.
+Only header data is used, card bodies are never read.
+"""
+import ast
+import heapq
+import itertools
+import random
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from sbx.core.card import (
+    ALGORITHMS,
+    BAD_QUALITY_THRESHOLD,
+    LEECH_MIN_QUALITY,
+    SM2_PLUS_DIFFICULTY,
+)
+from sbx.core.columns import (
+    DEFAULT_EASINESS,
+    DEFAULT_INTERVAL,
+    DEFAULT_REPETITIONS,
+)
+from sbx.core.utility import DAY_IN_SECONDS, unix_time
+
+_Field = Callable[[dict, int], object]
+# Tuples that start with path & header of a card
+Item = TypeVar("Item", bound=Sequence)
+
+
+def _reps(header: dict, _: int) -> int:
+    return int(header.get("reps", len(header["pastq"])))
+
+
+def _last_quality(header: dict, _: int) -> object:
+    past = header["pastq"]
+    return int(past[-1]) if past else -1
+
+
+def _overdue_days(header: dict, today: int) -> int:
+    next_: int = header["next"]
+    if next_ == -1:
+        return 0
+    return today - next_ // DAY_IN_SECONDS
+
+
+def _days_since_last(header: dict, today: int) -> object:
+    last = header["last"]
+    if last == -1:
+        return -1
+    return today - last // DAY_IN_SECONDS
+
+
+def _new(header: dict, today: int) -> object:
+    return header["next"] == -1 or _reps(header, today) == 0
+
+
+def _due(header: dict, today: int) -> object:
+    # Same as `sbx.core.card.CardAlgo.can_study_now_batch`
+    if header["last"] // DAY_IN_SECONDS == today:
+        return False
+    return (
+        bool(_new(header, today)) or header["next"] // DAY_IN_SECONDS <= today
+    )
+
+
+def _leech(header: dict, _: int) -> object:
+    past = header["pastq"][-LEECH_MIN_QUALITY:]
+    return len(past) == LEECH_MIN_QUALITY and all(
+        int(x) < BAD_QUALITY_THRESHOLD for x in past
+    )
+
+
+def _uses_easiness(header: dict) -> Optional[bool]:
+    # WHY: Register `c` is not an easiness for every algorithm (SM-2+
+    #    keeps a difficulty there), see `sbx.core.card.CardAlgo`
+    algorithm = ALGORITHMS.get(header["algo"])
+    return None if algorithm is None else algorithm.uses_easiness
+
+
+def _easiness(header: dict, _: int) -> object:
+    if not _uses_easiness(header):
+        return None
+    return header.get("c", DEFAULT_EASINESS)
+
+
+def _difficulty(header: dict, _: int) -> object:
+    if _uses_easiness(header) is not False:
+        return None
+    return header.get("c", SM2_PLUS_DIFFICULTY)
+
+
+def _easiness_order(_: str, header: dict, __: int) -> Tuple[int, float]:
+    # WHY: Cards without an easiness are left for last
+    if not _uses_easiness(header):
+        return 1, 0.0
+    return 0, float(header.get("c", DEFAULT_EASINESS))
+
+
+def _register(name: str, default: object = None) -> _Field:
+    return lambda header, _: header.get(name, default)
+
+
+# Name -> (value of the field, description)
+FIELDS: Dict[str, Tuple[_Field, str]] = {
+    "reps": (_reps, "times the card was studied"),
+    "repetitions": (
+        _register("a", DEFAULT_REPETITIONS),
+        "successful repetitions in a row (register a)",
+    ),
+    "interval": (
+        _register("b", DEFAULT_INTERVAL),
+        "days between sessions (register b)",
+    ),
+    "easiness": (
+        _easiness,
+        "easiness factor (register c, not set for sm2+)",
+    ),
+    "difficulty": (
+        _difficulty,
+        "difficulty 0 - 1 (register c of sm2+, not set for others)",
+    ),
+    "last": (lambda h, _: h["last"], "last session (UNIX timestamp)"),
+    "next": (lambda h, _: h["next"], "next session (UNIX timestamp)"),
+    "pastq": (lambda h, _: h["pastq"], "past qualities as a string"),
+    "last_quality": (_last_quality, "last quality, -1 if never studied"),
+    "algo": (lambda h, _: h["algo"], "scheduling algorithm"),
+    "overdue_days": (
+        _overdue_days,
+        "days since card was due (negative if due later)",
+    ),
+    "days_since_last": (
+        _days_since_last,
+        "days since last session, -1 if never studied",
+    ),
+    "new": (_new, "card was never studied"),
+    "due": (_due, "card is scheduled for today"),
+    "leech": (_leech, "last three qualities are bad"),
+    "zero": (lambda h, _: h["pastq"][-1:] == "0", "last quality was zero"),
+}
+for _name in "abcdefgh":
+    FIELDS.setdefault(_name, (_register(_name), "register " + _name))
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.UnaryOp,
+    ast.Not,
+    ast.USub,
+    ast.UAdd,
+    ast.BinOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Tuple,
+    ast.List,
+)
+
+
+# Values that cannot be multiplied in an expression
+_SEQUENCES = (str, bytes, tuple, list)
+# Name of `_multiply` while evaluating an expression
+_MULTIPLY = "_multiply"
+
+
+def _multiply(left: Any, right: Any) -> Any:
+    # WHY: Repeating a string (or a tuple) can exhaust memory, such as
+    #    `pastq * 10000000000`
+    if isinstance(left, _SEQUENCES) or isinstance(right, _SEQUENCES):
+        raise TypeError("Only numbers can be multiplied")
+    return left * right
+
+
+class _SafeMultiply(ast.NodeTransformer):
+    """Replace `a * b` with a call that only multiplies numbers"""
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Mult):
+            return node
+        call = ast.Call(
+            func=ast.Name(id=_MULTIPLY, ctx=ast.Load()),
+            args=[node.left, node.right],
+            keywords=[],
+        )
+        return ast.copy_location(call, node)
+
+
+_GLOBALS: Dict[str, Any] = {"__builtins__": {}, _MULTIPLY: _multiply}
+
+
+class InvalidExpression(ValueError):
+    """Type of exception raised for an expression that cannot be used"""
+
+    pass
+
+
+class Where:
+    """A compiled filter expression"""
+
+    def __init__(self, expression: str, now: Optional[int] = None):
+        """
+        Compile an expression
+
+        * `expression` - expression to compile, see `FIELDS` for names
+        * `now` - UNIX timestamp used for `due`, `overdue_days` &
+            `days_since_last` (defaults to current time)
+
+        Raises `InvalidExpression` if the expression is not valid.
+        """
+        self._expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as ex:
+            raise InvalidExpression(
+                "Invalid expression {!r}: {}".format(expression, ex.msg)
+            ) from ex
+        names: List[str] = []
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise InvalidExpression(
+                    "{!r} cannot be used in {!r}".format(
+                        type(node).__name__, expression
+                    )
+                )
+            if isinstance(node, ast.Name):
+                if node.id not in FIELDS:
+                    raise InvalidExpression(
+                        "Unknown field {!r} in {!r}".format(
+                            node.id, expression
+                        )
+                    )
+                if node.id not in names:
+                    names.append(node.id)
+            if isinstance(node, ast.Constant) and not isinstance(
+                node.value, (int, float, str)
+            ):
+                raise InvalidExpression(
+                    "{!r} cannot be used in {!r}".format(
+                        node.value, expression
+                    )
+                )
+        tree = ast.fix_missing_locations(_SafeMultiply().visit(tree))
+        self._code = compile(tree, "<where>", "eval")
+        self._fields = [(name, FIELDS[name][0]) for name in names]
+        if now is None:
+            now = unix_time()
+        self._today = now // DAY_IN_SECONDS
+
+    @property
+    def expression(self) -> str:
+        """Get expression this was compiled from"""
+        return self._expression
+
+    def matches(self, header: dict) -> bool:
+        """
+        Does a card match the expression?
+
+        * `header` - parsed header of the card
+
+        Cards missing a register used in the expression do not match.
+        """
+        today = self._today
+        try:
+            # WHY: Only fields used in the expression are computed
+            values = {
+                name: field(header, today) for name, field in self._fields
+            }
+            return bool(eval(self._code, _GLOBALS, values))
+        except (
+            TypeError,
+            ValueError,
+            KeyError,
+            ZeroDivisionError,
+            OverflowError,
+        ):
+            return False
+
+
+ORDER_DUE = "due"
+ORDER_OVERDUE = "overdue"
+ORDER_EASINESS = "easiness"
+ORDER_REPS = "reps"
+ORDER_RANDOM = "random"
+ORDER_PATH = "path"
+# Order -> (sort key of path, header & current day, description)
+ORDERS: Dict[str, Tuple[Callable[[str, dict, int], Any], str]] = {
+    ORDER_DUE: (
+        lambda _, h, __: h["next"],
+        "earliest next session first (new cards first)",
+    ),
+    ORDER_OVERDUE: (
+        lambda _, h, today: -_overdue_days(h, today),
+        "most overdue first",
+    ),
+    ORDER_EASINESS: (
+        _easiness_order,
+        "hardest (lowest easiness) first, cards without one last",
+    ),
+    ORDER_REPS: (
+        lambda _, h, today: -_reps(h, today),
+        "most studied first",
+    ),
+    ORDER_RANDOM: (lambda _, __, ___: 0, "random order"),
+    ORDER_PATH: (lambda path, _, __: path, "by path"),
+}
+
+
+def _sample(items: Iterable[Item], limit: int) -> List[Item]:
+    # Reservoir sampling (algorithm R), only `limit` items are kept
+    generator = random.Random()
+    sample: List[Item] = []
+    for position, item in enumerate(items):
+        if position < limit:
+            sample.append(item)
+            continue
+        replace = generator.randrange(position + 1)
+        if replace < limit:
+            sample[replace] = item
+    generator.shuffle(sample)
+    return sample
+
+
+def order_cards(
+    items: Iterable[Item],
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    now: Optional[int] = None,
+) -> Iterator[Item]:
+    """
+    Order cards and keep only the first few
+
+    * `items` - tuples starting with path & header of each card
+    * `order` - one of `ORDERS` (`None` keeps given order)
+    * `limit` - maximum number of cards to keep (`None` keeps all)
+    * `now` - UNIX timestamp used for `overdue` (defaults to current time)
+
+    With a limit only `limit` cards are kept in memory at once, and
+    without an order no more items are taken than needed.
+    """
+    if order is not None and order not in ORDERS:
+        raise ValueError("Unknown order {!r}".format(order))
+    if limit is not None and limit < 1:
+        raise ValueError("Limit must be at least 1")
+    if order is None:
+        if limit is None:
+            return iter(items)
+        return itertools.islice(items, limit)
+    if order == ORDER_RANDOM:
+        if limit is None:
+            cards = list(items)
+            random.shuffle(cards)
+            return iter(cards)
+        return iter(_sample(items, limit))
+    if now is None:
+        now = unix_time()
+    today = now // DAY_IN_SECONDS
+    order_key = ORDERS[order][0]
+
+    def key(item: Item) -> Any:
+        return order_key(item[0], item[1], today)
+
+    if limit is None:
+        return iter(sorted(items, key=key))
+    # WHY: Bounded heap, memory is O(limit) instead of O(deck)
+    return iter(heapq.nsmallest(limit, items, key=key))
@@ -0,0 +1,289 @@
+"""
+Write many cards to a stream quickly, used by `sbx list`
+
+Output is collected in memory and written in large chunks, colours are
+plain ANSI escape sequences. They are only written to terminals that
+support them, consoles that don't (older Windows versions) are coloured
+by `prompt_toolkit` one card at a time instead.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, TextIO
+
+from sbx.core.card import Card
+from sbx.core.utility import (
+    DAY_IN_SECONDS,
+    LOCAL_TIMEZONE,
+    pack_int_list,
+)
+
+FORMAT_PRETTY = "pretty"
+FORMAT_PLAIN = "plain"
+FORMAT_JSON = "json"
+FORMAT_JSONL = "jsonl"
+FORMAT_TSV = "tsv"
+FORMAT_NULL = "null"
+FORMATS = [
+    FORMAT_PRETTY,
+    FORMAT_PLAIN,
+    FORMAT_JSON,
+    FORMAT_JSONL,
+    FORMAT_TSV,
+    FORMAT_NULL,
+]
+# Formats that can be written while a deck is watched
+STREAM_FORMATS = [x for x in FORMATS if x != FORMAT_JSON]
+TSV_COLUMNS = ["path", "next", "last", "reps", "pastq", "algo"]
+# Characters written between (plain or pretty) cards
+SEPARATOR = "- - - - - " * 4 + "\n"
+# Write when this many characters are collected
+BUFFER_SIZE = 64 * 1024
+
+# Same colours `sbx.core.utility.Text` uses (in 256 colour palette)
+RED = "\x1b[38;5;196m"
+YELLOW = "\x1b[38;5;226m"
+GREEN = "\x1b[38;5;46m"
+CYAN = "\x1b[38;5;51m"
+RESET = "\x1b[0m"
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n"})
+# Console mode flag that makes Windows consoles understand ANSI escapes
+_ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+
+
+def _is_terminal(stream: TextIO) -> bool:
+    isatty = getattr(stream, "isatty", None)
+    try:
+        return bool(isatty and isatty())
+    except ValueError:  # closed
+        return False
+
+
+def _enable_windows_escapes(stream: TextIO) -> bool:
+    # WHY: Only imported when needed as these are Windows only
+    import ctypes
+    import msvcrt
+
+    try:
+        handle = msvcrt.get_osfhandle(stream.fileno())  # type: ignore
+        kernel32 = ctypes.windll.kernel32  # type: ignore
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        if mode.value & _ENABLE_VIRTUAL_TERMINAL_PROCESSING:
+            return True
+        return bool(
+            kernel32.SetConsoleMode(
+                handle, mode.value | _ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            )
+        )
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def supports_escapes(stream: TextIO) -> bool:
+    """
+    Check if ANSI colour escapes can be written to a stream
+
+    * `stream` - stream to check
+
+    Only terminals are coloured (not files or pipes). On Windows this
+    switches the console to understand escapes, which fails on consoles
+    older than Windows 10.
+    """
+    if not _is_terminal(stream):
+        return False
+    if os.name == "nt":
+        return _enable_windows_escapes(stream)
+    return os.environ.get("TERM") != "dumb"
+
+
+class DateFormatter:
+    """
+    Same as `sbx.core.utility.unix_str`, but each distinct day is only
+    formatted once
+    """
+
+    def __init__(self):
+        offset = LOCAL_TIMEZONE.utcoffset(None)  # type: ignore
+        self._offset = int(offset.total_seconds()) if offset else 0
+        self._days: Dict[int, str] = {}
+        noon = datetime(2000, 1, 1, 12)
+        self._am = noon.replace(hour=0).strftime("%p")
+        self._pm = noon.strftime("%p")
+
+    def __call__(self, unix: int) -> str:
+        """
+        Convert a UNIX timestamp to a string
+
+        * `unix` - UNIX timestamp
+        """
+        if unix <= 0:
+            return "N/A"
+        day, seconds = divmod(unix + self._offset, DAY_IN_SECONDS)
+        prefix = self._days.get(day)
+        if prefix is None:
+            local_dt = datetime.fromtimestamp(unix, LOCAL_TIMEZONE)
+            prefix = local_dt.strftime("%Y-%b-%d (%a) [")
+            self._days[day] = prefix
+        hour, seconds = divmod(seconds, 3600)
+        minute, second = divmod(seconds, 60)
+        return "{}{:02d}:{:02d}:{:02d} {}]".format(
+            prefix,
+            hour % 12 or 12,
+            minute,
+            second,
+            self._am if hour < 12 else self._pm,
+        )
+
+
+class CardRenderer:
+    """Write cards to a stream in one of `FORMATS`"""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        output_format: str = FORMAT_PRETTY,
+        file_name_only: bool = False,
+        buffer_size: int = BUFFER_SIZE,
+        escapes: Optional[bool] = None,
+    ):
+        """
+        Create a renderer
+
+        * `stream` - stream to write to
+        * `output_format` - one of `FORMATS`
+        * `file_name_only` - only write path of each card (one per line)
+        * `buffer_size` - write when this many characters are collected
+        * `escapes` - colour `pretty` cards with ANSI escapes (default:
+            if `stream` supports them, see `supports_escapes`)
+
+        Without escapes `pretty` cards are coloured by `prompt_toolkit`
+        if `stream` is a terminal, or written same as `plain` if not.
+        """
+        if output_format not in FORMATS:
+            raise ValueError("Unknown format {!r}".format(output_format))
+        self._legacy_console = False
+        if output_format == FORMAT_PRETTY and not file_name_only:
+            if escapes is None:
+                escapes = supports_escapes(stream)
+            if not escapes:
+                self._legacy_console = _is_terminal(stream)
+                output_format = FORMAT_PLAIN
+        self._stream = stream
+        self._format = output_format
+        self._file_name_only = file_name_only
+        self._buffer_size = buffer_size
+        self._chunks: List[str] = []
+        self._size = 0
+        self._count = 0
+        self._date = DateFormatter()
+        if output_format == FORMAT_TSV and not file_name_only:
+            self._add("\t".join(TSV_COLUMNS) + "\n")
+
+    @property
+    def count(self) -> int:
+        """Get number of cards written"""
+        return self._count
+
+    def _add(self, text: str):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self._buffer_size:
+            self.flush()
+
+    def write(self, card: Card):
+        """
+        Write a card
+
+        * `card` - card to write
+        """
+        self._count += 1
+        if self._format == FORMAT_NULL:
+            return
+        if self._file_name_only:
+            self._add(card.path + "\n")
+            return
+        if self._format == FORMAT_JSONL:
+            self._add(json.dumps(self._record(card)) + "\n")
+        elif self._format == FORMAT_JSON:
+            self._add(
+                ("[\n" if self._count == 1 else ",\n")
+                + json.dumps(self._record(card))
+            )
+        elif self._legacy_console:
+            self._print_formatted(card)
+        elif self._format == FORMAT_TSV:
+            meta = card.meta
+            row = [
+                card.path.translate(_TSV_ESCAPES),
+                str(meta.next_session),
+                str(meta.last_session),
+                str(meta.actual_repetitions),
+                pack_int_list(meta.past_quality),
+                meta.algo.translate(_TSV_ESCAPES),
+            ]
+            self._add("\t".join(row) + "\n")
+        else:
+            self._add(self._text(card))
+
+    def _record(self, card: Card) -> dict:
+        record = {"path": card.path}
+        record.update(card.meta.to_dict())
+        return record
+
+    def _print_formatted(self, card: Card):
+        # WHY: Importing prompt_toolkit is slow, only do it when needed
+        from prompt_toolkit import print_formatted_text
+
+        self._add(SEPARATOR)
+        self.flush()
+        print_formatted_text(
+            card.to_formatted().to_formatted(), file=self._stream
+        )
+
+    def _text(self, card: Card) -> str:
+        # Same as `str(card)` & `card.to_formatted()`
+        meta = card.meta
+        front = "\n".join(card.front.splitlines()[:2]).strip()
+        last = self._date(meta.last_session)
+        next_ = self._date(meta.next_session)
+        if self._format == FORMAT_PLAIN:
+            return "{}{}\nlast={}\nnext={}\npath={}\n".format(
+                SEPARATOR, front, last, next_, card.path
+            )
+        return (
+            "{sep}{yellow}{}{reset}\n{cyan}last{reset}={}\n"
+            "{cyan}next{reset}={}{}{reset}\n{cyan}path{reset}={}\n".format(
+                front,
+                last,
+                RED if card.today else GREEN,
+                next_,
+                card.path,
+                sep=SEPARATOR,
+                yellow=YELLOW,
+                cyan=CYAN,
+                reset=RESET,
+            )
+        )
+
+    def flush(self):
+        """Write everything collected so far"""
+        if self._chunks:
+            self._stream.write("".join(self._chunks))
+            self._chunks = []
+            self._size = 0
+        self._stream.flush()
+
+    def close(self):
+        """Finish output (closes a JSON array) & write everything"""
+        if self._format == FORMAT_JSON and not self._file_name_only:
+            self._chunks.append("\n]\n" if self._count else "[]\n")
+        self.flush()
+
+    def __enter__(self) -> "CardRenderer":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
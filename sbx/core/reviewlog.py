@@ -0,0 +1,339 @@
+"""
+Append-only log of every review (mark) of every card in a deck
+
+Card headers only keep the last `sbx.core.card.PAST_STAT_COUNT`
+qualities, the log keeps all of them along with when they happened and
+how scheduling changed. It is stored in `.sbx-log` at the deck root as a
+series of segment files of fixed size binary records, a record is only
+ever appended and a full segment is never written again.
+
+Each segment starts with `MAGIC` and is named after the range of segment
+numbers it holds, such as `00000003-00000003.log`. Compaction merges
+older segments into one (such as `00000001-00000003.log`), a segment
+covered by the range of another is ignored, so a crash during compaction
+never loses or duplicates reviews.
+"""
+import hashlib
+import os
+import re
+import struct
+import tempfile
+import threading
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from sbx.core.metrics import METRICS, REVIEWS_LOGGED
+
+if TYPE_CHECKING:
+    from sbx.core.card import CardMeta
+
+LOG_DIRECTORY_NAME = ".sbx-log"
+MAGIC = b"SBXLOG01"
+# card id, timestamp, quality, interval before & after, easiness before
+#    & after (little endian, no padding), easiness is register `c` so it
+#    is difficulty for `sbx.core.card.Sm2Plus`
+RECORD = struct.Struct("<QqBdddd")
+# Bytes in a segment before a new one is started (~21k reviews)
+SEGMENT_SIZE = 1024 * 1024
+SEGMENT_SUFFIX = ".log"
+FILE_MODE = 0o644
+# Same defaults as `sbx.core.card.Sm2` for a card never studied
+DEFAULT_INTERVAL = 1.0
+DEFAULT_EASINESS = 2.5
+
+_SEGMENT_NAME = re.compile(r"^(\d{8})-(\d{8})" + re.escape(SEGMENT_SUFFIX))
+
+# (card id, timestamp, quality, interval before, interval after,
+#    easiness before, easiness after) of a review
+Review = Tuple[int, int, int, float, float, float, float]
+# (first number, last number, path) of a segment
+Segment = Tuple[int, int, str]
+
+
+class InvalidReviewLog(ValueError):
+    """Type of exception raised for a segment that is not a review log"""
+
+    pass
+
+
+class CompactResult:
+    """
+    Outcome of `ReviewLog.compact`
+
+    * `segments` - segments merged (`0` if nothing was done)
+    * `reviews` - reviews kept in the compacted segment
+    * `dropped` - reviews of removed cards that were not kept
+    """
+
+    def __init__(self):
+        self.segments = 0
+        self.reviews = 0
+        self.dropped = 0
+
+
+def card_id(key: str) -> int:
+    """
+    Get id a card is logged with
+
+    * `key` - path of the card relative to the deck root
+
+    Id is a 64 bit hash of the path, a renamed card starts a new history.
+    """
+    normalized = key.replace(os.sep, "/").encode("utf-8")
+    return int.from_bytes(
+        hashlib.blake2b(normalized, digest_size=8).digest(), "little"
+    )
+
+
+def scheduling(meta: "CardMeta") -> Tuple[float, float]:
+    """
+    Get interval & easiness of a card
+
+    * `meta` - meta data of the card
+    """
+    state = meta.algo_state
+    return (
+        float(state.get("b", DEFAULT_INTERVAL)),
+        float(state.get("c", DEFAULT_EASINESS)),
+    )
+
+
+def read_segment(path: str) -> Iterator[Review]:
+    """
+    Read reviews of a segment file
+
+    * `path` - path of the segment
+
+    Raises `InvalidReviewLog` if the file is not a segment. A partly
+    written record at the end (such as after a crash) is ignored.
+    """
+    with open(path, "rb") as h:
+        if h.read(len(MAGIC)) != MAGIC:
+            raise InvalidReviewLog("{!r} is not a review log".format(path))
+        data = h.read()
+    end = len(data) - len(data) % RECORD.size
+    yield from RECORD.iter_unpack(memoryview(data)[:end])
+
+
+def _segment_name(first: int, last: int) -> str:
+    return "{:08d}-{:08d}{}".format(first, last, SEGMENT_SUFFIX)
+
+
+class ReviewLog:
+    """
+    Review log of a deck, safe to use from many threads
+
+    Only one process should append to a log at a time (such as a single
+    study session), compaction leaves the newest segment alone so it can
+    run while cards are studied.
+    """
+
+    def __init__(self, root: str, segment_size: int = SEGMENT_SIZE):
+        """
+        Create a review log for a deck (nothing is created until the
+        first review is appended)
+
+        * `root` - root directory of the deck (log is stored here)
+        * `segment_size` - bytes in a segment before a new one is started
+        """
+        self._root = os.path.abspath(root)
+        self._directory = os.path.join(self._root, LOG_DIRECTORY_NAME)
+        self._segment_size = max(segment_size, len(MAGIC) + RECORD.size)
+        self._lock = threading.Lock()
+        self._handle: Optional[BinaryIO] = None
+        self._number = 0
+        self._size = 0
+
+    @property
+    def directory(self) -> str:
+        """Get directory segments are stored in"""
+        return self._directory
+
+    def key(self, path: str) -> str:
+        """
+        Get path of a card relative to the deck root
+
+        * `path` - path of the card
+        """
+        return os.path.relpath(os.path.abspath(path), self._root)
+
+    def segments(self) -> List[Segment]:
+        """Get segments in order, without the ones covered by another"""
+        try:
+            names = os.listdir(self._directory)
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _SEGMENT_NAME.match(name)
+            if match is not None:
+                first, last = int(match.group(1)), int(match.group(2))
+                path = os.path.join(self._directory, name)
+                found.append((first, last, path))
+        # WHY: Widest range first, so it hides what it was compacted from
+        found.sort(key=lambda x: (x[0], -x[1]))
+        result: List[Segment] = []
+        covered = 0
+        for first, last, path in found:
+            if first > covered:
+                result.append((first, last, path))
+                covered = last
+        return result
+
+    def _start_segment(self, number: int):
+        os.makedirs(self._directory, exist_ok=True)
+        path = os.path.join(self._directory, _segment_name(number, number))
+        # WHY: Unbuffered, every record is written with a single call
+        handle = open(path, "ab", buffering=0)
+        if handle.tell() == 0:
+            handle.write(MAGIC)
+        self._handle = handle  # type: ignore
+        self._number = number
+        self._size = handle.tell()
+
+    def _open(self):
+        segments = self.segments()
+        if not segments:
+            self._start_segment(1)
+            return
+        first, last, path = segments[-1]
+        size = os.path.getsize(path)
+        # WHY: Compacted & full segments are never appended to, neither is
+        #    a segment ending with a partly written record
+        if (
+            first != last
+            or size >= self._segment_size
+            or size < len(MAGIC)
+            or (size - len(MAGIC)) % RECORD.size
+        ):
+            self._start_segment(last + 1)
+        else:
+            self._start_segment(last)
+
+    def append(
+        self,
+        path: str,
+        timestamp: int,
+        quality: int,
+        before: Tuple[float, float],
+        after: Tuple[float, float],
+    ):
+        """
+        Append a review of a card
+
+        * `path` - path of the card
+        * `timestamp` - UNIX timestamp of the review
+        * `quality` - quality the card was marked with
+        * `before` - interval & easiness before the review
+        * `after` - interval & easiness after the review
+        """
+        record = RECORD.pack(
+            card_id(self.key(path)),
+            timestamp,
+            quality,
+            before[0],
+            after[0],
+            before[1],
+            after[1],
+        )
+        with self._lock:
+            if self._handle is None:
+                self._open()
+            elif self._size + len(record) > self._segment_size:
+                self._handle.close()
+                self._start_segment(self._number + 1)
+            assert self._handle is not None
+            self._handle.write(record)
+            self._size += len(record)
+        METRICS.inc(REVIEWS_LOGGED)
+
+    def reviews(self) -> Iterator[Review]:
+        """Get every review in the order they were logged"""
+        for _, _, path in self.segments():
+            yield from read_segment(path)
+
+    def history(self, path: str) -> List[Review]:
+        """
+        Get every review of a card
+
+        * `path` - path of the card
+        """
+        wanted = card_id(self.key(path))
+        return [x for x in self.reviews() if x[0] == wanted]
+
+    def compact(self, keep: Optional[Iterable[str]] = None) -> CompactResult:
+        """
+        Merge every segment except the newest into one
+
+        * `keep` - paths of cards whose reviews are kept (all are kept if
+            not given), such as cards that still exist
+
+        Compacted segment is written to a temporary file & renamed, then
+        merged segments are removed.
+        """
+        result = CompactResult()
+        keep_ids: Optional[Set[int]] = None
+        if keep is not None:
+            keep_ids = {card_id(self.key(x)) for x in keep}
+        with self._lock:
+            sealed = self.segments()[:-1]
+            if not sealed or (len(sealed) == 1 and keep_ids is None):
+                return result
+            first, last = sealed[0][0], sealed[-1][1]
+            name = _segment_name(first, last)
+            handle, temp_path = tempfile.mkstemp(
+                prefix=".", dir=self._directory
+            )
+            try:
+                with open(handle, "wb") as target:
+                    target.write(MAGIC)
+                    for _, _, path in sealed:
+                        for review in read_segment(path):
+                            if keep_ids is None or review[0] in keep_ids:
+                                target.write(RECORD.pack(*review))
+                                result.reviews += 1
+                            else:
+                                result.dropped += 1
+                    target.flush()
+                    os.fsync(target.fileno())
+                os.chmod(temp_path, FILE_MODE)
+                target_path = os.path.join(self._directory, name)
+                os.replace(temp_path, target_path)
+            except BaseException:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+                raise
+            # WHY: Covered segments are already ignored, this only frees
+            #    space (including ones left by an interrupted compaction)
+            for path in self._covered(first, last):
+                os.unlink(path)
+        result.segments = len(sealed)
+        return result
+
+    def _covered(self, first: int, last: int) -> Iterator[str]:
+        for name in os.listdir(self._directory):
+            match = _SEGMENT_NAME.match(name)
+            if match is None:
+                continue
+            start, end = int(match.group(1)), int(match.group(2))
+            if (start, end) == (first, last):
+                continue
+            if first <= start and end <= last:
+                yield os.path.join(self._directory, name)
+
+    def close(self):
+        """Close the segment being appended to"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
@@ -0,0 +1,284 @@
+"""
+Write-behind saving of cards, backed by an append-only session journal
+"""
+import json
+import os
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+from sbx.core.card import (
+    Card,
+    CardMeta,
+    InvalidCardLoadAttempted,
+    read_header,
+)
+
+if TYPE_CHECKING:
+    from sbx.core.storage import MetaStorage
+
+JOURNAL_FILE_NAME = ".sbx-journal"
+NEWLINE = "\n"
+# Seconds to wait for more cards after first card of a batch arrives
+DEFAULT_BATCH_DELAY = 0.2
+# Baseline of a journal entry that is read from the card when written
+_READ_LATER: List[int] = []
+# Journal entry not written yet (path, header & baseline)
+_Entry = Tuple[str, dict, Optional[List[int]]]
+
+
+def _baseline(header: Optional[dict]) -> Optional[List[int]]:
+    """
+    Get `[reps, last]` of a header (`None` for no header), a card changed
+    by anything else has a different baseline
+
+    * `header` - header of a card
+    """
+    if header is None:
+        return None
+    meta = CardMeta(header)
+    return [meta.actual_repetitions, meta.last_session]
+
+
+def _read_baseline(
+    path: str, storage: Optional["MetaStorage"]
+) -> Optional[List[int]]:
+    try:
+        header = None if storage is None else storage.read(path)
+        if header is None:
+            header = read_header(path)
+        return _baseline(header)
+    except (
+        OSError,
+        ValueError,
+        KeyError,
+        TypeError,
+        InvalidCardLoadAttempted,
+    ):
+        return None
+
+
+def replay_journal(
+    root: str, storage: Optional["MetaStorage"] = None, index=None
+) -> int:
+    """
+    Apply headers left in the journal of a session that did not finish
+
+    * `root` - root directory of the deck
+    * `storage` - storage headers of the deck are kept in (same as
+        `sbx.core.card.Card`)
+    * `index` - header index to update as cards are saved (same as
+        `sbx.core.card.Card`)
+
+    Returns number of cards updated. Journal is removed afterwards.
+
+    A card is skipped if it has changed since the session started (such as
+    studied again by another session), unless the change is an earlier
+    header of the same journal that was already saved.
+    """
+    journal = os.path.join(root, JOURNAL_FILE_NAME)
+    headers: Dict[str, dict] = {}
+    # Baselines a card may still have for its last header to be applied
+    expected: Dict[str, List[Optional[List[int]]]] = {}
+    try:
+        with open(journal, "r", encoding="utf-8") as h:
+            for line in h:
+                try:
+                    entry = json.loads(line)
+                    path, header = entry["path"], entry["header"]
+                    saved = _baseline(header)
+                    base = entry["base"]
+                except (ValueError, KeyError, TypeError):
+                    # WHY: Last line may be half written during a crash
+                    continue
+                headers[path] = header
+                expected.setdefault(path, []).extend([base, saved])
+    except OSError:
+        return 0
+    updated = 0
+    for path, header in headers.items():
+        if _read_baseline(path, storage) not in expected[path]:
+            continue
+        try:
+            card = Card(path, index=index, storage=storage)
+            card.meta.update_from_dict(header)
+            card.save()
+            updated += 1
+        except (OSError, ValueError, KeyError, InvalidCardLoadAttempted):
+            continue
+    try:
+        os.remove(journal)
+    except OSError:
+        pass
+    return updated
+
+
+class WriteBehindSaver:
+    """
+    Save cards in a background thread
+
+    * Cards submitted again before they are written are only written once.
+    * Every submitted header is appended to a journal file in the deck
+        root before its card is written (along with `[reps, last]` the
+        card had before it was first submitted), use `replay_journal` to
+        apply it after a crash.
+    * Journal is removed when the saver is closed without failures.
+    * Nothing is read or written by `submit`, all file work is done by
+        the background thread.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        on_error: Optional[Callable[[Card, Exception], None]] = None,
+        batch_delay: float = DEFAULT_BATCH_DELAY,
+        storage: Optional["MetaStorage"] = None,
+    ):
+        """
+        Create a saver
+
+        * `root` - root directory of the deck (journal is stored here)
+        * `on_error` - called from the background thread with card &
+            exception when a card cannot be saved
+        * `batch_delay` - seconds to wait for more cards before writing
+        * `storage` - storage headers of submitted cards are kept in
+            (their headers before this session are read from it)
+        """
+        self._journal_path = os.path.join(root, JOURNAL_FILE_NAME)
+        self._journal: Optional[TextIO] = None
+        self._on_error = on_error
+        self._batch_delay = batch_delay
+        self._pending: Dict[str, Card] = {}
+        self._entries: List[_Entry] = []
+        self._bases: Dict[str, Optional[List[int]]] = {}
+        self._storage = storage
+        self._failed: List[Tuple[Card, Exception]] = []
+        self._condition = threading.Condition()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def failed(self) -> List[Tuple[Card, Exception]]:
+        """Get cards that could not be saved with their exceptions"""
+        with self._condition:
+            return list(self._failed)
+
+    def start(self):
+        """Start background thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, card: Card, before: Optional[dict] = None):
+        """
+        Queue a card to be saved
+
+        * `card` - card to save
+        * `before` - header of the card before it was marked, if not given
+            it is read by the background thread (before the card is
+            first written)
+        """
+        path = os.path.abspath(card.path)
+        base: Optional[List[int]] = _READ_LATER
+        if before is not None:
+            base = _baseline(before)
+        # WHY: Header is copied now, card may be marked again before the
+        #    journal is written
+        header = card.meta.to_dict()
+        with self._condition:
+            self._entries.append((path, header, base))
+            self._pending[card.path] = card
+            self._condition.notify()
+
+    def close(self):
+        """Write all queued cards and stop background thread"""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self._save_batch(*self._take_batch())
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if not self._failed:
+            try:
+                os.remove(self._journal_path)
+            except OSError:
+                pass
+
+    def _write_journal(self, entries: List[_Entry]):
+        lines = []
+        for path, header, base in entries:
+            # WHY: Only the first baseline of a card is kept, later it may
+            #    hold a header written by this saver
+            if path not in self._bases:
+                if base is _READ_LATER:
+                    base = _read_baseline(path, self._storage)
+                self._bases[path] = base
+            lines.append(
+                json.dumps(
+                    {"path": path, "header": header, "base": self._bases[path]}
+                )
+                + NEWLINE
+            )
+        if not lines:
+            return
+        try:
+            if self._journal is None:
+                self._journal = open(self._journal_path, "a", encoding="utf-8")
+            self._journal.write("".join(lines))
+            self._journal.flush()
+        except OSError:
+            # WHY: Journal is only for recovery, card is still saved
+            pass
+
+    def _take_batch(self) -> Tuple[List[_Entry], List[Card]]:
+        with self._condition:
+            entries = self._entries
+            self._entries = []
+            batch = list(self._pending.values())
+            self._pending.clear()
+            return entries, batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closing:
+                    self._condition.wait()
+                if not self._pending and self._closing:
+                    return
+                # Give a chance for more cards to arrive
+                deadline = time.monotonic() + self._batch_delay
+                while not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            self._save_batch(*self._take_batch())
+
+    def _save_batch(
+        self,
+        entries: List[_Entry],
+        batch: List[Card],
+    ):
+        self._write_journal(entries)
+        for card in batch:
+            try:
+                card.save()
+            except (IOError, OSError) as ex:
+                with self._condition:
+                    self._failed.append((card, ex))
+                if self._on_error is not None:
+                    self._on_error(card, ex)
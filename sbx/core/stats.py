@@ -0,0 +1,223 @@
+"""
+Deck wide statistics computed from card headers
+"""
+import math
+from bisect import bisect_left
+from itertools import compress
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sbx.core.card import (
+    ALGORITHMS,
+    BAD_QUALITY_THRESHOLD,
+    is_last_zero_batch,
+    is_leech_batch,
+)
+from sbx.core.columns import MetaColumns
+
+# Start & label of each bucket (a bucket ends where next one starts)
+EASINESS_BUCKETS = [
+    (1.3, "1.3 - 1.5"),
+    (1.5, "1.5 - 1.7"),
+    (1.7, "1.7 - 1.9"),
+    (1.9, "1.9 - 2.1"),
+    (2.1, "2.1 - 2.3"),
+    (2.3, "2.3 - 2.5"),
+    (2.5, "2.5 - 2.7"),
+    (2.7, "2.7+"),
+]
+INTERVAL_BUCKETS = [
+    (0.0, "1 day"),
+    (2.0, "2 - 6 days"),
+    (7.0, "1 - 4 weeks"),
+    (30.0, "1 - 3 months"),
+    (90.0, "3 - 12 months"),
+    (365.0, "1+ years"),
+]
+PERCENTILES = [25, 50, 75, 90, 99, 100]
+# Cards with an interval of at least this many days are mature
+MATURE_INTERVAL = 21
+QUALITIES = "012345"
+
+# (label, count) of each bucket of a histogram
+Histogram = List[Tuple[str, int]]
+
+
+class DeckStats:
+    """
+    Statistics of a deck
+
+    * `cards` - number of cards
+    * `studied` - cards studied at least once
+    * `leech` - leech cards
+    * `zero` - cards last marked as zero
+    * `easiness` - histogram of easiness of studied cards (of algorithms
+        with an easiness, see `sbx.core.card.CardAlgo.uses_easiness`)
+    * `intervals` - histogram of intervals (days) of studied cards
+    * `repetitions` - repetitions at each of `PERCENTILES` (all cards)
+    * `quality` - number of past reviews with each quality (`0`-`5`),
+        cards only keep their last `sbx.core.card.PAST_STAT_COUNT`
+    * `mature` - studied cards with an interval of `MATURE_INTERVAL` days
+        or more
+    * `recalled` - past reviews with a passing quality
+    * `last_recalled` - studied cards whose last quality was passing
+    * `mature_recalled` - mature cards whose last quality was passing
+    """
+
+    def __init__(self, cards: int):
+        self.cards = cards
+        self.studied = 0
+        self.leech = 0
+        self.zero = 0
+        self.easiness: Histogram = []
+        self.intervals: Histogram = []
+        self.repetitions: Dict[int, int] = {}
+        self.quality: List[int] = [0] * len(QUALITIES)
+        self.mature = 0
+        self.recalled = 0
+        self.last_recalled = 0
+        self.mature_recalled = 0
+
+    @property
+    def never_studied(self) -> int:
+        """Get number of cards never studied"""
+        return self.cards - self.studied
+
+    @property
+    def reviews(self) -> int:
+        """Get number of past reviews counted in `quality`"""
+        return sum(self.quality)
+
+    @property
+    def retention(self) -> Optional[float]:
+        """Get share of past reviews with a passing quality"""
+        return _ratio(self.recalled, self.reviews)
+
+    @property
+    def last_retention(self) -> Optional[float]:
+        """Get share of studied cards last marked with a passing quality"""
+        return _ratio(self.last_recalled, self.studied)
+
+    @property
+    def mature_retention(self) -> Optional[float]:
+        """Get share of mature cards last marked with a passing quality"""
+        return _ratio(self.mature_recalled, self.mature)
+
+    @property
+    def leech_ratio(self) -> Optional[float]:
+        """Get share of studied cards that are leech"""
+        return _ratio(self.leech, self.studied)
+
+    @property
+    def zero_ratio(self) -> Optional[float]:
+        """Get share of studied cards last marked as zero"""
+        return _ratio(self.zero, self.studied)
+
+    def to_dict(self) -> dict:
+        """Get statistics as a dictionary (such as to dump as JSON)"""
+        return {
+            "cards": self.cards,
+            "studied": self.studied,
+            "never_studied": self.never_studied,
+            "leech": self.leech,
+            "leech_ratio": self.leech_ratio,
+            "zero": self.zero,
+            "zero_ratio": self.zero_ratio,
+            "easiness": dict(self.easiness),
+            "intervals": dict(self.intervals),
+            "repetitions": {
+                "p{}".format(x): y for x, y in self.repetitions.items()
+            },
+            "quality": dict(zip(QUALITIES, self.quality)),
+            "reviews": self.reviews,
+            "retention": self.retention,
+            "last_retention": self.last_retention,
+            "mature": self.mature,
+            "mature_retention": self.mature_retention,
+        }
+
+
+def _ratio(part: int, whole: int) -> Optional[float]:
+    if whole == 0:
+        return None
+    return part / whole
+
+
+def _histogram(
+    ordered: Sequence[float], buckets: List[Tuple[float, str]]
+) -> Histogram:
+    # WHY: Bucket sizes are found with a binary search on sorted values,
+    #    values below first bucket are counted in it
+    ends = [bisect_left(ordered, x) for x, _ in buckets[1:]]
+    starts = [0] + ends
+    ends.append(len(ordered))
+    return [
+        (label, end - start)
+        for (_, label), start, end in zip(buckets, starts, ends)
+    ]
+
+
+def _percentiles(ordered: Sequence[int]) -> Dict[int, int]:
+    if not ordered:
+        return {x: 0 for x in PERCENTILES}
+    # Nearest rank method
+    return {
+        x: ordered[max(0, math.ceil(x / 100 * len(ordered)) - 1)]
+        for x in PERCENTILES
+    }
+
+
+def _passing(qualities: str) -> int:
+    return sum(qualities.count(x) for x in QUALITIES[BAD_QUALITY_THRESHOLD:])
+
+
+def _and_count(first: bytearray, second: bytearray) -> int:
+    return sum(compress(first, second))
+
+
+def deck_stats(columns: MetaColumns) -> DeckStats:
+    """
+    Compute statistics of cards in given columns
+
+    * `columns` - meta data of cards
+
+    Each column is only passed over once or twice (mostly in C, such as
+    sorting an array or counting characters of a string), `Card` objects
+    are not created.
+    """
+    result = DeckStats(len(columns))
+    # Same as never studied in `sbx.core.forecast.forecast`
+    studied = bytearray(
+        0 if next_ == -1 or reps == 0 else 1
+        for next_, reps in zip(columns.next, columns.actual_repetitions)
+    )
+    result.studied = studied.count(1)
+    result.leech = _and_count(is_leech_batch(columns), studied)
+    result.zero = _and_count(is_last_zero_batch(columns), studied)
+    intervals = sorted(compress(columns.interval, studied))
+    easiness = studied
+    if not all(ALGORITHMS[x].uses_easiness for x in set(columns.algo)):
+        easiness = bytearray(
+            x and ALGORITHMS[y].uses_easiness
+            for x, y in zip(studied, columns.algo)
+        )
+    result.easiness = _histogram(
+        sorted(compress(columns.easiness, easiness)), EASINESS_BUCKETS
+    )
+    result.intervals = _histogram(intervals, INTERVAL_BUCKETS)
+    result.repetitions = _percentiles(sorted(columns.actual_repetitions))
+    past = "".join(columns.past_quality)
+    result.quality = [past.count(x) for x in QUALITIES]
+    result.recalled = _passing(past)
+    studied_past = list(compress(columns.past_quality, studied))
+    result.last_recalled = _passing("".join(x[-1:] for x in studied_past))
+    result.mature = len(intervals) - bisect_left(intervals, MATURE_INTERVAL)
+    result.mature_recalled = _passing(
+        "".join(
+            x[-1:]
+            for x, interval in zip(
+                studied_past, compress(columns.interval, studied)
+            )
+            if interval >= MATURE_INTERVAL
+        )
+    )
+    return result
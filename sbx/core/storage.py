@@ -0,0 +1,332 @@
+"""
+Where card meta data (headers) is kept
+
+By default headers are stored in the first line of each card file (no
+storage object is used). `SqliteStorage` keeps them in an indexed SQLite
+table in the deck root instead, card files are then only written when
+front or back changes.
+"""
+import json
+import os
+import threading
+from typing import TYPE_CHECKING, Iterable, List, Optional, Set, Tuple
+
+from sbx.core.card import BAD_QUALITY_THRESHOLD, LEECH_MIN_QUALITY
+from sbx.core.utility import DAY_IN_SECONDS, unix_time
+
+if TYPE_CHECKING:
+    import sqlite3
+
+STORAGE_FILE = "file"
+STORAGE_SQLITE = "sqlite"
+STORAGES = [STORAGE_FILE, STORAGE_SQLITE]
+SQLITE_FILE_NAME = ".sbx-meta.sqlite"
+SQLITE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    path TEXT PRIMARY KEY,
+    header TEXT NOT NULL,
+    next_day INTEGER NOT NULL,
+    last_day INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    leech INTEGER NOT NULL,
+    zero INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_next_day ON cards (next_day);
+CREATE INDEX IF NOT EXISTS cards_leech ON cards (leech) WHERE leech = 1;
+CREATE INDEX IF NOT EXISTS cards_zero ON cards (zero) WHERE zero = 1;
+"""
+_UPSERT = "INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)"
+# Same as `sbx.core.card.CardAlgo.can_study_now` on UTC day numbers
+_DUE = "last_day != ? AND (next_day <= ? OR reps = 0)"
+
+
+class StorageError(Exception):
+    """Type of exception raised for a storage that cannot be opened"""
+
+    pass
+
+
+class MetaStorage:
+    """
+    Base class of storages keeping card headers outside card files
+
+    Paths are card paths as given to `sbx.core.card.Card`.
+    """
+
+    def read(self, path: str) -> Optional[dict]:
+        """
+        Get header of a card
+
+        * `path` - path of the card
+
+        Returns `None` if the card is not stored.
+        """
+        raise NotImplementedError()
+
+    def write(self, path: str, header: dict):
+        """
+        Store header of a card
+
+        * `path` - path of the card
+        * `header` - header to store
+        """
+        self.write_many([(path, header)])
+
+    def write_many(self, headers: Iterable[Tuple[str, dict]]):
+        """
+        Store headers of many cards at once
+
+        * `headers` - path & header of each card
+        """
+        raise NotImplementedError()
+
+    def keys(self) -> Set[str]:
+        """Get keys (see `key`) of all stored cards"""
+        raise NotImplementedError()
+
+    def key(self, path: str) -> str:
+        """
+        Get key a card is stored with
+
+        * `path` - path of the card
+        """
+        raise NotImplementedError()
+
+    def remove_missing(self, keys: Iterable[str]) -> int:
+        """
+        Forget cards whose files no longer exist
+
+        * `keys` - keys of cards to check
+
+        Returns number of cards removed.
+        """
+        raise NotImplementedError()
+
+    def select(
+        self,
+        include_unscheduled: bool = False,
+        filter_to_leech: bool = False,
+        filter_to_last_zero: bool = False,
+        now: Optional[int] = None,
+    ) -> List[Tuple[str, dict]]:
+        """
+        Get key & header of stored cards, same selection as
+        `sbx.core.study.CardStack` (default is cards due today)
+
+        * `include_unscheduled` - include cards not scheduled for today
+        * `filter_to_leech` - only leech cards
+        * `filter_to_last_zero` - only cards last marked as zero
+        * `now` - current UNIX timestamp (defaults to current time)
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """Release resources of this storage"""
+        pass
+
+
+def _row(key: str, header: dict) -> Tuple:
+    past = header["pastq"]
+    leech = len(past) >= LEECH_MIN_QUALITY and all(
+        int(x) < BAD_QUALITY_THRESHOLD for x in past[-LEECH_MIN_QUALITY:]
+    )
+    return (
+        key,
+        json.dumps(header),
+        header["next"] // DAY_IN_SECONDS,
+        header["last"] // DAY_IN_SECONDS,
+        header.get("reps", len(past)),
+        int(leech),
+        int(past[-1:] == "0"),
+    )
+
+
+class SqliteStorage(MetaStorage):
+    """Headers in an indexed SQLite table, safe to use from many threads"""
+
+    def __init__(self, root: str):
+        """
+        Open (or create) the storage of a deck
+
+        * `root` - root directory of the deck (database is stored here)
+
+        Raises `StorageError` if the database cannot be opened.
+        """
+        # WHY: Only imported when needed as it is slow to import
+        import sqlite3
+
+        self._root = os.path.abspath(root)
+        self._file = os.path.join(self._root, SQLITE_FILE_NAME)
+        self._lock = threading.Lock()
+        self._connection: "sqlite3.Connection"
+        try:
+            # WHY: Autocommit, each single write is durable on its own
+            self._connection = sqlite3.connect(
+                self._file, check_same_thread=False, isolation_level=None
+            )
+        except sqlite3.Error as ex:
+            raise StorageError("{}: {}".format(self._file, ex)) from ex
+        try:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(
+                "PRAGMA user_version = {}".format(SQLITE_VERSION)
+            )
+        except sqlite3.Error as ex:
+            self._connection.close()
+            raise StorageError("{}: {}".format(self._file, ex)) from ex
+
+    @property
+    def file(self) -> str:
+        """Get path of the database"""
+        return self._file
+
+    def __len__(self):
+        with self._lock:
+            cursor = self._connection.execute("SELECT COUNT(*) FROM cards")
+            return cursor.fetchone()[0]
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self._root)
+
+    def read(self, path: str) -> Optional[dict]:
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT header FROM cards WHERE path = ?", (self.key(path),)
+            )
+            row = cursor.fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def write_many(self, headers: Iterable[Tuple[str, dict]]):
+        rows = [_row(self.key(path), header) for path, header in headers]
+        if not rows:
+            return
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(_UPSERT, rows)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def keys(self) -> Set[str]:
+        with self._lock:
+            cursor = self._connection.execute("SELECT path FROM cards")
+            return {x[0] for x in cursor}
+
+    def remove_missing(self, keys: Iterable[str]) -> int:
+        missing = [
+            (x,)
+            for x in keys
+            if not os.path.isfile(os.path.join(self._root, x))
+        ]
+        if missing:
+            with self._lock:
+                self._connection.executemany(
+                    "DELETE FROM cards WHERE path = ?", missing
+                )
+        return len(missing)
+
+    def _query(
+        self,
+        include_unscheduled: bool = False,
+        filter_to_leech: bool = False,
+        filter_to_last_zero: bool = False,
+        now: Optional[int] = None,
+    ) -> Tuple[str, List[int]]:
+        conditions = []
+        params: List[int] = []
+        if not include_unscheduled:
+            if now is None:
+                now = unix_time()
+            today = now // DAY_IN_SECONDS
+            conditions.append(_DUE)
+            params += [today, today]
+        if filter_to_leech:
+            conditions.append("leech = 1")
+        if filter_to_last_zero:
+            conditions.append("zero = 1")
+        query = "SELECT path, header FROM cards"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query, params
+
+    def select(
+        self,
+        include_unscheduled: bool = False,
+        filter_to_leech: bool = False,
+        filter_to_last_zero: bool = False,
+        now: Optional[int] = None,
+    ) -> List[Tuple[str, dict]]:
+        query, params = self._query(
+            include_unscheduled, filter_to_leech, filter_to_last_zero, now
+        )
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [(key, json.loads(header)) for key, header in rows]
+
+    def explain(self, *selection: bool) -> List[str]:
+        """
+        Get SQLite query plan of `select` (to check indexes are used)
+
+        * `selection` - same arguments as `select`
+        """
+        query, params = self._query(*selection)
+        with self._lock:
+            cursor = self._connection.execute(
+                "EXPLAIN QUERY PLAN " + query, params
+            )
+            return [x[-1] for x in cursor]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def open_storage(
+    root: str, storage: Optional[str] = None
+) -> Optional[MetaStorage]:
+    """
+    Open storage of a deck
+
+    * `root` - root directory of the deck
+    * `storage` - one of `STORAGES`, if not given SQLite is used when
+        the deck already has a database
+
+    Returns `None` for headers stored in card files, raises
+    `StorageError` if the storage cannot be opened.
+    """
+    if storage is None:
+        if os.path.isfile(os.path.join(root, SQLITE_FILE_NAME)):
+            storage = STORAGE_SQLITE
+        else:
+            storage = STORAGE_FILE
+    if storage == STORAGE_FILE:
+        return None
+    if storage == STORAGE_SQLITE:
+        return SqliteStorage(root)
+    raise ValueError("Unknown storage {!r}".format(storage))
+
+
+def find_root(directory: str) -> str:
+    """
+    Get root directory of the deck a directory belongs to, which is the
+    closest of it or its parents with a SQLite storage (given directory
+    if there is none)
+
+    * `directory` - a directory in a deck (such as of a single card)
+    """
+    directory = os.path.abspath(directory)
+    current = directory
+    while True:
+        if os.path.isfile(os.path.join(current, SQLITE_FILE_NAME)):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return directory
+        current = parent
@@ -1,10 +1,140 @@
 """
 Contains classes used for selecting cards to study
 """
+import os
+import stat
 from pathlib import Path
-from typing import Iterator
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
-from sbx.core.card import Card, InvalidCardLoadAttempted
+from sbx.core.card import (
+    Card,
+    CardMeta,
+    InvalidCardLoadAttempted,
+    can_study_now_batch,
+    get_algorithm,
+    is_last_zero_batch,
+    is_leech_batch,
+    read_header,
+)
+from sbx.core.columns import DeckColumns, MetaColumns
+from sbx.core.index import HeaderIndex
+from sbx.core.metrics import (
+    FILES_VISITED,
+    HEADERS_INVALID,
+    HEADERS_PARSED,
+    INDEX_HITS,
+    INDEX_MISSES,
+    METRICS,
+)
+from sbx.core.query import ORDERS, Where, order_cards
+from sbx.core.walk import (
+    DEFAULT_EXCLUDES,
+    IGNORE_FILE_NAME,
+    PathFilter,
+    read_ignore_file,
+    walk_cards,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from sbx.core.reviewlog import ReviewLog
+    from sbx.core.storage import MetaStorage
+    from sbx.core.watch import DeckWatcher
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+EXECUTORS = [EXECUTOR_THREAD, EXECUTOR_PROCESS]
+# Number of files given to a worker at once
+THREAD_CHUNK_SIZE = 8
+PROCESS_CHUNK_SIZE = 64
+# Number of chunks waiting in the queue for each worker
+CHUNKS_PER_WORKER = 4
+
+# Result of scanning a single file
+SCAN_MISSING = 0
+SCAN_CACHED = 1
+SCAN_INVALID = 2
+SCAN_READ = 3
+
+ScanResult = Tuple[str, int, Optional[os.stat_result], Optional[dict]]
+
+
+def _scan_header(
+    path: str, signature: Optional[Tuple[int, int]]
+) -> ScanResult:
+    """
+    Read header of a single file, unless it matches given signature
+
+    * `path` - path of the file
+    * `signature` - `(mtime_ns, size)` of the file in index (if any)
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return path, SCAN_MISSING, None, None
+    if not stat.S_ISREG(stat_result.st_mode):
+        return path, SCAN_MISSING, None, None
+    if signature is not None and signature == (
+        stat_result.st_mtime_ns,
+        stat_result.st_size,
+    ):
+        return path, SCAN_CACHED, stat_result, None
+    try:
+        return path, SCAN_READ, stat_result, read_header(path)
+    except FileNotFoundError:
+        return path, SCAN_MISSING, None, None
+    except InvalidCardLoadAttempted:
+        return path, SCAN_INVALID, stat_result, None
+
+
+def _scan_headers(
+    chunk: List[Tuple[str, Optional[Tuple[int, int]]]]
+) -> List[ScanResult]:
+    """
+    Read headers of a chunk of files (runs in a worker)
+
+    * `chunk` - list of `(path, signature)` tuples
+    """
+    return [_scan_header(path, signature) for path, signature in chunk]
+
+
+def _and(first: bytearray, second: bytearray) -> bytearray:
+    return bytearray(x & y for x, y in zip(first, second))
+
+
+def selection_mask(
+    columns: MetaColumns,
+    include_unscheduled: bool = False,
+    filter_to_leech: bool = False,
+    filter_to_last_zero: bool = False,
+) -> bytearray:
+    """
+    Get a mask of cards to study, same selection as `CardStack.iter`
+
+    * `columns` - meta data of cards
+    * `include_unscheduled` - include cards not scheduled for today
+    * `filter_to_leech` - only select leech cards
+    * `filter_to_last_zero` - only select cards last marked as zero
+    """
+    mask = bytearray([1]) * len(columns)
+    if not include_unscheduled:
+        mask = _and(mask, can_study_now_batch(columns))
+    if filter_to_leech:
+        mask = _and(mask, is_leech_batch(columns))
+    if filter_to_last_zero:
+        mask = _and(mask, is_last_zero_batch(columns))
+    return mask
 
 
 class CardStack:
@@ -17,6 +147,16 @@ class CardStack:
         include_unscheduled: bool = False,
         filter_to_leech: bool = False,
         filter_to_last_zero: bool = False,
+        use_index: bool = True,
+        jobs: int = 1,
+        executor: str = EXECUTOR_THREAD,
+        exclude: Optional[List[str]] = None,
+        include: Optional[List[str]] = None,
+        where: Optional[Where] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        storage: Optional["MetaStorage"] = None,
+        review_log: Optional["ReviewLog"] = None,
     ):
         """
         Initialize a card stack with `.md` files in given location
@@ -27,41 +167,356 @@ class CardStack:
         * `filter_to_leech` - create a subset where all cards are leech
         * `filter_to_last_zero` - create a subset where all cards have
             marked last time as zero
+        * `use_index` - use a persistent header index (`.sbx-index`)
+            stored in `path` to avoid reopening unchanged cards
+        * `jobs` - number of workers used to read headers
+            (`1` reads headers in current thread)
+        * `executor` - kind of workers to use, `"thread"` or `"process"`
+        * `exclude` - glob patterns of files & directories to skip, these
+            are used in addition to `.sbxignore` in `path` and
+            `sbx.core.walk.DEFAULT_EXCLUDES`
+        * `include` - glob patterns of files to keep (all if not given)
+        * `where` - only keep cards matching this expression (checked
+            against headers, before a `Card` is created)
+        * `order` - order of cards returned by `iter`, one of
+            `sbx.core.query.ORDERS` (`None` returns them as found)
+        * `limit` - maximum number of cards returned by `iter`
+        * `storage` - take headers from this storage instead of card files
+            (header index is not used), cards found for the first time
+            are added to it
+        * `review_log` - `sbx.core.reviewlog.ReviewLog` given to cards,
+            so every mark is logged
         """
+        if jobs < 1:
+            raise ValueError("Number of jobs must be at least 1")
+        if executor not in EXECUTORS:
+            raise ValueError("Unknown executor {!r}".format(executor))
+        if order is not None and order not in ORDERS:
+            raise ValueError("Unknown order {!r}".format(order))
+        if limit is not None and limit < 1:
+            raise ValueError("Limit must be at least 1")
         self._path = Path(path)
         self._recursive = recursive
         self._all = include_unscheduled
         self._filter_to_leech = filter_to_leech
         self._filter_to_last_zero = filter_to_last_zero
+        self._jobs = jobs
+        self._executor = executor
+        self._path_filter = PathFilter(
+            DEFAULT_EXCLUDES
+            + read_ignore_file(os.path.join(path, IGNORE_FILE_NAME))
+            + (exclude or []),
+            include,
+        )
+        self._where = where
+        self._order = order
+        self._limit = limit
+        self._storage = storage
+        self._review_log = review_log
+        self._skipped: List[str] = []
+        self._index: Optional[HeaderIndex] = None
+        if use_index and storage is None:
+            self._index = HeaderIndex(path)
+
+    @property
+    def path(self) -> str:
+        """Get path this stack is scanning"""
+        return str(self._path)
+
+    @property
+    def index(self) -> Optional[HeaderIndex]:
+        """Get header index used by this stack (if any)"""
+        return self._index
+
+    @property
+    def storage(self) -> Optional["MetaStorage"]:
+        """Get storage headers are kept in (if not in card files)"""
+        return self._storage
+
+    @property
+    def skipped(self) -> List[str]:
+        """
+        Get paths of cards skipped by the last scan, as their header is
+        not valid (such as when `algo` is not one of
+        `sbx.core.card.ALGORITHMS`)
+        """
+        return self._skipped
+
+    def watch(self) -> "DeckWatcher":
+        """
+        Start watching cards of this stack, give paths of changed cards
+        to `refresh` (Linux only, raises `OSError` elsewhere)
+        """
+        from sbx.core.watch import DeckWatcher
+
+        return DeckWatcher(str(self._path), self._recursive, self._path_filter)
+
+    def _get_files(self) -> Iterator[str]:
+        return walk_cards(str(self._path), self._recursive, self._path_filter)
+
+    def _signature(self, path: str) -> Optional[Tuple[int, int]]:
+        if self._index is None:
+            return None
+        return self._index.signature(path)
+
+    def _to_header(
+        self, result: ScanResult, append: bool = False
+    ) -> Optional[dict]:
+        path, status, stat_result, header = result
+        index = self._index
+        if status == SCAN_MISSING or stat_result is None:
+            if append and index is not None:
+                index.discard(path)
+            return None
+        if status == SCAN_CACHED and index is not None:
+            METRICS.inc(INDEX_HITS)
+            _, header = index.lookup(path, stat_result)
+            if header is None and not append:
+                self._skipped.append(path)
+            return header
+        if header is not None:
+            try:
+                CardMeta().update_from_dict(header)
+            except (ValueError, KeyError, TypeError):
+                header = None
+        METRICS.inc(HEADERS_PARSED if header is not None else HEADERS_INVALID)
+        if header is None and not append:
+            self._skipped.append(path)
+        if index is not None:
+            METRICS.inc(INDEX_MISSES)
+            if append:
+                index.record(path, stat_result, header)
+            else:
+                index.put(path, stat_result, header)
+        return header
+
+    def read(self, path: str) -> Optional[dict]:
+        """
+        Read header of a single card again, such as after it has changed
+        (index is updated right away)
 
-    def _get_files(self):
-        if self._recursive:
-            files = self._path.glob("**/*.md")
+        * `path` - path of the card
+
+        Returns `None` if the card is missing or is not a valid card.
+        """
+        if self._storage is not None:
+            if not os.path.isfile(path):
+                return None
+            header = self._storage.read(path)
+            if header is None:
+                header = self._to_header(_scan_header(path, None))
+                if header is not None:
+                    self._storage.write(path, header)
+            return header
+        return self._to_header(
+            _scan_header(path, self._signature(path)), append=True
+        )
+
+    def refresh(self, paths: Iterable[str]) -> Iterator[Card]:
+        """
+        Read given cards again and get the ones we need to study
+
+        * `paths` - paths of cards that were created, changed or removed
+        """
+        for path in paths:
+            header = self.read(path)
+            if header is None or not self._wanted(header):
+                continue
+            card = Card(
+                path,
+                headers=header,
+                index=self._index,
+                storage=self._storage,
+                review_log=self._review_log,
+            )
+            if self._selected(card.meta):
+                yield card
+
+    def _scan_serial(
+        self, paths: Iterable[str]
+    ) -> Generator[ScanResult, None, None]:
+        for path in paths:
+            yield _scan_header(path, self._signature(path))
+
+    def _scan_parallel(
+        self, paths: Iterable[str]
+    ) -> Generator[ScanResult, None, None]:
+        # WHY: Only imported when needed as it is slow to import
+        from concurrent.futures import (
+            FIRST_COMPLETED,
+            ProcessPoolExecutor,
+            ThreadPoolExecutor,
+            wait,
+        )
+
+        if self._executor == EXECUTOR_PROCESS:
+            pool_class = ProcessPoolExecutor
+            chunk_size = PROCESS_CHUNK_SIZE
+        else:
+            pool_class = ThreadPoolExecutor  # type: ignore
+            chunk_size = THREAD_CHUNK_SIZE
+        max_pending = self._jobs * CHUNKS_PER_WORKER
+        pending: Set["Future"] = set()
+        pool = pool_class(max_workers=self._jobs)
+        try:
+            chunk: List[Tuple[str, Optional[Tuple[int, int]]]] = []
+            for path in paths:
+                chunk.append((path, self._signature(path)))
+                if len(chunk) < chunk_size:
+                    continue
+                pending.add(pool.submit(_scan_headers, chunk))
+                chunk = []
+                # WHY: Only keep a bounded amount of work queued, and yield
+                #    whatever is completed while the walk continues
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            if chunk:
+                pending.add(pool.submit(_scan_headers, chunk))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+
+    def _wanted(self, header: dict) -> bool:
+        return self._where is None or self._where.matches(header)
+
+    def _selected(self, meta: CardMeta) -> bool:
+        algorithm = get_algorithm(meta.algo)
+        return (
+            (self._all or algorithm.can_study_now(meta))
+            and (
+                not self._filter_to_leech
+                or (self._filter_to_leech and algorithm.is_leech(meta))
+            )
+            and (
+                not self._filter_to_last_zero
+                or (self._filter_to_last_zero and algorithm.is_last_zero(meta))
+            )
+        )
+
+    def _iter_stored_headers(self) -> Iterator[Tuple[str, dict]]:
+        storage = self._storage
+        assert storage is not None
+        stored = storage.keys()
+        found: Dict[str, str] = {}
+        unknown: List[str] = []
+        for path in self._get_files():
+            METRICS.inc(FILES_VISITED)
+            key = storage.key(path)
+            found[key] = path
+            if key not in stored:
+                unknown.append(path)
+        # WHY: Cards found for the first time are moved to the storage
+        results: Generator[ScanResult, None, None]
+        if self._jobs > 1:
+            results = self._scan_parallel(unknown)
         else:
-            files = self._path.glob("*.md")
+            results = self._scan_serial(unknown)
+        new: List[Tuple[str, dict]] = []
+        for result in results:
+            header = self._to_header(result)
+            if header is not None:
+                new.append((result[0], header))
+        storage.write_many(new)
+        storage.remove_missing(stored.difference(found))
+        # WHY: Due, leech & zero are selected by the storage (indexed)
+        for key, stored_header in storage.select(
+            self._all, self._filter_to_leech, self._filter_to_last_zero
+        ):
+            if key in found:
+                yield found[key], stored_header
+
+    def _iter_headers(self) -> Iterator[Tuple[str, dict]]:
+        """Get path & header of every valid card in this stack"""
+        self._skipped = []
+        if self._storage is not None:
+            yield from self._iter_stored_headers()
+            return
+        seen: Set[str] = set()
+        complete = False
 
-        return files
+        def paths():
+            for path in self._get_files():
+                seen.add(path)
+                METRICS.inc(FILES_VISITED)
+                yield path
+
+        results: Generator[ScanResult, None, None]
+        if self._jobs > 1:
+            results = self._scan_parallel(paths())
+        else:
+            results = self._scan_serial(paths())
+        try:
+            for result in results:
+                header = self._to_header(result)
+                if header is not None:
+                    yield result[0], header
+            complete = True
+        finally:
+            results.close()
+            if self._index is not None:
+                if complete:
+                    self._index.prune(seen, self._recursive)
+                self._index.save()
 
     def iter(self) -> Iterator[Card]:
         """
         Get cards we need to study (depend on how you constructed the class)
+
+        Without an `order`, if more than one job is used cards are
+        returned in the order their headers are read. With an `order`
+        cards are returned once all headers are read.
         """
-        for card_file in self._get_files():
-            if not card_file.is_file():
-                continue
-            try:
-                card = Card(str(card_file))
-            except InvalidCardLoadAttempted:
-                continue
-            if (
-                (self._all or card.today)
-                and (
-                    not self._filter_to_leech
-                    or (self._filter_to_leech and card.leech)
-                )
-                and (
-                    not self._filter_to_last_zero
-                    or (self._filter_to_last_zero and card.zero)
-                )
+        headers = self._iter_headers()
+
+        def selected() -> Iterator[Tuple[str, dict]]:
+            for path, header in headers:
+                if not self._wanted(header):
+                    continue
+                try:
+                    meta = CardMeta(header)
+                except (ValueError, KeyError, TypeError):
+                    # WHY: Stored headers are not checked again when read
+                    self._skipped.append(path)
+                    continue
+                if self._selected(meta):
+                    yield path, header
+
+        try:
+            # WHY: Cards are only created for headers that are kept
+            for path, header in order_cards(
+                selected(), self._order, self._limit
             ):
-                yield card
+                yield Card(
+                    path,
+                    headers=header,
+                    index=self._index,
+                    storage=self._storage,
+                    review_log=self._review_log,
+                )
+        finally:
+            headers.close()  # type: ignore
+
+    def to_columns(self) -> DeckColumns:
+        """
+        Get cards we need to study as a `sbx.core.columns.DeckColumns`
+        (without creating `Card` objects)
+
+        All selected cards are kept, `order` & `limit` are not used.
+        """
+        deck = DeckColumns(index=self._index)
+        for path, header in self._iter_headers():
+            if self._wanted(header):
+                deck.append_card(path, header)
+        mask = selection_mask(
+            deck, self._all, self._filter_to_leech, self._filter_to_last_zero
+        )
+        if all(mask):
+            return deck
+        return deck.select(mask)
@@ -0,0 +1,197 @@
+"""
+Phase level profiling of SBX
+
+Timed spans are recorded by wrapping a fixed set of functions while a
+`Tracer` is running. Nothing is wrapped otherwise, so there is no
+overhead when profiling is disabled.
+"""
+import functools
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+TRACE_ENV = "SBX_TRACE"
+# Write summary table to `stderr`
+STDERR = "-"
+
+# (span name, module, attribute path) of everything that is timed
+TARGETS = [
+    ("scan.get_files", "sbx.core.study", "CardStack._get_files"),
+    ("scan.read_header", "sbx.core.study", "read_header"),
+    ("card.read_header", "sbx.core.card", "read_header"),
+    ("card.load_headers", "sbx.core.card", "Card._load_headers"),
+    ("card.load", "sbx.core.card", "Card._load"),
+    ("card.save", "sbx.core.card", "Card.save"),
+    ("sm2.mark", "sbx.core.card", "Sm2.mark"),
+    ("algo.mark", "sbx.core.card", "_SteppedAlgo.mark"),
+    ("cli.print", "sbx.core.utility", "Text.print"),
+    ("ui.render", "prompt_toolkit.renderer", "Renderer.render"),
+]
+
+# (name, start in seconds, duration in seconds, thread id)
+Event = Tuple[str, float, float, int]
+
+
+class Tracer:
+    """Records timed spans of `TARGETS` between `start` & `stop`"""
+
+    def __init__(self, output: str = STDERR):
+        """
+        Create a tracer
+
+        * `output` - `"-"` to write a summary table to `stderr`, path of
+            a `.json` file to write a Chrome trace (`chrome://tracing`),
+            or path of any other file to write the summary table to
+        """
+        self._output = output
+        self._events: List[Event] = []
+        self._patched: List[Tuple[Any, str, Any]] = []
+        self._origin = 0.0
+
+    @property
+    def events(self) -> List[Event]:
+        """Get recorded events"""
+        return self._events
+
+    def start(self):
+        """Wrap all targets and start recording"""
+        self._origin = time.perf_counter()
+        for name, module_name, attribute in TARGETS:
+            try:
+                owner: Any = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            *parents, leaf = attribute.split(".")
+            for parent in parents:
+                owner = getattr(owner, parent)
+            original = owner.__dict__[leaf]
+            self._patched.append((owner, leaf, original))
+            setattr(owner, leaf, self._wrap(name, original))
+
+    def stop(self):
+        """Restore all targets"""
+        for owner, leaf, original in reversed(self._patched):
+            setattr(owner, leaf, original)
+        self._patched = []
+
+    def _wrap(self, name: str, fnc: Callable) -> Callable:
+        events = self._events
+        clock = time.perf_counter
+
+        def timed_iterator(iterator):
+            # WHY: Time of a generator is spent in each `next` call
+            spent = 0.0
+            first = clock()
+            try:
+                while True:
+                    start = clock()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        spent += clock() - start
+                        return
+                    spent += clock() - start
+                    yield item
+            finally:
+                events.append((name, first, spent, threading.get_ident()))
+
+        @functools.wraps(fnc)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                result = fnc(*args, **kwargs)
+            finally:
+                end = clock()
+            if isinstance(result, types.GeneratorType):
+                return timed_iterator(result)
+            events.append((name, start, end - start, threading.get_ident()))
+            return result
+
+        return wrapper
+
+    def summary(self) -> List[Tuple[str, int, float, float]]:
+        """Get `(name, calls, total seconds, max seconds)` of each span"""
+        totals: Dict[str, List] = {}
+        for name, _, duration, _ in self._events:
+            total = totals.setdefault(name, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += duration
+            total[2] = max(total[2], duration)
+        rows = [(name, x[0], x[1], x[2]) for name, x in totals.items()]
+        return sorted(rows, key=lambda x: -x[2])
+
+    def write_summary(self, stream: TextIO):
+        """
+        Write summary table
+
+        * `stream` - stream to write to
+        """
+        row = "{:<20} {:>10} {:>12} {:>12} {:>12}\n"
+        stream.write(
+            row.format("span", "calls", "total ms", "mean ms", "max ms")
+        )
+        for name, calls, total, longest in self.summary():
+            stream.write(
+                row.format(
+                    name,
+                    calls,
+                    "{:.3f}".format(total * 1000),
+                    "{:.3f}".format(total * 1000 / calls),
+                    "{:.3f}".format(longest * 1000),
+                )
+            )
+
+    def chrome_trace(self) -> dict:
+        """Get recorded events in Chrome trace event format"""
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": name.split(".")[0],
+                    "ph": "X",
+                    "ts": round((start - self._origin) * 1e6, 3),
+                    "dur": round(duration * 1e6, 3),
+                    "pid": pid,
+                    "tid": tid,
+                }
+                for name, start, duration, tid in self._events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self):
+        """Write recorded spans to configured output"""
+        if self._output == STDERR:
+            self.write_summary(sys.stderr)
+            return
+        with open(self._output, "w", encoding="utf-8") as h:
+            if self._output.endswith(".json"):
+                json.dump(self.chrome_trace(), h)
+            else:
+                self.write_summary(h)
+
+
+def tracer_from_settings(
+    option: Optional[str], environment: Optional[str]
+) -> Optional[Tracer]:
+    """
+    Create a tracer from `--profile` options or `SBX_TRACE` variable
+
+    * `option` - `"-"` for `--profile`, FILE for `--profile-out FILE`
+        (`None` if neither was given)
+    * `environment` - value of `SBX_TRACE` (`None` if not set)
+
+    `SBX_TRACE` can be `1` (summary to `stderr`) or an output file.
+    """
+    output = option
+    if output is None and environment and environment != "0":
+        output = STDERR if environment == "1" else environment
+    if output is None:
+        return None
+    return Tracer(output)
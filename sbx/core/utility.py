@@ -7,8 +7,8 @@ import time
 import typing
 from datetime import datetime
 
-from prompt_toolkit import print_formatted_text
-from prompt_toolkit.formatted_text import FormattedText
+if typing.TYPE_CHECKING:
+    from prompt_toolkit.formatted_text import FormattedText
 
 UTC_TIMEZONE = dtt.timezone.utc
 # Reference: https://stackoverflow.com/a/39079819/1355145
@@ -95,10 +95,15 @@ class Text:
 
     def print(self):
         """Display current configured text"""
-        print_formatted_text(FormattedText(self.text))
+        # WHY: Importing prompt_toolkit is slow, only do it when needed
+        from prompt_toolkit import print_formatted_text
 
-    def to_formatted(self) -> FormattedText:
+        print_formatted_text(self.to_formatted())
+
+    def to_formatted(self) -> "FormattedText":
         """Get current configured formatted text"""
+        from prompt_toolkit.formatted_text import FormattedText
+
         return FormattedText(self.text)
 
 
@@ -184,7 +189,7 @@ def print_error(text: str):
 
     * `text` - text to print
     """
-    print_formatted_text(FormattedText([("#ff0000", text)]))
+    Text().red(text).print()
 
 
 def unix_time() -> int:
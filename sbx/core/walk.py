@@ -0,0 +1,153 @@
+"""
+Deck walker built on `os.scandir` with exclude & include patterns
+"""
+import fnmatch
+import os
+import re
+from typing import Iterator, List, Optional, Set
+
+IGNORE_FILE_NAME = ".sbxignore"
+CARD_SUFFIX = ".md"
+DEFAULT_EXCLUDES = [".git", ".hg", ".svn", "node_modules", "__pycache__"]
+
+
+def _compile(patterns: List[str]) -> Optional["re.Pattern[str]"]:
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(x) for x in patterns))
+
+
+def read_ignore_file(path: str) -> List[str]:
+    """
+    Read patterns from an ignore file (one glob pattern per line)
+
+    * `path` - path of the ignore file
+
+    Empty lines and lines starting with `#` are skipped.
+    A missing file gives no patterns.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as h:
+            lines = h.read().splitlines()
+    except OSError:
+        return []
+    patterns = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        patterns.append(line)
+    return patterns
+
+
+class PathFilter:
+    """
+    Glob based exclude & include patterns compiled once
+
+    A pattern without a `/` is matched against the name of a file or a
+    directory at any level. A pattern with a `/` is matched against the
+    path relative to the deck root (using `/` as separator).
+    """
+
+    def __init__(
+        self,
+        exclude: Optional[List[str]] = None,
+        include: Optional[List[str]] = None,
+    ):
+        """
+        Create a path filter
+
+        * `exclude` - patterns of files & directories to skip
+        * `include` - patterns of files to keep (all if not given)
+        """
+        exclude = [x.rstrip("/") for x in (exclude or [])]
+        include = [x.rstrip("/") for x in (include or [])]
+        self._exclude_name = _compile([x for x in exclude if "/" not in x])
+        self._exclude_path = _compile([x for x in exclude if "/" in x])
+        self._include_name = _compile([x for x in include if "/" not in x])
+        self._include_path = _compile([x for x in include if "/" in x])
+        self._has_include = bool(include)
+
+    def excluded(self, relative: str, name: str) -> bool:
+        """
+        Should given file or directory be skipped?
+
+        * `relative` - path relative to root, separated with `/`
+        * `name` - name of the file or directory
+        """
+        return bool(
+            (self._exclude_name and self._exclude_name.match(name))
+            or (self._exclude_path and self._exclude_path.match(relative))
+        )
+
+    def included(self, relative: str, name: str) -> bool:
+        """
+        Should given file be kept?
+
+        * `relative` - path relative to root, separated with `/`
+        * `name` - name of the file
+        """
+        if not self._has_include:
+            return True
+        return bool(
+            (self._include_name and self._include_name.match(name))
+            or (self._include_path and self._include_path.match(relative))
+        )
+
+
+def walk_cards(
+    root: str, recursive: bool, path_filter: Optional[PathFilter] = None
+) -> Iterator[str]:
+    """
+    Find `.md` files in a directory
+
+    * `root` - directory to scan
+    * `recursive` - scan sub directories too
+    * `path_filter` - filter to select files & prune directories with
+
+    File type information from `os.scandir` is used, so files are not
+    opened or stat-ed here. Excluded directories are never entered.
+    """
+    if path_filter is None:
+        path_filter = PathFilter()
+    root = os.path.normpath(root)
+    # (directory path, prefix of paths yielded, relative path prefix)
+    prefix = "" if root == os.curdir else os.path.join(root, "")
+    stack = [(root, prefix, "")]
+    visited_links: Set[str] = set()
+    while stack:
+        directory, prefix, relative_prefix = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name
+            relative = relative_prefix + name
+            try:
+                if entry.is_dir():
+                    if not recursive or path_filter.excluded(relative, name):
+                        continue
+                    if entry.is_symlink():
+                        # WHY: Avoid going around in circles
+                        real = os.path.realpath(entry.path)
+                        if real in visited_links:
+                            continue
+                        visited_links.add(real)
+                    stack.append(
+                        (
+                            entry.path,
+                            prefix + name + os.sep,
+                            relative + "/",
+                        )
+                    )
+                    continue
+                if not name.endswith(CARD_SUFFIX) or not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if path_filter.excluded(relative, name):
+                continue
+            if not path_filter.included(relative, name):
+                continue
+            yield prefix + name
@@ -0,0 +1,273 @@
+"""
+Watch a deck for changed cards using Linux inotify (through `ctypes`)
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+from sbx.core.walk import CARD_SUFFIX, PathFilter
+
+# Flags & events from `<sys/inotify.h>`
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+# Events that remove a directory from the watched tree
+DIRECTORY_GONE = IN_MOVED_FROM | IN_DELETE
+# Events that add a directory to the watched tree
+DIRECTORY_NEW = IN_MOVED_TO | IN_CREATE
+EVENT = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+    return _libc
+
+
+def is_supported() -> bool:
+    """Can a deck be watched on this platform?"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(_load_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+class Changes:
+    """
+    Changes found by `DeckWatcher.poll`
+
+    * `paths` - cards that were created, modified, moved or removed
+        (read each of them again, a missing file was removed)
+    * `directories` - directories that were removed or moved away, all
+        cards inside them are gone
+    * `overflow` - events were lost, whole deck needs to be scanned again
+    """
+
+    def __init__(self):
+        self.paths: Set[str] = set()
+        self.directories: Set[str] = set()
+        self.overflow = False
+
+    def __bool__(self):
+        return bool(self.paths or self.directories or self.overflow)
+
+
+class DeckWatcher:
+    """
+    Watch cards of a deck, same cards as `sbx.core.walk.walk_cards` finds
+
+    Paths are given in the same form `walk_cards` yields them.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        recursive: bool = False,
+        path_filter: Optional[PathFilter] = None,
+    ):
+        """
+        Start watching a deck
+
+        * `root` - directory to watch
+        * `recursive` - watch sub directories too
+        * `path_filter` - filter to select files & skip directories with
+
+        Raises `OSError` if inotify is not available.
+        """
+        if not is_supported():
+            raise OSError("inotify is not available on this platform")
+        self._libc = _load_libc()
+        self._recursive = recursive
+        self._path_filter = path_filter or PathFilter()
+        self._root = os.path.normpath(root)
+        # watch descriptor -> (directory, prefix of paths, relative prefix)
+        self._watches: Dict[int, Tuple[str, str, str]] = {}
+        self._fd: int = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise _errno_error("inotify_init1")
+        prefix = (
+            "" if self._root == os.curdir else os.path.join(self._root, "")
+        )
+        try:
+            self._add_tree(self._root, prefix, "", None)
+        except BaseException:
+            self.close()
+            raise
+
+    def fileno(self) -> int:
+        """Get file descriptor to wait on (such as with `select`)"""
+        return self._fd
+
+    def close(self):
+        """Stop watching"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._watches = {}
+
+    def __enter__(self) -> "DeckWatcher":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _add_tree(
+        self,
+        directory: str,
+        prefix: str,
+        relative_prefix: str,
+        found: Optional[Set[str]],
+    ):
+        # Watch a directory (and sub directories), add cards to `found`
+        stack = [(directory, prefix, relative_prefix)]
+        while stack:
+            directory, prefix, relative_prefix = stack.pop()
+            descriptor = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), WATCH_MASK
+            )
+            if descriptor < 0:
+                if directory == self._root:
+                    raise _errno_error("inotify_add_watch")
+                # Directory is already gone or cannot be read
+                continue
+            if descriptor in self._watches:
+                # WHY: Same directory (linked) is already watched
+                continue
+            self._watches[descriptor] = (directory, prefix, relative_prefix)
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                relative = relative_prefix + name
+                try:
+                    is_directory = entry.is_dir()
+                except OSError:
+                    continue
+                if is_directory:
+                    if self._recursive and not self._path_filter.excluded(
+                        relative, name
+                    ):
+                        stack.append(
+                            (
+                                entry.path,
+                                prefix + name + os.sep,
+                                relative + "/",
+                            )
+                        )
+                elif found is not None and self._wanted(relative, name):
+                    found.add(prefix + name)
+
+    def _wanted(self, relative: str, name: str) -> bool:
+        return (
+            name.endswith(CARD_SUFFIX)
+            and not self._path_filter.excluded(relative, name)
+            and self._path_filter.included(relative, name)
+        )
+
+    def _remove_tree(self, prefix: str):
+        for descriptor, (_, other, _) in list(self._watches.items()):
+            if other.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, descriptor)
+                del self._watches[descriptor]
+
+    def _read_events(self) -> List[Tuple[int, int, str]]:
+        events: List[Tuple[int, int, str]] = []
+        while True:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                return events
+            position = 0
+            while position < len(data):
+                descriptor, mask, _, length = EVENT.unpack_from(data, position)
+                position += EVENT.size
+                name = data[position : position + length].rstrip(b"\0")
+                position += length
+                events.append((descriptor, mask, os.fsdecode(name)))
+
+    def poll(self, timeout: Optional[float] = None) -> Changes:
+        """
+        Wait for changes & get them
+
+        * `timeout` - seconds to wait (`None` waits until a change)
+
+        Changes are empty if nothing changed before `timeout`.
+        """
+        changes = Changes()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changes
+        for descriptor, mask, name in self._read_events():
+            if mask & IN_Q_OVERFLOW:
+                changes.overflow = True
+                continue
+            watch = self._watches.get(descriptor)
+            if watch is None:
+                continue
+            directory, prefix, relative_prefix = watch
+            if mask & IN_IGNORED or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if mask & IN_IGNORED:
+                    del self._watches[descriptor]
+                if directory == self._root:
+                    # WHY: Deck itself is gone, nothing can be watched
+                    changes.overflow = True
+                continue
+            relative = relative_prefix + name
+            if mask & IN_ISDIR:
+                if not self._recursive or self._path_filter.excluded(
+                    relative, name
+                ):
+                    continue
+                child_prefix = prefix + name + os.sep
+                if mask & DIRECTORY_GONE:
+                    self._remove_tree(child_prefix)
+                    changes.directories.add(prefix + name)
+                if mask & DIRECTORY_NEW:
+                    self._add_tree(
+                        os.path.join(directory, name),
+                        child_prefix,
+                        relative + "/",
+                        changes.paths,
+                    )
+                continue
+            if self._wanted(relative, name):
+                changes.paths.add(prefix + name)
+        return changes
+
+
+def _errno_error(name: str) -> OSError:
+    number = ctypes.get_errno()
+    return OSError(number, "{}: {}".format(name, os.strerror(number)))
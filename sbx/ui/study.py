@@ -3,6 +3,8 @@ Study interface
 """
 import random
 import sys
+import threading
+from typing import Iterator, List, Optional
 
 from prompt_toolkit.filters import Condition
 from prompt_toolkit.key_binding.bindings.focus import (
@@ -12,6 +14,14 @@ from prompt_toolkit.key_binding.bindings.focus import (
 from prompt_toolkit.layout import HSplit, VSplit
 from prompt_toolkit.widgets import Button, Label
 
+from sbx.core.card import Card
+from sbx.core.metrics import (
+    CARDS_ANSWERED,
+    CARDS_SHOWN,
+    METRICS,
+    SAVE_FAILURES,
+)
+from sbx.core.saver import WriteBehindSaver, replay_journal
 from sbx.core.study import CardStack
 from sbx.core.utility import print_error, simplify_path
 from sbx.ui.controls import MarkdownArea
@@ -25,6 +35,7 @@ PATH_CELL = 1
 MODE_BEFORE_ANSWER_VISIBLE = 424
 MODE_SELF_EVAL = 124
 MODE_DONE = 241
+MODE_WAITING = 142
 
 
 class StudyInterface(EditorInterface):
@@ -32,7 +43,21 @@ class StudyInterface(EditorInterface):
     Study user interface that can work with a `CardStack`
     """
 
-    def __init__(self, stack: CardStack):
+    def __init__(
+        self,
+        stack: CardStack,
+        streaming: bool = False,
+        write_behind: bool = False,
+    ):
+        """
+        Create a study interface
+
+        * `stack` - cards to study
+        * `streaming` - show first card as soon as it's found and keep
+            scanning rest of the stack in background
+        * `write_behind` - save cards in background, see
+            `sbx.core.saver.WriteBehindSaver`
+        """
         self._0_callback = self._continue_with_quality(0)
         self._1_callback = self._continue_with_quality(1)
         self._2_callback = self._continue_with_quality(2)
@@ -46,8 +71,140 @@ class StudyInterface(EditorInterface):
             "Press F1 for help",
             "--STUDY--",
         ]
-        self._original_stack = list(stack.iter())
-        self._reset_stack()
+        self._lock = threading.Lock()
+        self._stack: List[Card] = []
+        self._original_stack: List[Card] = []
+        self._scanning = False
+        self._scanner: Optional[threading.Thread] = None
+        self._pending: Optional[Iterator[Card]] = None
+        self._saver: Optional[WriteBehindSaver] = None
+        if write_behind:
+            # Finish saving cards of a session that crashed
+            replay_journal(stack.path, stack.storage, stack.index)
+            self._saver = WriteBehindSaver(
+                stack.path, self._save_failed, storage=stack.storage
+            )
+        if streaming:
+            self._start_stream(stack)
+        else:
+            self._original_stack = list(stack.iter())
+            self._reset_stack()
+
+    def _start_stream(self, stack: CardStack):
+        cards = stack.iter()
+        first = next(cards, None)
+        if first is None:
+            print_error(
+                "Nothing to study now, try again later. Or use -i option."
+            )
+            sys.exit(-1)
+        self._pending = cards
+        self._scanning = True
+        self._swap_button_bar(self.generic_button_bar)
+        self._current = first
+        self._show_front_only()
+        self._mode = MODE_BEFORE_ANSWER_VISIBLE
+
+    def _scan_rest(self, cards: Iterator[Card]):
+        try:
+            for card in cards:
+                with self._lock:
+                    if not self._scanning:
+                        break
+                self._add_card(card)
+        finally:
+            # WHY: Closing the iterator lets the stack store its index
+            cards.close()  # type: ignore
+            with self._lock:
+                self._scanning = False
+            self._call_in_ui(self._scan_finished)
+
+    def _add_card(self, card: Card):
+        with self._lock:
+            # WHY: Swap with a random position = incremental shuffle
+            self._stack.append(card)
+            pos = random.randint(0, len(self._stack) - 1)
+            self._stack[pos], self._stack[-1] = (
+                self._stack[-1],
+                self._stack[pos],
+            )
+        self._call_in_ui(self._card_arrived)
+
+    def _call_in_ui(self, fnc):
+        loop = getattr(self.application, "loop", None)
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(fnc)
+
+    def _card_arrived(self):
+        if self._mode == MODE_WAITING:
+            self._next_card()
+        self.get_current_app().invalidate()
+
+    def _scan_finished(self):
+        if self._mode == MODE_WAITING:
+            self._all_done()
+        self.get_current_app().invalidate()
+
+    def _pop_card(self) -> Optional[Card]:
+        with self._lock:
+            if not self._stack:
+                return None
+            return self._stack.pop()
+
+    def _next_card(self):
+        card = self._pop_card()
+        if card is None:
+            return
+        self._swap_button_bar(self.generic_button_bar)
+        self._current = card
+        self._show_front_only()
+        self._mode = MODE_BEFORE_ANSWER_VISIBLE
+
+    def _all_done(self):
+        # WHY? Focus on label otherwise message_box cannot
+        #    find current item in focus stack :)
+        self._swap_button_bar(self.empty_button_bar)
+        self.message_box(TITLE, "You have completed all the cards for today.")
+        self._mode = MODE_DONE
+
+    def _get_label_text(self):
+        with self._lock:
+            due = len(self._stack)
+            scanning = self._scanning
+        if self._mode in (MODE_BEFORE_ANSWER_VISIBLE, MODE_SELF_EVAL):
+            due += 1
+        progress = "{} due".format(due)
+        if scanning:
+            progress += " / scanning\u2026"
+        return " | ".join(self._label_text_parts + [progress])
+
+    def run(self):
+        if self._pending is not None:
+            self._scanner = threading.Thread(
+                target=self._scan_rest, args=(self._pending,), daemon=True
+            )
+            self._pending = None
+            self._scanner.start()
+        if self._saver is not None:
+            self._saver.start()
+        try:
+            super().run()
+        finally:
+            with self._lock:
+                self._scanning = False
+            # WHY: Scanner stores the header index as it stops, let it
+            #    finish before the saver is closed & the process exits
+            if self._scanner is not None:
+                self._scanner.join()
+            if self._saver is not None:
+                self._saver.close()
+                for card, ex in self._saver.failed:
+                    print_error(
+                        "Failed to update flash card {!r} - {}".format(
+                            card.path, ex
+                        )
+                    )
 
     def _reset_stack(self):
         self._stack = self._original_stack[:]
@@ -71,29 +228,44 @@ class StudyInterface(EditorInterface):
     def _mark_and_continue(self, quality: int):
         if self._mode != MODE_SELF_EVAL:
             return
-        if not self._stack:
-            # WHY? Focus on label otherwise message_box cannot
-            #    find current item in focus stack :)
-            self._swap_button_bar(self.empty_button_bar)
-            self.message_box(
-                TITLE, "You have completed all the cards for today."
-            )
-            self._mode = MODE_DONE
+        with self._lock:
+            empty = not self._stack
+            scanning = self._scanning
+        if empty and not scanning:
+            self._all_done()
             self._mark_and_save(quality)
             return
         if not self._mark_and_save(quality):
             return
-        self._swap_button_bar(self.generic_button_bar)
-        self._current = self._stack.pop()
-        self._show_front_only()
-        self._mode = MODE_BEFORE_ANSWER_VISIBLE
+        if empty:
+            # Wait until background scan finds another card
+            self._mode = MODE_WAITING
+            self._swap_button_bar(self.waiting_button_bar)
+            self.text_area_front.text = "... scanning for more cards ..."
+            self.text_area_back.text = "..."
+            return
+        self._next_card()
+
+    def _save_failed(self, card: Card, ex: Exception):
+        METRICS.inc(SAVE_FAILURES)
+        message = "Failed to update flash card\nFile = {!r}\n{}".format(
+            card.path, ex
+        )
+        self._call_in_ui(lambda: self.message_box(TITLE, message))
 
     def _mark_and_save(self, quality):
+        before = self._current.meta.to_dict()
         self._current.mark(quality)
+        METRICS.inc(CARDS_ANSWERED)
+        if self._saver is not None:
+            # Errors are reported later by _save_failed
+            self._saver.submit(self._current, before)
+            return True
         try:
             self._current.save()
             return True
         except (IOError, OSError):
+            METRICS.inc(SAVE_FAILURES)
             self.message_box(
                 TITLE,
                 "Failed to update flash card\n"
@@ -120,6 +292,7 @@ class StudyInterface(EditorInterface):
         self.text_area_front.text = self._current.front
         self.text_area_back.text = "... not visible ..."
         self.text_area_scratch.text = ""
+        METRICS.inc(CARDS_SHOWN)
 
     def _get_base_layout(self):
         self.text_area_front = MarkdownArea(readonly=True)
@@ -149,6 +322,10 @@ class StudyInterface(EditorInterface):
         self.empty_button_bar = VSplit(
             [Label("All done!", style="#000000")], style="bg:#cccccc"
         )
+        self.waiting_button_bar = VSplit(
+            [Label("Scanning for more cards...", style="#000000")],
+            style="bg:#cccccc",
+        )
         self.root_container = HSplit(
             [
                 self.generic_button_bar,
@@ -31,7 +31,7 @@ setup(
         "Programming Language :: Python :: 3.10",
     ],
     keywords="study flashcard terminal",
-    packages=find_packages(exclude=["tests", "docs"]),
+    packages=find_packages(exclude=["tests", "docs", "benchmarks"]),
     entry_points={"console_scripts": ["sbx = sbx.__main__:main"]},
     setup_requires=["wheel"],
 )
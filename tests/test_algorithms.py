@@ -0,0 +1,156 @@
+import io
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.cli import run
+from sbx.core.card import (
+    ALGO_SM2,
+    ALGO_SM2_PLUS,
+    ALGO_SM4,
+    ALGORITHMS,
+    Card,
+    CardMeta,
+    InvalidCardLoadAttempted,
+    Sm2Plus,
+    Sm4,
+    get_algorithm,
+)
+from sbx.core.columns import MetaColumns
+from sbx.core.storage import SqliteStorage
+from sbx.core.stats import deck_stats
+from sbx.core.study import CardStack
+from sbx.core.utility import DAY_IN_SECONDS, unix_time
+
+from .utility import Capturing, TempBox, random_metas
+
+
+def _mark_days(algorithm, qualities, late=0):
+    meta = CardMeta()
+    time = unix_time()
+    intervals = []
+    for quality in qualities:
+        with patch("sbx.core.card.unix_time", return_value=time):
+            algorithm.mark(meta, quality)
+        intervals.append(meta.algo_state["b"])
+        time = meta.next_session + late * DAY_IN_SECONDS
+    return intervals, meta
+
+
+class TestAlgorithms(TestCase):
+    def test_registry(self):
+        self.assertEqual(set(ALGORITHMS), {ALGO_SM2, ALGO_SM2_PLUS, ALGO_SM4})
+        self.assertIs(get_algorithm(ALGO_SM4), get_algorithm(ALGO_SM4))
+        with self.assertRaises(ValueError):
+            get_algorithm("sm17")
+
+    def test_good_marks_grow_intervals(self):
+        for algorithm in (Sm2Plus(), Sm4()):
+            intervals, _ = _mark_days(algorithm, [4, 4, 4, 4])
+            self.assertEqual(intervals, sorted(intervals), algorithm)
+            self.assertGreater(intervals[-1], intervals[1], algorithm)
+
+    def test_failure_resets_interval(self):
+        for algorithm in (Sm2Plus(), Sm4()):
+            _, meta = _mark_days(algorithm, [5, 5, 5, 0])
+            self.assertEqual(meta.algo_state["a"], 0, algorithm)
+            self.assertLess(meta.next_session - meta.last_session, 8 * 86400)
+
+    def test_sm2_plus_difficulty(self):
+        _, meta = _mark_days(Sm2Plus(), [1, 1, 1])
+        hard = meta.algo_state["c"]
+        _, meta = _mark_days(Sm2Plus(), [5, 5, 5])
+        self.assertGreater(hard, meta.algo_state["c"])
+        self.assertTrue(0 <= meta.algo_state["c"] <= hard <= 1)
+
+    def test_late_reviews_grow_intervals_more(self):
+        for algorithm in (Sm2Plus(), Sm4()):
+            on_time, _ = _mark_days(algorithm, [4, 4, 4, 4])
+            late, _ = _mark_days(algorithm, [4, 4, 4, 4], late=10)
+            self.assertGreater(late[-1], on_time[-1], algorithm)
+
+    def test_stats_skip_difficulty(self):
+        metas = random_metas(60, [ALGO_SM2, ALGO_SM2_PLUS])
+        result = deck_stats(MetaColumns.from_metas(metas))
+        studied = sum(
+            1 for x in metas if x.algo == ALGO_SM2 and x.actual_repetitions > 0
+        )
+        self.assertEqual(sum(x[1] for x in result.easiness), studied)
+
+
+class TestCardAlgorithm(TestCase):
+    def test_card_follows_algo(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card.md")
+            card = Card(path)
+            self.assertIs(card.algorithm, ALGORITHMS[ALGO_SM2])
+            card.reset(ALGO_SM4)
+            card.mark(5)
+            card.save()
+            card = Card(path)
+            self.assertEqual(card.meta.algo, ALGO_SM4)
+            self.assertIs(card.algorithm, ALGORITHMS[ALGO_SM4])
+            card.reset()
+            self.assertEqual(card.meta.algo, ALGO_SM4)
+            self.assertEqual(card.meta.actual_repetitions, 0)
+            with self.assertRaises(ValueError):
+                card.reset("sm17")
+            self.assertEqual(card.meta.algo, ALGO_SM4)
+
+    def test_unknown_algo_is_invalid(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card.md")
+            with open(path, "r", encoding="utf-8") as h:
+                lines = h.read().split("\n")
+            lines[0] = lines[0].replace('"sm2"', '"sm17"')
+            with open(path, "w", encoding="utf-8") as h:
+                h.write("\n".join(lines))
+            with self.assertRaises(InvalidCardLoadAttempted):
+                Card(path)
+            stack = CardStack(box, True, True, use_index=False)
+            self.assertNotIn(path, [x.path for x in stack.iter()])
+            self.assertEqual(stack.skipped, [path])
+            stack = CardStack(box, True, True)
+            list(stack.iter())
+            stack = CardStack(box, True, True)
+            self.assertNotIn(path, [x.path for x in stack.iter()])
+            self.assertEqual(stack.skipped, [path])
+            with patch("sys.stderr", new_callable=io.StringIO) as stderr:
+                with Capturing():
+                    run(["list", "-ri", "--no-index", box])
+            self.assertIn(path, stderr.getvalue())
+
+    def test_unknown_stored_algo_is_skipped(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card.md")
+            storage = SqliteStorage(box)
+            header = Card(path).meta.to_dict()
+            header["algo"] = "sm17"
+            list(CardStack(box, True, True, storage=storage).iter())
+            storage.write(path, header)
+            stack = CardStack(box, True, True, storage=storage)
+            self.assertNotIn(path, [x.path for x in stack.iter()])
+            self.assertEqual(stack.skipped, [path])
+            storage.close()
+
+    def test_cli(self):
+        with TempBox() as box:
+            path = os.path.join(box, "new.md")
+            with Capturing():
+                run(["create", "--algorithm", ALGO_SM2_PLUS, path])
+            self.assertEqual(Card(path).meta.algo, ALGO_SM2_PLUS)
+            with Capturing():
+                run(["reset", path])
+            self.assertEqual(Card(path).meta.algo, ALGO_SM2_PLUS)
+            with Capturing():
+                run(["reset", "--algorithm", ALGO_SM4, path])
+            self.assertEqual(Card(path).meta.algo, ALGO_SM4)
+            source = os.path.join(box, "source.tsv")
+            with open(source, "w", encoding="utf-8") as h:
+                h.write("Front\tBack\n")
+            target = os.path.join(box, "imported")
+            with Capturing():
+                run(["import", "--algorithm", ALGO_SM4, source, target])
+            (name,) = os.listdir(target)
+            card = Card(os.path.join(target, name))
+            self.assertEqual(card.meta.algo, ALGO_SM4)
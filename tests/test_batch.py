@@ -0,0 +1,61 @@
+import random
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.core.card import ALGORITHMS, CardMeta, get_algorithm, mark_batch
+from sbx.core.columns import MetaColumns
+from sbx.core.utility import DAY_IN_SECONDS, unix_time
+
+from .utility import random_metas
+
+
+class TestBatchScheduling(TestCase):
+    def test_mark_batch_is_same_as_mark(self):
+        rnd = random.Random(7)
+        metas = random_metas(150, list(ALGORITHMS))
+        qualities = [rnd.randint(-1, 5) for _ in metas]
+        now = unix_time() + 3 * DAY_IN_SECONDS
+
+        columns = MetaColumns.from_metas(metas)
+        mark_batch(columns, qualities, now)
+
+        for row, (meta, quality) in enumerate(zip(metas, qualities)):
+            if quality < 0:
+                continue
+            with patch("sbx.core.card.unix_time", return_value=now):
+                get_algorithm(meta.algo).mark(meta, quality)
+            batch_meta = CardMeta(meta.to_dict())
+            columns.store(row, batch_meta)
+            for key, value in meta.to_dict().items():
+                batch_value = batch_meta.to_dict()[key]
+                self.assertEqual(batch_value, value, msg=key)
+                self.assertIs(type(batch_value), type(value), msg=key)
+
+    def test_masks_are_same_as_scalar(self):
+        for name, algorithm in ALGORITHMS.items():
+            metas = random_metas(100, (name,), seed=3) + [CardMeta()]
+            columns = MetaColumns.from_metas(metas)
+            now = unix_time()
+            self.assertEqual(
+                list(algorithm.can_study_now_batch(columns, now)),
+                [int(algorithm.can_study_now(x)) for x in metas],
+                name,
+            )
+            self.assertEqual(
+                list(algorithm.is_leech_batch(columns)),
+                [int(algorithm.is_leech(x)) for x in metas],
+                name,
+            )
+            self.assertEqual(
+                list(algorithm.is_last_zero_batch(columns)),
+                [int(algorithm.is_last_zero(x)) for x in metas],
+                name,
+            )
+
+    def test_mark_batch_needs_quality_per_card(self):
+        columns = MetaColumns.from_metas([CardMeta(), CardMeta()])
+        for algorithm in ALGORITHMS.values():
+            with self.assertRaises(ValueError):
+                algorithm.mark_batch(columns, [3])
+        with self.assertRaises(ValueError):
+            mark_batch(columns, [3])
@@ -0,0 +1,49 @@
+import os
+from unittest import TestCase
+
+from sbx.core.study import EXECUTOR_PROCESS, CardStack
+
+from .utility import BOX_PATH, TempBox
+
+
+class TestCardStack(TestCase):
+    def _paths(self, stack):
+        return sorted(x.path for x in stack.iter())
+
+    def test_parallel_scan_matches_serial_scan(self):
+        serial = self._paths(CardStack(BOX_PATH, True, True, use_index=False))
+        parallel = self._paths(
+            CardStack(BOX_PATH, True, True, use_index=False, jobs=4)
+        )
+        self.assertEqual(len(serial), 9)
+        self.assertEqual(serial, parallel)
+
+    def test_parallel_scan_with_filters(self):
+        serial = self._paths(
+            CardStack(BOX_PATH, True, True, True, use_index=False)
+        )
+        parallel = self._paths(
+            CardStack(BOX_PATH, True, True, True, use_index=False, jobs=3)
+        )
+        self.assertEqual(len(serial), 3)
+        self.assertEqual(serial, parallel)
+
+    def test_process_pool_scan_skips_invalid_cards(self):
+        with TempBox() as box:
+            with open(os.path.join(box, "README.md"), "w") as h:
+                h.write("# Not a card\n")
+            stack = CardStack(
+                box, True, True, jobs=2, executor=EXECUTOR_PROCESS
+            )
+            self.assertEqual(len(self._paths(stack)), 9)
+            # Second scan is served from index built by first scan
+            stack = CardStack(
+                box, True, True, jobs=2, executor=EXECUTOR_PROCESS
+            )
+            self.assertEqual(len(self._paths(stack)), 9)
+
+    def test_invalid_jobs(self):
+        with self.assertRaises(ValueError):
+            CardStack(BOX_PATH, jobs=0)
+        with self.assertRaises(ValueError):
+            CardStack(BOX_PATH, executor="fibers")
@@ -1,9 +1,10 @@
 import os
 from unittest import TestCase
+from unittest.mock import patch
 
-from sbx.core.card import Card
+from sbx.core.card import TEMP_FILE_SUFFIX, Card
 
-BOX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "box")
+from .utility import BOX_PATH, TempBox
 
 
 class TestCard(TestCase):
@@ -48,3 +49,36 @@ class TestCard(TestCase):
             os.remove(card_path)
         except (OSError, IOError):
             pass
+
+    def test_mark_only_rewrites_header(self):
+        with TempBox() as box:
+            card_path = os.path.join(box, "test-card.md")
+            with open(card_path, "rb") as h:
+                original = h.read()
+            card = Card(card_path)
+            card.mark(4)
+            with patch.object(Card, "_load") as load:
+                card.save()
+                load.assert_not_called()
+            with open(card_path, "rb") as h:
+                updated = h.read()
+            self.assertNotEqual(original, updated)
+            self.assertEqual(
+                original.split(b"\n", 1)[1], updated.split(b"\n", 1)[1]
+            )
+            self.assertEqual(Card(card_path).meta.past_quality[-1], 4)
+            self.assertEqual(os.listdir(box).count("test-card.md"), 1)
+            self.assertFalse(
+                [x for x in os.listdir(box) if x.endswith(TEMP_FILE_SUFFIX)]
+            )
+
+    def test_setting_back_keeps_front(self):
+        with TempBox() as box:
+            card_path = os.path.join(box, "test-card.md")
+            front = Card(card_path).front
+            card = Card(card_path)
+            card.back = "New back"
+            card.save()
+            card = Card(card_path)
+            self.assertEqual(front, card.front)
+            self.assertEqual("New back", card.back)
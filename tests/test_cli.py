@@ -4,10 +4,17 @@ from unittest import TestCase
 
 from sbx.cli import run
 
-from .utility import BOX_PATH, Capturing, ChangeDir
+from .utility import Capturing, ChangeDir, TempBox
 
 
 class TestCli(TestCase):
+    def setUp(self):
+        self._temp_box = TempBox()
+        self.box = self._temp_box.__enter__()
+
+    def tearDown(self):
+        self._temp_box.__exit__(None, None, None)
+
     def test_list_all_cards(self):
         expected = [
             "test-card-3.md",
@@ -21,11 +28,11 @@ class TestCli(TestCase):
             os.path.join("c", "test-c-card-zero.md"),
         ]
 
-        with ChangeDir(BOX_PATH) as _:
+        with ChangeDir(self.box) as _:
             with Capturing() as cards:
                 run(["list", "-rni", "."])
         self.assertCountEqual(cards, expected)
-        with ChangeDir(BOX_PATH) as _:
+        with ChangeDir(self.box) as _:
             with Capturing() as cards:
                 run(["list", "-rni", "."])
 
@@ -36,7 +43,7 @@ class TestCli(TestCase):
             os.path.join("python", "leech-python-card.md"),
         ]
 
-        with ChangeDir(BOX_PATH) as _:
+        with ChangeDir(self.box) as _:
             with Capturing() as cards:
                 run(["list", "-rnil", "."])
         self.assertCountEqual(cards, expected)
@@ -56,15 +63,12 @@ class TestCli(TestCase):
             os.path.join("new", "card-2.md"),
         ]
 
-        with ChangeDir(BOX_PATH) as _:
+        with ChangeDir(self.box) as _:
             run(["create", "./new/card-1.md", "Front", "Back"])
             run(["create", "-m", "./new/card-2.md", "Front", "Back"])
 
-        with ChangeDir(BOX_PATH) as _:
+        with ChangeDir(self.box) as _:
             with Capturing() as cards:
                 run(["-u", "list", "-rni", "."])
 
         self.assertCountEqual(cards, expected)
-
-        os.unlink(os.path.join(BOX_PATH, "new", "card-1.md"))
-        os.unlink(os.path.join(BOX_PATH, "new", "card-2.md"))
@@ -0,0 +1,76 @@
+import os
+from unittest import TestCase
+
+from sbx.core.card import read_header
+from sbx.core.study import CardStack
+
+from .utility import BOX_PATH, TempBox
+
+
+class TestDeckColumns(TestCase):
+    def test_same_cards_as_iter(self):
+        for args in [
+            (True, True),
+            (True, False),
+            (True, True, True),
+            (True, True, False, True),
+        ]:
+            stack = CardStack(BOX_PATH, *args, use_index=False)
+            self.assertCountEqual(
+                list(stack.to_columns().paths()),
+                [x.path for x in stack.iter()],
+            )
+
+    def test_header_round_trip(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card-2.md")
+            with open(path, "r") as h:
+                lines = h.readlines()
+            lines[0] = lines[0].replace('"c": ', '"d": 3, "f": true, "c": ')
+            with open(path, "w") as h:
+                h.writelines(lines)
+            deck = CardStack(box, True, True).to_columns()
+            self.assertEqual(len(deck), 9)
+            for row, path in enumerate(deck.paths()):
+                self.assertEqual(deck.path(row), path)
+                self.assertEqual(deck.header(row), read_header(path))
+            self.assertEqual(len(deck.extra), 1)
+
+    def test_only_sm2_registers_are_int(self):
+        deck = CardStack(BOX_PATH, True, True, use_index=False).to_columns()
+        header = dict(deck.header(0), a=2, b=6, c=3)
+        deck.set_header(0, header)
+        self.assertEqual(deck.header(0), header)
+        deck.set_header(0, dict(header, algo="sm4"))
+        self.assertIs(type(deck.header(0)["b"]), float)
+        self.assertIs(type(deck.header(0)["c"]), float)
+
+    def test_card_view(self):
+        deck = CardStack(BOX_PATH, False, True, use_index=False).to_columns()
+        cards = list(deck.cards())
+        self.assertEqual(len(cards), len(deck))
+        card = [x for x in cards if x.path.endswith("test-card.md")][0]
+        self.assertTrue("display" in card.front)
+        self.assertEqual(card.meta.to_dict(), read_header(card.path))
+
+    def test_set_header_and_remove(self):
+        deck = CardStack(BOX_PATH, True, True, use_index=False).to_columns()
+        expected = {x: deck.header(row) for row, x in enumerate(deck.paths())}
+        header = dict(deck.header(0), pastq="555", note="x")
+        deck.set_header(0, header)
+        self.assertEqual(deck.header(0), header)
+        self.assertEqual(deck.extra[0], {"note": "x"})
+        # Last card is moved to removed row
+        first, last = deck.path(0), deck.path(len(deck) - 1)
+        self.assertEqual(deck.remove(0), last)
+        self.assertEqual(deck.path(0), last)
+        del expected[first]
+        # Nothing is moved when last card is removed
+        last = deck.path(len(deck) - 1)
+        self.assertIsNone(deck.remove(len(deck) - 1))
+        del expected[last]
+        self.assertEqual(
+            {x: deck.header(row) for row, x in enumerate(deck.paths())},
+            expected,
+        )
+        self.assertEqual(deck.extra, {})
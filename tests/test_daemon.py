@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import Card
+from sbx.core.daemon import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    DaemonError,
+    DeckServer,
+    connect,
+    is_supported,
+    socket_path,
+)
+from sbx.core.study import CardStack
+
+from .utility import Capturing, TempBox
+
+
+class TestDeckServer(TestCase):
+    def test_list_matches_card_stack(self):
+        with TempBox() as box:
+            server = DeckServer(box)
+            server.load()
+            for options in [(True, False, False), (True, True, True)]:
+                response = server.handle(
+                    {
+                        "id": 1,
+                        "method": "list",
+                        "params": {
+                            "include_unscheduled": options[0],
+                            "filter_to_leech": options[1],
+                            "filter_to_last_zero": options[2],
+                        },
+                    }
+                )
+                expected = CardStack(box, True, *options, use_index=False)
+                self.assertCountEqual(
+                    [os.path.join(box, x) for x, _ in response["result"]],
+                    [x.path for x in expected.iter()],
+                )
+            response = server.handle(
+                {
+                    "id": 2,
+                    "method": "list",
+                    "params": {
+                        "recursive": False,
+                        "include_unscheduled": True,
+                    },
+                }
+            )
+            self.assertEqual(len(response["result"]), 7)
+
+    def test_errors(self):
+        server = DeckServer(tempfile.gettempdir())
+        response = server.handle({"id": 1, "method": "nope"})
+        self.assertEqual(response["error"]["code"], METHOD_NOT_FOUND)
+        response = server.handle(
+            {"id": 2, "method": "mark", "params": {"path": "x.md"}}
+        )
+        self.assertEqual(response["error"]["code"], INVALID_PARAMS)
+        self.assertIsNone(server.handle({"method": "ping"}))
+
+
+@unittest.skipUnless(is_supported(), "needs Unix domain sockets")
+class TestDaemon(TestCase):
+    def setUp(self):
+        self._box = TempBox()
+        self.box = self._box.__enter__()
+        self.server = DeckServer(self.box)
+        self.server.load()
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.start()
+        for _ in range(100):
+            self.client = connect(self.box)
+            if self.client is not None:
+                break
+            threading.Event().wait(0.01)
+
+    def tearDown(self):
+        self.client.call("shutdown")
+        self.client.close()
+        self.thread.join()
+        self._box.__exit__(None, None, None)
+        self.assertFalse(os.path.exists(socket_path(self.box)))
+
+    def test_cli_uses_server(self):
+        with Capturing() as remote:
+            run(["list", "-rni", self.box])
+        with Capturing() as local:
+            run(["list", "-rni", "--no-daemon", self.box])
+        self.assertEqual(len(local), 9)
+        self.assertCountEqual(remote, local)
+
+    def test_card_save_updates_server(self):
+        card = Card(os.path.join(self.box, "test-card.md"), index=self.client)
+        card.mark(5)
+        card.save()
+        cards = dict(self.client.call("list", include_unscheduled=True))
+        self.assertEqual(
+            cards["test-card.md"]["pastq"], card.meta.to_dict()["pastq"]
+        )
+
+    def test_mark(self):
+        path = os.path.join(self.box, "test-card-ok.md")
+        header = self.client.call("mark", path=path, quality=4)
+        self.assertEqual(Card(path).meta.to_dict(), header)
+        with self.assertRaises(DaemonError):
+            self.client.call("mark", path="/etc/passwd", quality=4)
+
+    def test_second_server_fails(self):
+        with self.assertRaises(OSError):
+            DeckServer(self.box).serve()
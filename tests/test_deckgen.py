@@ -0,0 +1,28 @@
+import tempfile
+from unittest import TestCase
+
+from benchmarks.deckgen import generate_deck
+from sbx.core.study import CardStack
+
+
+class TestDeckGenerator(TestCase):
+    def test_generated_cards_are_valid(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = generate_deck(root, 450)
+            cards = list(CardStack(root, True, True, use_index=False).iter())
+            self.assertCountEqual(paths, [x.path for x in cards])
+            self.assertTrue(all(x.front and x.back for x in cards))
+
+    def test_same_seed_same_deck(self):
+        with tempfile.TemporaryDirectory() as first:
+            with tempfile.TemporaryDirectory() as second:
+                for a, b in zip(
+                    generate_deck(first, 20, seed=3),
+                    generate_deck(second, 20, seed=3),
+                ):
+                    with open(a) as h1, open(b) as h2:
+                        # Timestamps depend on current time
+                        self.assertEqual(
+                            h1.read().splitlines()[1:],
+                            h2.read().splitlines()[1:],
+                        )
@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import CardMeta
+from sbx.core.columns import MetaColumns
+from sbx.core.forecast import forecast, parse_date
+from sbx.core.utility import DAY_IN_SECONDS
+
+from .utility import BOX_PATH, Capturing
+
+
+def _meta(next_, reps=1):
+    meta = CardMeta()
+    meta.next_session = next_
+    meta.actual_repetitions = reps
+    return meta
+
+
+class TestForecast(TestCase):
+    def test_forecast(self):
+        today = parse_date("2022-05-10")
+        metas = [
+            CardMeta(),
+            _meta(today + 100, reps=0),
+            _meta(today - DAY_IN_SECONDS),
+            _meta(today),
+            _meta(today + DAY_IN_SECONDS - 1),
+            _meta(today + 2 * DAY_IN_SECONDS),
+            _meta(today + 3 * DAY_IN_SECONDS),
+        ]
+        result = forecast(
+            MetaColumns.from_metas(metas), days=3, as_of=today + 3600
+        )
+        self.assertEqual(result.never_studied, 2)
+        self.assertEqual(result.overdue, 1)
+        self.assertEqual(result.due, [2, 0, 1])
+        self.assertEqual(result.later, 1)
+        self.assertEqual(result.total, len(metas))
+        self.assertEqual(result.day(2).strftime("%Y-%m-%d"), "2022-05-12")
+
+    def test_forecast_command(self):
+        command = ["forecast", "-r", "--no-index", BOX_PATH, "--as-of"]
+        with Capturing() as output:
+            run(command + ["2020-06-11"])
+        self.assertEqual(len(output), 14 + 3)
+        self.assertEqual(output[0], "Never studied  : 0")
+        self.assertEqual(output[2], "2020-06-11 Thu : 1 #")
+        with Capturing() as output:
+            run(command + ["2030-01-01"])
+        self.assertEqual(output[1], "Overdue        : 9")
+        self.assertEqual(output[-1], "Later          : 0")
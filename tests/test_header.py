@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from sbx.core.card import (
+    HEADER_BLOCK_SIZE,
+    InvalidCardLoadAttempted,
+    read_header,
+)
+from sbx.core.walk import walk_cards
+
+from .utility import BOX_PATH
+
+HEADER = {"a": 3, "b": 15.0, "c": 2.5, "reps": 3, "last": 1, "next": 2}
+HEADER.update({"pastq": "345", "algo": "sm2", "sbx": "v1"})
+BODY = "<!-- [[FRONT]] -->\nfront\n<!-- [[BACK]] -->\nback\n"
+
+
+class TestReadHeader(TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._temp.name, "card.md")
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _write(self, data: bytes):
+        with open(self.path, "wb") as h:
+            h.write(data)
+
+    def _line(self, header: dict) -> bytes:
+        return ("<!-- | " + json.dumps(header) + " | -->").encode("utf-8")
+
+    def test_box_cards(self):
+        for path in walk_cards(BOX_PATH, True):
+            try:
+                header = read_header(path)
+            except InvalidCardLoadAttempted:
+                continue
+            self.assertEqual(header["algo"], "sm2")
+
+    def test_line_endings(self):
+        for newline in [b"\n", b"\r\n", b"\r", b""]:
+            self._write(self._line(HEADER) + newline + BODY.encode())
+            self.assertEqual(read_header(self.path), HEADER)
+
+    def test_long_header(self):
+        header = dict(HEADER, note="x" * HEADER_BLOCK_SIZE * 2)
+        self._write(self._line(header) + b"\n" + BODY.encode())
+        self.assertEqual(read_header(self.path), header)
+
+    def test_unicode_header(self):
+        header = dict(HEADER, note="සිංහල")
+        line = "<!-- | " + json.dumps(header, ensure_ascii=False) + " | -->"
+        self._write(line.encode("utf-8") + b"\n")
+        self.assertEqual(read_header(self.path), header)
+        self._write(line.encode("utf-16") + "\n".encode("utf-16-le"))
+        self.assertEqual(read_header(self.path, "utf-16"), header)
+
+    def test_invalid(self):
+        for data in [
+            b"# Title\n",
+            b"<!-- | [1, 2] | -->\n",
+            b"\xff\xfe|\xff|",
+        ]:
+            self._write(data)
+            with self.assertRaises(InvalidCardLoadAttempted):
+                read_header(self.path)
+        with self.assertRaises(FileNotFoundError):
+            read_header(os.path.join(self._temp.name, "missing.md"))
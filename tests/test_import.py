@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import Card
+from sbx.core.importer import (
+    InvalidSource,
+    card_name,
+    import_cards,
+    read_source,
+    source_format,
+)
+
+from .utility import Capturing
+
+CSV = """word,meaning,example
+Apple,A fruit,"I ate
+an apple"
+Banana,Yellow fruit,
+Apple,Duplicate,
+,No front,x
+Cherry,,
+"""
+
+
+class TestReadSource(TestCase):
+    def test_csv_with_header(self):
+        rows = list(
+            read_source(
+                StringIO(CSV),
+                "csv",
+                front="word",
+                back=["meaning", "example"],
+                header=True,
+            )
+        )
+        self.assertEqual(rows[0], ["Apple", "A fruit", "I ate", "an apple"])
+        self.assertEqual(rows[1], ["Banana", "Yellow fruit"])
+        self.assertEqual(rows[3], [])
+        self.assertEqual(rows[4], ["Cherry"])
+
+    def test_tsv_by_number(self):
+        source = StringIO("x\ty\tz\n\na\t\tc\n")
+        rows = list(read_source(source, "tsv", front="3", back=["1"]))
+        self.assertEqual(rows, [["z", "x"], ["c", "a"]])
+        rows = list(read_source(StringIO("x\ty\tz\n"), "tsv"))
+        self.assertEqual(rows, [["x", "y", "z"]])
+
+    def test_jsonl(self):
+        source = StringIO(
+            json.dumps({"front": "Q", "back": ["a", "b\nc"]})
+            + "\n\n"
+            + json.dumps({"term": "T", "back": 1})
+            + "\n"
+        )
+        rows = list(read_source(source, "jsonl"))
+        self.assertEqual(rows, [["Q", "a", "b", "c"], []])
+        with self.assertRaises(InvalidSource):
+            list(read_source(StringIO("[1]\n"), "jsonl"))
+        with self.assertRaises(InvalidSource):
+            list(read_source(StringIO("{\n"), "jsonl"))
+
+    def test_invalid(self):
+        with self.assertRaises(InvalidSource):
+            list(read_source(StringIO(CSV), "csv", front="word"))
+        with self.assertRaises(InvalidSource):
+            list(read_source(StringIO(CSV), "csv", front="x", header=True))
+        with self.assertRaises(InvalidSource):
+            source_format("cards.xlsx")
+        self.assertEqual(source_format("cards.TSV"), "tsv")
+
+
+class TestImportCards(TestCase):
+    def test_card_name(self):
+        self.assertEqual(
+            card_name("What is 2 + 2?"), card_name("What is 2 + 2? ")
+        )
+        self.assertNotEqual(card_name("a"), card_name("A"))
+        name = card_name("What is 2 + 2?")
+        self.assertTrue(name.startswith("what-is-2-2-"))
+        self.assertTrue(card_name("???").startswith("card-"))
+
+    def test_parallel(self):
+        rows = [
+            ["Front {}".format(x), "Back {}".format(x)] for x in range(300)
+        ]
+        with tempfile.TemporaryDirectory() as root:
+            result = import_cards(
+                rows + [["Front 7", "x"], ["x"]], root, jobs=4
+            )
+            self.assertEqual(len(result.created), 300)
+            self.assertEqual(result.duplicates, 1)
+            self.assertEqual(result.invalid, 1)
+            self.assertEqual(result.failed, [])
+            card = Card(os.path.join(root, card_name("Front 7")))
+            self.assertEqual((card.front, card.back), ("Front 7", "Back 7"))
+            again = import_cards(rows, root, jobs=4)
+            self.assertEqual(len(again.created), 0)
+            self.assertEqual(again.duplicates, 300)
+
+    def test_style(self):
+        with tempfile.TemporaryDirectory() as root:
+            import_cards([["Q", "a", "b"]], root, style=True)
+            card = Card(os.path.join(root, card_name("Q")))
+            self.assertEqual(card.front, "# Q")
+            self.assertEqual(card.back.splitlines(), ["* a", "* b"])
+
+
+class TestImportCli(TestCase):
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "glossary.csv")
+            with open(source, "w", encoding="utf-8") as h:
+                h.write(CSV)
+            deck = os.path.join(root, "deck")
+            with Capturing() as output:
+                run(["import", "--header", "-m", source, deck])
+            self.assertIn("Imported 2 cards", output[0])
+            self.assertEqual(len(os.listdir(deck)), 2)
+            with self.assertRaises(SystemExit):
+                with Capturing():
+                    run(["import", os.path.join(root, "cards.txt"), deck])
@@ -0,0 +1,100 @@
+import os
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.core.card import Card
+from sbx.core.index import INDEX_FILE_NAME, HeaderIndex
+from sbx.core.study import CardStack
+
+from .utility import TempBox
+
+
+class TestHeaderIndex(TestCase):
+    def test_index_is_created(self):
+        with TempBox() as box:
+            cards = list(CardStack(box, True, True).iter())
+            self.assertEqual(len(cards), 9)
+            self.assertTrue(os.path.isfile(os.path.join(box, INDEX_FILE_NAME)))
+            self.assertEqual(len(HeaderIndex(box)), 9)
+
+    def test_unchanged_cards_are_not_reopened(self):
+        with TempBox() as box:
+            first = sorted(x.path for x in CardStack(box, True, True).iter())
+            with patch("sbx.core.study.read_header") as read_header:
+                second = sorted(
+                    x.path for x in CardStack(box, True, True).iter()
+                )
+                read_header.assert_not_called()
+            self.assertEqual(first, second)
+
+    def test_changed_card_is_reread(self):
+        with TempBox() as box:
+            list(CardStack(box, True, True).iter())
+            path = os.path.join(box, "test-card-ok.md")
+            with open(path, "a", encoding="utf-8") as h:
+                h.write("more\n")
+            os.utime(path, ns=(0, 0))
+            with patch(
+                "sbx.core.study.read_header", wraps=lambda x: {}
+            ) as read_header:
+                list(CardStack(box, True, True).iter())
+                read_header.assert_called_once_with(path)
+
+    def test_save_updates_index(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card-ok.md")
+            card = [
+                x for x in CardStack(box, True, True).iter() if x.path == path
+            ][0]
+            card.mark(0)
+            card.save()
+            stack = CardStack(box, False, True, False, True)
+            with patch("sbx.core.study.read_header") as read_header:
+                paths = [x.path for x in stack.iter()]
+                read_header.assert_not_called()
+            self.assertIn(path, paths)
+            self.assertEqual(Card(path).meta.past_quality[-1], 0)
+
+    def test_deleted_cards_are_pruned(self):
+        with TempBox() as box:
+            list(CardStack(box, True, True).iter())
+            os.remove(os.path.join(box, "test-card-ok.md"))
+            list(CardStack(box, True, True).iter())
+            self.assertEqual(len(HeaderIndex(box)), 8)
+
+    def test_invalid_files_are_remembered(self):
+        with TempBox() as box:
+            with open(os.path.join(box, "README.md"), "w") as h:
+                h.write("# Not a card\n")
+            self.assertEqual(len(list(CardStack(box, True, True).iter())), 9)
+            with patch("sbx.core.study.read_header") as read_header:
+                cards = list(CardStack(box, True, True).iter())
+                read_header.assert_not_called()
+            self.assertEqual(len(cards), 9)
+            self.assertEqual(len(HeaderIndex(box)), 10)
+
+    def test_scan_and_save_from_many_threads(self):
+        with TempBox() as box:
+            index = HeaderIndex(box)
+            stat_result = os.stat(os.path.join(box, "test-card.md"))
+            errors = []
+
+            def scan():
+                try:
+                    for number in range(5000):
+                        index.put("{}.md".format(number), stat_result, {})
+                except Exception as ex:
+                    errors.append(ex)
+
+            scanner = threading.Thread(target=scan)
+            scanner.start()
+            try:
+                while scanner.is_alive():
+                    index.save()
+            except Exception as ex:
+                errors.append(ex)
+            scanner.join()
+            index.save()
+            self.assertEqual(errors, [])
+            self.assertEqual(len(HeaderIndex(box)), 5000)
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import Card
+from sbx.core.index import INDEX_FILE_NAME
+from sbx.core.metrics import (
+    BODIES_LOADED,
+    BYTES_WRITTEN,
+    FILES_VISITED,
+    HEADER_ONLY_SAVES,
+    HEADERS_INVALID,
+    HEADERS_PARSED,
+    INDEX_HITS,
+    INDEX_MISSES,
+    METRICS,
+    SAVES,
+    Metrics,
+)
+from sbx.core.study import CardStack
+
+from .utility import BOX_PATH, Capturing, TempBox
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        METRICS.reset()
+
+    def test_scan_counters(self):
+        with TempBox() as box:
+            index = os.path.join(box, INDEX_FILE_NAME)
+            if os.path.exists(index):
+                os.remove(index)
+            cards = list(CardStack(box, True, True).iter())
+            visited = METRICS.get(FILES_VISITED)
+            self.assertEqual(METRICS.get(HEADERS_PARSED), len(cards))
+            self.assertEqual(
+                METRICS.get(HEADERS_INVALID), visited - len(cards)
+            )
+            self.assertEqual(METRICS.get(INDEX_MISSES), visited)
+            self.assertEqual(METRICS.get(INDEX_HITS), 0)
+            METRICS.reset()
+            list(CardStack(box, True, True).iter())
+            self.assertEqual(METRICS.get(INDEX_HITS), visited)
+            self.assertEqual(METRICS.get(HEADERS_PARSED), 0)
+
+    def test_card_counters(self):
+        with TempBox() as box:
+            card = next(CardStack(box, True, True, use_index=False).iter())
+            card.mark(4)
+            card.save()
+            self.assertEqual(METRICS.get(HEADER_ONLY_SAVES), 1)
+            self.assertEqual(METRICS.get(BODIES_LOADED), 0)
+            self.assertEqual(
+                METRICS.get(BYTES_WRITTEN), os.path.getsize(card.path)
+            )
+            card = Card(card.path)
+            card.front = "new front"
+            card.save()
+            self.assertEqual(METRICS.get(SAVES), 2)
+            self.assertEqual(METRICS.get(HEADER_ONLY_SAVES), 1)
+            self.assertEqual(METRICS.get(BODIES_LOADED), 1)
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        metrics.inc(SAVES, 3)
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE sbx_saves_total counter\n", text)
+        self.assertIn("\nsbx_saves_total 3", text)
+
+    def test_metrics_out(self):
+        command = ["list", "-rin", "--no-index", BOX_PATH]
+        with tempfile.TemporaryDirectory() as root:
+            output = os.path.join(root, "metrics.json")
+            with Capturing():
+                run(["--metrics-out", output] + command)
+            with open(output, "r", encoding="utf-8") as h:
+                data = json.load(h)
+            self.assertGreater(data[FILES_VISITED], 0)
+            output = os.path.join(root, "sbx.prom")
+            with Capturing():
+                run(["--metrics-out", output] + command)
+            with open(output, "r", encoding="utf-8") as h:
+                self.assertIn("sbx_files_visited_total", h.read())
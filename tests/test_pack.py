@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import Card
+from sbx.core.pack import (
+    InvalidPack,
+    export_deck,
+    import_pack,
+    read_pack,
+    restore_cards,
+    write_pack,
+)
+from sbx.core.study import CardStack
+
+from .utility import Capturing, TempBox
+
+
+def _cards(path):
+    stack = CardStack(path, True, True, use_index=False)
+    return {
+        os.path.relpath(x.path, path): (x.meta.to_dict(), x.front, x.back)
+        for x in stack.iter()
+    }
+
+
+def _pack(*records):
+    lines = [{"sbx-pack": "v1"}] + list(records)
+    return StringIO("".join(json.dumps(x) + "\n" for x in lines))
+
+
+class TestPack(TestCase):
+    def _round_trip(self, name):
+        with TempBox() as box, tempfile.TemporaryDirectory() as root:
+            cards = CardStack(box, True, True, use_index=False).iter()
+            pack = os.path.join(root, name)
+            exported = export_deck(cards, box, pack)
+            restored = import_pack(pack, os.path.join(root, "deck"))
+            self.assertEqual(exported.cards, restored.cards)
+            self.assertEqual(_cards(box), _cards(os.path.join(root, "deck")))
+            with open(pack, "rb") as h:
+                return h.read(2)
+
+    def test_round_trip(self):
+        self.assertEqual(self._round_trip("deck.jsonl"), b'{"')
+
+    def test_round_trip_compressed(self):
+        self.assertEqual(self._round_trip("deck.jsonl.gz"), b"\x1f\x8b")
+
+    def test_compression_is_detected(self):
+        with TempBox() as box, tempfile.TemporaryDirectory() as root:
+            pack = os.path.join(root, "deck.pack")
+            cards = CardStack(box, True, True, use_index=False).iter()
+            export_deck(cards, box, pack, compress=True)
+            with gzip.open(pack, "rt", encoding="utf-8") as h:
+                self.assertEqual(json.loads(h.readline()), {"sbx-pack": "v1"})
+            result = import_pack(pack, os.path.join(root, "deck"))
+            self.assertEqual(result.cards, len(_cards(box)))
+
+    def test_existing_cards(self):
+        with TempBox() as box:
+            stream = StringIO()
+            card = Card(os.path.join(box, "test-card.md"))
+            write_pack([card], box, stream)
+            card.front = "Changed"
+            card.save()
+            with tempfile.TemporaryDirectory() as root:
+                pack = os.path.join(root, "deck.jsonl")
+                with open(pack, "w", encoding="utf-8") as h:
+                    h.write(stream.getvalue())
+                result = import_pack(pack, box)
+                self.assertEqual((result.cards, result.skipped), (0, 1))
+                self.assertEqual(Card(card.path).front, "Changed")
+                result = import_pack(pack, box, overwrite=True)
+                self.assertEqual((result.cards, result.skipped), (1, 0))
+                self.assertNotEqual(Card(card.path).front, "Changed")
+                with open(card.path, "w", encoding="utf-8") as h:
+                    h.write("Broken\n")
+                result = import_pack(pack, box, overwrite=True)
+                self.assertEqual(result.cards, 0)
+                self.assertEqual(result.invalid, [card.path])
+
+    def test_invalid(self):
+        with self.assertRaises(InvalidPack):
+            list(read_pack(StringIO('{"path": "a.md"}\n')))
+        with self.assertRaises(InvalidPack):
+            list(read_pack(_pack({"path": "a.md"})))
+        for path in [
+            "../a.md",
+            "/a.md",
+            "a//b.md",
+            "./a.md",
+            1,
+            "..\\..\\x.md",
+            "C:x.md",
+            "a/C:\\x.md",
+        ]:
+            record = {"path": path, "header": {}, "front": "", "back": ""}
+            with self.assertRaises(InvalidPack):
+                list(read_pack(_pack(record)))
+        with tempfile.TemporaryDirectory() as root:
+            with self.assertRaises(InvalidPack):
+                restore_cards([("../a.md", {}, "", "")], root)
+
+    def test_cli(self):
+        with TempBox() as box, tempfile.TemporaryDirectory() as root:
+            pack = os.path.join(root, "deck.jsonl.gz")
+            with Capturing():
+                run(["export", "-r", box, pack])
+            with Capturing() as output:
+                run(["import-pack", pack, os.path.join(root, "deck")])
+            self.assertIn(
+                "Restored {} cards".format(len(_cards(box))), output[0]
+            )
+            with self.assertRaises(SystemExit):
+                with Capturing():
+                    run(
+                        [
+                            "import-pack",
+                            os.path.join(box, "test-card.md"),
+                            root,
+                        ]
+                    )
@@ -0,0 +1,229 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.cli import run
+from sbx.core.card import Card, read_header
+from sbx.core.daemon import DeckServer
+from sbx.core.forecast import parse_date
+from sbx.core.query import ORDERS, InvalidExpression, Where, order_cards
+from sbx.core.study import CardStack
+from sbx.core.utility import DAY_IN_SECONDS
+
+from .utility import BOX_PATH, Capturing, TempBox
+
+TODAY = parse_date("2022-05-10")
+HEADER = {
+    "a": 4,
+    "b": 20.5,
+    "c": 1.5,
+    "reps": 6,
+    "last": TODAY - 30 * DAY_IN_SECONDS,
+    "next": TODAY - 3 * DAY_IN_SECONDS,
+    "pastq": "012110",
+    "algo": "sm2",
+    "sbx": "v1",
+}
+
+
+class TestWhere(TestCase):
+    def _matches(self, expression, header=HEADER):
+        return Where(expression, now=TODAY + 100).matches(header)
+
+    def test_fields(self):
+        self.assertTrue(
+            self._matches("reps > 5 and easiness < 1.6 and overdue_days >= 3")
+        )
+        self.assertTrue(self._matches("days_since_last == 30"))
+        self.assertTrue(self._matches("leech and zero and due"))
+        self.assertTrue(self._matches("last_quality == 0 and not new"))
+        self.assertTrue(
+            self._matches("interval / 2 > 10 and repetitions == 4")
+        )
+        self.assertTrue(self._matches("algo in ('sm2', 'sm4') and a == 4"))
+        self.assertFalse(self._matches("overdue_days > 3"))
+
+    def test_difficulty_is_not_easiness(self):
+        header = dict(HEADER, algo="sm2+", c=0.24)
+        self.assertFalse(self._matches("easiness < 1.6", header))
+        self.assertTrue(self._matches("difficulty < 0.3", header))
+        self.assertTrue(self._matches("difficulty >= 0", dict(header, c=0)))
+        self.assertFalse(self._matches("difficulty < 1"))
+        self.assertFalse(
+            self._matches("easiness < 1.6", dict(HEADER, algo="x"))
+        )
+
+    def test_only_numbers_are_multiplied(self):
+        self.assertTrue(self._matches("reps * 2 == 12 and 2 * interval == 41"))
+        for expression in [
+            "pastq * 1000000000000 == ''",
+            "algo * reps * 1000000000000 == ''",
+            "(1, 2) * 1000000000000 == ()",
+        ]:
+            self.assertFalse(self._matches(expression), expression)
+        self.assertFalse(self._matches("reps > 1", {"algo": "sm2"}))
+
+    def test_missing_register_does_not_match(self):
+        self.assertFalse(self._matches("d > 1"))
+        self.assertTrue(self._matches("not d"))
+
+    def test_invalid(self):
+        for expression in [
+            "reps >",
+            "unknown > 1",
+            "__import__('os')",
+            "reps.real > 1",
+            "pastq[0] == '1'",
+            "reps ** 100 > 1",
+            "next == None",
+            "lambda: 1",
+        ]:
+            with self.assertRaises(InvalidExpression):
+                Where(expression)
+
+    def test_card_stack(self):
+        where = Where("leech and reps >= 3")
+        stack = CardStack(BOX_PATH, True, True, use_index=False, where=where)
+        cards = [x.path for x in stack.iter()]
+        self.assertEqual(len(cards), 3)
+        self.assertCountEqual(list(stack.to_columns().paths()), cards)
+        for path in cards:
+            self.assertTrue(where.matches(read_header(path)))
+
+    def test_server(self):
+        with TempBox() as box:
+            server = DeckServer(box)
+            server.load()
+        response = server.handle(
+            {
+                "id": 1,
+                "method": "list",
+                "params": {"include_unscheduled": True, "where": "leech"},
+            }
+        )
+        self.assertEqual(len(response["result"]), 3)
+
+    def test_cli(self):
+        with Capturing() as cards:
+            run(["list", "-rni", "--where", "zero", "--no-index", BOX_PATH])
+        self.assertEqual(len(cards), 3)
+        with self.assertRaises(SystemExit):
+            with Capturing():
+                run(["list", "--where", "reps >", BOX_PATH])
+
+
+def _item(name: str, **fields):
+    header = dict(HEADER)
+    header.update(fields)
+    return name, header
+
+
+ITEMS = [
+    _item("b", next=TODAY - DAY_IN_SECONDS, c=2.5, reps=1),
+    _item("a", next=-1, c=2.5, reps=0),
+    _item("d", next=TODAY - 9 * DAY_IN_SECONDS, c=1.3, reps=9),
+    _item("c", next=TODAY + DAY_IN_SECONDS, c=1.9, reps=4),
+]
+
+
+class TestOrder(TestCase):
+    def _names(self, order, limit=None):
+        items = order_cards(iter(ITEMS), order, limit, now=TODAY)
+        return [x[0] for x in items]
+
+    def test_orders(self):
+        self.assertEqual(self._names("due"), ["a", "d", "b", "c"])
+        self.assertEqual(self._names("overdue"), ["d", "b", "a", "c"])
+        self.assertEqual(self._names("easiness"), ["d", "c", "b", "a"])
+        self.assertEqual(self._names("reps"), ["d", "c", "b", "a"])
+        self.assertEqual(self._names("path"), ["a", "b", "c", "d"])
+        self.assertEqual(self._names(None), ["b", "a", "d", "c"])
+
+    def test_easiness_leaves_sm2_plus_last(self):
+        items = ITEMS + [_item("e", c=0.24, algo="sm2+")]
+        names = [x[0] for x in order_cards(iter(items), "easiness")]
+        self.assertEqual(names, ["d", "c", "b", "a", "e"])
+        self.assertEqual(
+            [x[0] for x in order_cards(iter(items), "easiness", 1)], ["d"]
+        )
+
+    def test_limit(self):
+        for order in ORDERS:
+            if order == "random":
+                continue
+            self.assertEqual(self._names(order, 2), self._names(order)[:2])
+        self.assertEqual(self._names(None, 3), ["b", "a", "d"])
+
+    def test_limit_without_order_stops_early(self):
+        taken = []
+
+        def items():
+            for item in ITEMS:
+                taken.append(item[0])
+                yield item
+
+        self.assertEqual(len(list(order_cards(items(), None, 1))), 1)
+        self.assertEqual(taken, ["b"])
+
+    def test_random(self):
+        names = self._names("random")
+        self.assertCountEqual(names, "abcd")
+        for _ in range(20):
+            sample = self._names("random", 2)
+            self.assertEqual(len(sample), 2)
+            self.assertEqual(len(set(sample)), 2)
+            self.assertTrue(set(sample) <= set("abcd"))
+        self.assertCountEqual(self._names("random", 10), "abcd")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            order_cards(ITEMS, "unknown")
+        with self.assertRaises(ValueError):
+            order_cards(ITEMS, "path", 0)
+        with self.assertRaises(ValueError):
+            CardStack(BOX_PATH, order="unknown")
+
+    def test_card_stack(self):
+        everything = CardStack(BOX_PATH, True, True, use_index=False)
+        paths = sorted(x.path for x in everything.iter())
+        stack = CardStack(
+            BOX_PATH, True, True, use_index=False, order="path", limit=3
+        )
+        with patch("sbx.core.study.Card", wraps=Card) as created:
+            self.assertEqual([x.path for x in stack.iter()], paths[:3])
+        # Cards are only created for kept headers
+        self.assertEqual(created.call_count, 3)
+        # WHY: Columns are used for whole deck views (forecast)
+        self.assertEqual(len(stack.to_columns()), len(paths))
+
+    def test_server(self):
+        with TempBox() as box:
+            server = DeckServer(box)
+            server.load()
+        response = server.handle(
+            {
+                "id": 1,
+                "method": "list",
+                "params": {
+                    "include_unscheduled": True,
+                    "order": "reps",
+                    "limit": 2,
+                },
+            }
+        )
+        reps = [x[1]["reps"] for x in response["result"]]
+        self.assertEqual(len(reps), 2)
+        self.assertEqual(reps, sorted(reps, reverse=True))
+        response = server.handle(
+            {"id": 2, "method": "list", "params": {"order": "unknown"}}
+        )
+        self.assertIn("error", response)
+
+    def test_cli(self):
+        order = ["--order", "path", "--limit", "2"]
+        with Capturing() as cards:
+            run(["list", "-rni", "--no-index", BOX_PATH] + order)
+        self.assertEqual(len(cards), 2)
+        self.assertEqual(cards, sorted(cards))
+        with self.assertRaises(SystemExit):
+            with Capturing():
+                run(["list", "--limit", "0", BOX_PATH])
@@ -0,0 +1,143 @@
+import json
+import random
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.cli import run
+from sbx.core.render import (
+    SEPARATOR,
+    CardRenderer,
+    DateFormatter,
+    supports_escapes,
+)
+from sbx.core.study import CardStack
+from sbx.core.utility import unix_str
+
+from .utility import BOX_PATH, Capturing
+
+
+def _cards():
+    return list(CardStack(BOX_PATH, True, True, use_index=False).iter())
+
+
+class CountingStream(StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TerminalStream(StringIO):
+    def isatty(self):
+        return True
+
+
+class TestDateFormatter(TestCase):
+    def test_same_as_unix_str(self):
+        date = DateFormatter()
+        generator = random.Random(7)
+        timestamps = [-1, 0, 1, 43199, 43200, 86399, 1591825710]
+        timestamps += [generator.randrange(1, 2**32) for _ in range(2000)]
+        for unix in timestamps:
+            self.assertEqual(date(unix), unix_str(unix), unix)
+
+
+class TestCardRenderer(TestCase):
+    def _render(self, output_format, **kwargs):
+        stream = StringIO()
+        with CardRenderer(stream, output_format, **kwargs) as out:
+            for card in _cards():
+                out.write(card)
+        return stream.getvalue()
+
+    def test_plain(self):
+        expected = "".join(SEPARATOR + str(x) + "\n" for x in _cards())
+        self.assertEqual(self._render("plain"), expected)
+
+    def test_pretty(self):
+        text = self._render("pretty", escapes=True)
+        self.assertIn("\x1b[", text)
+        self.assertEqual(text.count(SEPARATOR), len(_cards()))
+
+    def test_pretty_without_escapes(self):
+        self.assertEqual(self._render("pretty"), self._render("plain"))
+        stream = TerminalStream()
+        with CardRenderer(stream, "pretty", escapes=False) as out:
+            for card in _cards():
+                out.write(card)
+        text = stream.getvalue()
+        self.assertEqual(text.count(SEPARATOR), len(_cards()))
+        for card in _cards():
+            self.assertIn(card.path, text)
+
+    def test_supports_escapes(self):
+        self.assertFalse(supports_escapes(StringIO()))
+        with patch("sbx.core.render.os.name", "posix"):
+            with patch.dict("os.environ", {"TERM": "xterm"}):
+                self.assertTrue(supports_escapes(TerminalStream()))
+            with patch.dict("os.environ", {"TERM": "dumb"}):
+                self.assertFalse(supports_escapes(TerminalStream()))
+
+    def test_json(self):
+        records = json.loads(self._render("json"))
+        self.assertEqual(
+            [x["path"] for x in records], [x.path for x in _cards()]
+        )
+        self.assertEqual(records[0]["sbx"], "v1")
+        stream = StringIO()
+        CardRenderer(stream, "json").close()
+        self.assertEqual(json.loads(stream.getvalue()), [])
+
+    def test_jsonl(self):
+        lines = self._render("jsonl").splitlines()
+        cards = _cards()
+        self.assertEqual(len(lines), len(cards))
+        for line, card in zip(lines, cards):
+            record = json.loads(line)
+            self.assertEqual(record["path"], card.path)
+            self.assertEqual(record["next"], card.meta.next_session)
+
+    def test_tsv(self):
+        rows = [x.split("\t") for x in self._render("tsv").splitlines()]
+        self.assertEqual(rows[0][:2], ["path", "next"])
+        self.assertEqual(len(rows), len(_cards()) + 1)
+        self.assertTrue(all(len(x) == len(rows[0]) for x in rows))
+
+    def test_null_and_file_name_only(self):
+        self.assertEqual(self._render("null"), "")
+        paths = self._render("json", file_name_only=True).splitlines()
+        self.assertEqual(paths, [x.path for x in _cards()])
+
+    def test_buffered(self):
+        stream = CountingStream()
+        with CardRenderer(stream, "plain") as out:
+            for card in _cards() * 20:
+                out.write(card)
+        self.assertEqual(out.count, len(_cards()) * 20)
+        self.assertEqual(stream.writes, 1)
+        stream = CountingStream()
+        with CardRenderer(stream, "plain", buffer_size=1) as out:
+            for card in _cards():
+                out.write(card)
+        self.assertEqual(stream.writes, len(_cards()))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            CardRenderer(StringIO(), "xml")
+
+
+class TestListFormat(TestCase):
+    def test_cli(self):
+        with Capturing() as lines:
+            run(["list", "-ri", "--format", "jsonl", "--no-index", BOX_PATH])
+        self.assertEqual(len(lines), len(_cards()))
+        with Capturing() as lines:
+            run(["list", "-ri", "--no-color", "--no-index", BOX_PATH])
+        self.assertNotIn("\x1b", "".join(lines))
+        with self.assertRaises(SystemExit):
+            with Capturing():
+                run(["list", "--watch", "--format", "json", BOX_PATH])
@@ -0,0 +1,158 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.cli import run
+from sbx.core.card import Card
+from sbx.core.reviewlog import (
+    LOG_DIRECTORY_NAME,
+    MAGIC,
+    RECORD,
+    InvalidReviewLog,
+    ReviewLog,
+    card_id,
+    read_segment,
+)
+from sbx.core.study import CardStack
+
+from .utility import Capturing, TempBox
+
+# Segments holding 3 reviews each
+SMALL_SEGMENT = len(MAGIC) + 3 * RECORD.size
+
+
+def _append(log, root, count, name="a.md"):
+    path = os.path.join(root, name)
+    for number in range(count):
+        log.append(path, 1000 + number, number % 6, (1.0, 2.5), (6.0, 2.6))
+
+
+class TestReviewLog(TestCase):
+    def test_append_and_rotate(self):
+        with tempfile.TemporaryDirectory() as root:
+            log = ReviewLog(root, SMALL_SEGMENT)
+            self.assertEqual(list(log.reviews()), [])
+            _append(log, root, 6)
+            _append(log, root, 2, name=os.path.join("c", "b.md"))
+            log.close()
+            self.assertEqual(len(log.segments()), 3)
+            reviews = list(log.reviews())
+            self.assertEqual(
+                [x[1] for x in reviews[:6]], list(range(1000, 1006))
+            )
+            self.assertEqual(
+                reviews[0], (card_id("a.md"), 1000, 0, 1.0, 6.0, 2.5, 2.6)
+            )
+            history = log.history(os.path.join(root, "c", "b.md"))
+            self.assertEqual(len(history), 2)
+            # Appending again continues the last segment
+            log = ReviewLog(root, SMALL_SEGMENT)
+            _append(log, root, 1)
+            log.close()
+            self.assertEqual(len(log.segments()), 3)
+            self.assertEqual(len(list(log.reviews())), 9)
+
+    def test_partly_written_record(self):
+        with tempfile.TemporaryDirectory() as root:
+            log = ReviewLog(root)
+            _append(log, root, 2)
+            log.close()
+            path = log.segments()[-1][2]
+            with open(path, "ab") as h:
+                h.write(b"\x01\x02")
+            self.assertEqual(len(list(read_segment(path))), 2)
+            _append(log, root, 1)
+            log.close()
+            self.assertEqual(len(log.segments()), 2)
+            self.assertEqual(len(list(log.reviews())), 3)
+
+    def test_compact(self):
+        with tempfile.TemporaryDirectory() as root:
+            log = ReviewLog(root, SMALL_SEGMENT)
+            _append(log, root, 8)
+            _append(log, root, 2, name="removed.md")
+            before = list(log.reviews())
+            result = log.compact()
+            self.assertEqual((result.segments, result.reviews), (3, 9))
+            self.assertEqual(len(log.segments()), 2)
+            self.assertEqual(list(log.reviews()), before)
+            # Compacted segment is compacted again with newer ones
+            _append(log, root, 3)
+            kept = log.compact([os.path.join(root, "a.md")])
+            self.assertEqual(kept.dropped, 2)
+            self.assertEqual({x[0] for x in log.reviews()}, {card_id("a.md")})
+            self.assertEqual(len(os.listdir(log.directory)), 2)
+            log.close()
+
+    def test_covered_segments_are_ignored(self):
+        with tempfile.TemporaryDirectory() as root:
+            log = ReviewLog(root, SMALL_SEGMENT)
+            _append(log, root, 9)
+            log.close()
+            first = log.segments()[0][2]
+            with open(first, "rb") as h:
+                data = h.read()
+            result = log.compact()
+            # Same as a crash before merged segments were removed
+            with open(first, "wb") as h:
+                h.write(data)
+            self.assertEqual(len(list(log.reviews())), result.reviews + 3)
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as root:
+            log = ReviewLog(root)
+            os.makedirs(log.directory)
+            path = os.path.join(log.directory, "00000001-00000001.log")
+            with open(path, "wb") as h:
+                h.write(b"not a log")
+            with self.assertRaises(InvalidReviewLog):
+                list(log.reviews())
+
+
+class TestCardReviews(TestCase):
+    def test_mark_is_logged(self):
+        with TempBox() as box:
+            log = ReviewLog(box)
+            stack = CardStack(box, True, True, use_index=False, review_log=log)
+            card = next(iter(stack.iter()))
+            card.mark(4)
+            card.mark(1)
+            log.close()
+            history = log.history(card.path)
+            self.assertEqual([x[2] for x in history], [4, 1])
+            self.assertEqual(history[0][1], card.meta.last_session)
+            self.assertEqual(history[0][4], history[1][3])
+            self.assertEqual(history[1][6], card.meta.algo_state["c"])
+            Card(card.path).mark(5)
+            self.assertEqual(len(log.history(card.path)), 2)
+
+    def test_cli(self):
+        with TempBox() as box:
+            log = ReviewLog(box, SMALL_SEGMENT)
+            _append(log, box, 3, name="removed.md")
+            _append(log, box, 5, name="test-card.md")
+            log.close()
+            with Capturing() as output:
+                run(["compact-log", "--prune", box])
+            self.assertIn("3 reviews of removed cards dropped", output[0])
+            self.assertTrue(
+                os.path.isdir(os.path.join(box, LOG_DIRECTORY_NAME))
+            )
+            with Capturing() as output:
+                run(["compact-log", box])
+            self.assertIn("Nothing to compact", output[0])
+
+    def test_log_is_opt_in(self):
+        with TempBox() as box:
+            with patch("sbx.ui.study.StudyInterface"):
+                with patch("sbx.cli.ReviewLog", wraps=ReviewLog) as log:
+                    run(["study", "--no-daemon", box])
+                    run(["study", "--no-daemon", "--log", box])
+                    self.assertEqual(log.call_count, 1)
+                    # Once a deck has a log it is kept up to date
+                    os.mkdir(os.path.join(box, LOG_DIRECTORY_NAME))
+                    run(["study", "--no-daemon", box])
+                    self.assertEqual(log.call_count, 2)
+                    run(["study", "--no-daemon", "--no-log", box])
+                    self.assertEqual(log.call_count, 2)
@@ -0,0 +1,144 @@
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from sbx.core.card import Card
+from sbx.core.saver import JOURNAL_FILE_NAME, WriteBehindSaver, replay_journal
+
+from .utility import TempBox
+
+
+def _entry(path, header, base):
+    return json.dumps({"path": path, "header": header, "base": base}) + "\n"
+
+
+def _lines(box):
+    with open(os.path.join(box, JOURNAL_FILE_NAME), "r") as h:
+        return h.readlines()
+
+
+class TestWriteBehindSaver(TestCase):
+    def test_cards_are_saved_on_close(self):
+        with TempBox() as box:
+            saver = WriteBehindSaver(box, batch_delay=0)
+            saver.start()
+            paths = [
+                os.path.join(box, x)
+                for x in ["test-card.md", "test-card-2.md", "test-card-3.md"]
+            ]
+            for path in paths:
+                card = Card(path)
+                card.mark(5)
+                saver.submit(card)
+            saver.close()
+            for path in paths:
+                self.assertEqual(Card(path).meta.past_quality[-1], 5)
+            self.assertFalse(
+                os.path.exists(os.path.join(box, JOURNAL_FILE_NAME))
+            )
+
+    def test_submit_does_no_file_work(self):
+        with TempBox() as box:
+            card = Card(os.path.join(box, "test-card.md"))
+            saver = WriteBehindSaver(box)
+            before = card.meta.to_dict()
+            card.mark(3)
+            with patch("builtins.open") as open_, patch(
+                "sbx.core.saver.read_header"
+            ) as read:
+                saver.submit(card, before)
+                saver.submit(card)
+            open_.assert_not_called()
+            read.assert_not_called()
+            self.assertFalse(
+                os.path.exists(os.path.join(box, JOURNAL_FILE_NAME))
+            )
+            saver.close()
+            self.assertEqual(Card(card.path).meta.past_quality[-1], 3)
+
+    def test_resubmitted_card_is_saved_once(self):
+        with TempBox() as box:
+            card = Card(os.path.join(box, "test-card.md"))
+            saver = WriteBehindSaver(box)
+            with patch.object(Card, "save") as save:
+                card.mark(3)
+                saver.submit(card)
+                card.mark(4)
+                saver.submit(card)
+                saver.close()
+                save.assert_called_once_with()
+
+    def test_errors_are_reported(self):
+        with TempBox() as box:
+            errors = []
+            card = Card(os.path.join(box, "missing", "card.md"))
+            card.front = "Front"
+            card.back = "Back"
+            saver = WriteBehindSaver(
+                box, lambda c, ex: errors.append(c), batch_delay=0
+            )
+            saver.start()
+            saver.submit(card)
+            saver.close()
+            self.assertEqual(errors, [card])
+            self.assertEqual(saver.failed[0][0], card)
+            # Journal is kept so it can be replayed
+            self.assertTrue(
+                os.path.exists(os.path.join(box, JOURNAL_FILE_NAME))
+            )
+
+    def test_replay_journal(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card.md")
+            card = Card(path)
+            base = [card.meta.actual_repetitions, card.meta.last_session]
+            card.mark(0)
+            card.mark(1)
+            header = card.meta.to_dict()
+            with open(os.path.join(box, JOURNAL_FILE_NAME), "w") as h:
+                for entry in [{}, header]:
+                    h.write(_entry(path, entry, base))
+                h.write('{"path": "half writ')
+            self.assertEqual(replay_journal(box), 1)
+            self.assertEqual(Card(path).meta.past_quality[-2:], [0, 1])
+            self.assertFalse(
+                os.path.exists(os.path.join(box, JOURNAL_FILE_NAME))
+            )
+            self.assertEqual(replay_journal(box), 0)
+
+    def test_journal_of_crashed_session(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card.md")
+            saver = WriteBehindSaver(box)
+            card = Card(path)
+            before = card.meta.to_dict()
+            card.mark(4)
+            saver.submit(card, before)
+            card.mark(5)
+            saver.submit(card)
+            with patch.object(Card, "save", side_effect=OSError):
+                saver.close()
+            self.assertEqual(len(_lines(box)), 2)
+            # First header was saved before the crash
+            Card(path, headers=json.loads(_lines(box)[0])["header"]).save()
+            self.assertEqual(replay_journal(box), 1)
+            self.assertEqual(Card(path).meta.past_quality[-2:], [4, 5])
+
+    def test_changed_cards_are_not_replayed(self):
+        with TempBox() as box:
+            path = os.path.join(box, "test-card.md")
+            saver = WriteBehindSaver(box)
+            card = Card(path)
+            card.mark(0)
+            saver.submit(card)
+            with patch.object(Card, "save", side_effect=OSError):
+                saver.close()
+            self.assertEqual(len(_lines(box)), 1)
+            # Studied again by a later session before the journal is replayed
+            newer = Card(path)
+            newer.mark(5)
+            newer.mark(5)
+            newer.save()
+            self.assertEqual(replay_journal(box), 0)
+            self.assertEqual(Card(path).meta.past_quality[-2:], [5, 5])
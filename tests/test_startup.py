@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+from .utility import BOX_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that must only be loaded by `study` & `edit`
+UI_MODULES = ["prompt_toolkit", "pygments", "sbx.ui"]
+
+
+class TestStartup(TestCase):
+    def _loaded_modules(self, *arguments: str):
+        code = (
+            "import sys\n"
+            "from sbx.cli import run\n"
+            "run(sys.argv[1:])\n"
+            "print(' '.join(sys.modules), file=sys.stderr)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code] + list(arguments),
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        return set(result.stderr.split())
+
+    def test_list_names_does_not_load_ui(self):
+        modules = self._loaded_modules("list", "-rni", "--no-index", BOX_PATH)
+        for name in UI_MODULES:
+            self.assertNotIn(name, modules)
+        self.assertNotIn("concurrent.futures", modules)
+        self.assertNotIn("sqlite3", modules)
+
+    def test_forecast_does_not_load_ui(self):
+        modules = self._loaded_modules(
+            "forecast", "-r", "--no-index", BOX_PATH
+        )
+        for name in UI_MODULES:
+            self.assertNotIn(name, modules)
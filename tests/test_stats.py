@@ -0,0 +1,65 @@
+import json
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import CardMeta
+from sbx.core.columns import MetaColumns
+from sbx.core.stats import deck_stats
+
+from .utility import BOX_PATH, Capturing
+
+
+def _meta(past, interval=1, easiness=2.5):
+    meta = CardMeta()
+    meta.past_quality = [int(x) for x in past]
+    meta.actual_repetitions = len(past)
+    meta.next_session = 1000 if past else -1
+    meta.algo_state = {"a": 1, "b": interval, "c": easiness}
+    return meta
+
+
+class TestStats(TestCase):
+    def test_stats(self):
+        metas = [
+            CardMeta(),
+            _meta("012", interval=1, easiness=1.3),
+            _meta("50", interval=1, easiness=1.6),
+            _meta("345", interval=6, easiness=2.5),
+            _meta("4", interval=30, easiness=2.8),
+            _meta("12", interval=400, easiness=2.0),
+        ]
+        result = deck_stats(MetaColumns.from_metas(metas))
+        self.assertEqual((result.cards, result.studied), (6, 5))
+        self.assertEqual(result.never_studied, 1)
+        self.assertEqual((result.leech, result.zero), (1, 1))
+        self.assertEqual(result.leech_ratio, 0.2)
+        self.assertEqual(result.quality, [2, 2, 2, 1, 2, 2])
+        self.assertEqual(result.reviews, 11)
+        self.assertEqual(result.retention, 5 / 11)
+        self.assertEqual(result.last_retention, 2 / 5)
+        self.assertEqual((result.mature, result.mature_retention), (2, 0.5))
+        easiness = dict(result.easiness)
+        self.assertEqual(easiness["1.3 - 1.5"], 1)
+        self.assertEqual(easiness["2.5 - 2.7"], 1)
+        self.assertEqual(easiness["2.7+"], 1)
+        self.assertEqual(sum(easiness.values()), result.studied)
+        self.assertEqual([x[1] for x in result.intervals], [2, 1, 0, 1, 0, 1])
+        self.assertEqual(result.repetitions[50], 2)
+        self.assertEqual(result.repetitions[100], 3)
+
+    def test_empty(self):
+        result = deck_stats(MetaColumns())
+        self.assertIsNone(result.retention)
+        self.assertEqual(result.repetitions[50], 0)
+        self.assertEqual(json.loads(json.dumps(result.to_dict()))["cards"], 0)
+
+    def test_stats_command(self):
+        with Capturing() as output:
+            run(["stats", "-r", "--no-index", BOX_PATH])
+        self.assertEqual(output[0], "Cards          : 9")
+        self.assertIn("Retention (quality 3 or more)", output)
+        with Capturing() as output:
+            run(["stats", "--json", "-r", "--no-index", BOX_PATH])
+        data = json.loads("\n".join(output))
+        self.assertEqual(data["cards"], 9)
+        self.assertEqual(sum(data["quality"].values()), data["reviews"])
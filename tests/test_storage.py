@@ -0,0 +1,197 @@
+import json
+import os
+from unittest import TestCase
+
+from sbx.cli import run
+from sbx.core.card import Card, read_header
+from sbx.core.daemon import DeckServer
+from sbx.core.index import INDEX_FILE_NAME
+from sbx.core.saver import JOURNAL_FILE_NAME, replay_journal
+from sbx.core.storage import (
+    SQLITE_FILE_NAME,
+    SqliteStorage,
+    StorageError,
+    find_root,
+    open_storage,
+)
+from sbx.core.study import CardStack
+from sbx.core.utility import unix_time
+
+from .utility import Capturing, TempBox
+
+SELECTIONS = [
+    (False, False, False),
+    (True, False, False),
+    (True, True, False),
+    (True, False, True),
+    (False, True, True),
+]
+
+
+def _paths(box, *selection, storage=None):
+    stack = CardStack(box, True, *selection, use_index=False, storage=storage)
+    return sorted(x.path for x in stack.iter())
+
+
+class TestSqliteStorage(TestCase):
+    def test_same_selection_as_files(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            for selection in SELECTIONS:
+                self.assertEqual(
+                    _paths(box, *selection, storage=storage),
+                    _paths(box, *selection),
+                    selection,
+                )
+            self.assertEqual(len(storage), len(_paths(box, True)))
+            storage.close()
+
+    def test_save_keeps_file(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            path = os.path.join(box, "test-card.md")
+            with open(path, "rb") as h:
+                original = h.read()
+            card = Card(path, storage=storage)
+            card.mark(5)
+            card.save()
+            with open(path, "rb") as h:
+                self.assertEqual(h.read(), original)
+            stored = Card(path, storage=storage)
+            self.assertEqual(stored.meta.past_quality[-1], 5)
+            self.assertNotEqual(Card(path).meta.past_quality[-1], 5)
+            stored.back = "Changed"
+            stored.save()
+            self.assertEqual(Card(path).back, "Changed")
+            storage.close()
+
+    def test_new_and_removed_cards(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            count = len(_paths(box, True, storage=storage))
+            os.remove(os.path.join(box, "test-card.md"))
+            card = Card(os.path.join(box, "c", "added.md"))
+            card.front = "Front"
+            card.back = "Back"
+            card.save()
+            self.assertEqual(len(_paths(box, True, storage=storage)), count)
+            self.assertIsNone(storage.read(os.path.join(box, "test-card.md")))
+            self.assertIsNotNone(storage.read(card.path))
+            storage.close()
+
+    def test_indexes_are_used(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            plan = " ".join(storage.explain(True, True, False))
+            self.assertIn("cards_leech", plan)
+            plan = " ".join(storage.explain(True, False, True))
+            self.assertIn("cards_zero", plan)
+            self.assertEqual(
+                len(storage.select(now=unix_time())), len(storage.select())
+            )
+            storage.close()
+
+    def test_open_storage(self):
+        with TempBox() as box:
+            self.assertIsNone(open_storage(box))
+            self.assertIsNone(open_storage(box, "file"))
+            storage = open_storage(box, "sqlite")
+            self.assertIsInstance(storage, SqliteStorage)
+            storage.close()
+            storage = open_storage(box)
+            self.assertIsInstance(storage, SqliteStorage)
+            storage.close()
+            with self.assertRaises(ValueError):
+                open_storage(box, "xml")
+            with self.assertRaises(StorageError):
+                SqliteStorage(os.path.join(box, "missing", "directory"))
+
+    def test_cli(self):
+        with TempBox() as box:
+            with Capturing() as cards:
+                run(["list", "-rni", "--storage", "sqlite", box])
+            self.assertTrue(
+                os.path.isfile(os.path.join(box, SQLITE_FILE_NAME))
+            )
+            with Capturing() as again:
+                run(["list", "-rni", box])
+            self.assertEqual(sorted(cards), sorted(again))
+
+    def test_single_card_commands(self):
+        with TempBox() as box:
+            SqliteStorage(box).close()
+            path = os.path.join(box, "python", "leech-python-card.md")
+            self.assertEqual(find_root(os.path.dirname(path)), box)
+            storage = SqliteStorage(box)
+            card = Card(path, storage=storage)
+            card.mark(5)
+            card.save()
+            storage.close()
+            with Capturing():
+                run(["reset", path])
+            storage = SqliteStorage(box)
+            self.assertEqual(Card(path, storage=storage).meta.past_quality, [])
+            created = os.path.join(box, "python", "new.md")
+            with Capturing():
+                run(["create", created, "Front", "Back"])
+            self.assertIsNotNone(storage.read(created))
+            storage.close()
+            with Capturing() as cards:
+                run(["list", "-rni", "--where", "reps == 0", box])
+            self.assertIn(os.path.join(box, "python", "new.md"), cards)
+            self.assertIn(path, cards)
+
+    def test_replay_journal(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            path = os.path.join(box, "test-card.md")
+            card = Card(path, storage=storage)
+            base = [card.meta.actual_repetitions, card.meta.last_session]
+            card.mark(5)
+            entry = {"path": path, "header": card.meta.to_dict(), "base": base}
+            with open(os.path.join(box, JOURNAL_FILE_NAME), "w") as h:
+                h.write(json.dumps(entry) + "\n")
+            self.assertEqual(replay_journal(box, storage), 1)
+            stored = Card(path, storage=storage)
+            self.assertEqual(stored.meta.past_quality[-1], 5)
+            storage.close()
+
+    def test_directory_in_deck(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            sub = os.path.join(box, "python")
+            path = os.path.join(sub, "leech-python-card.md")
+            list(CardStack(box, True, True, storage=storage).iter())
+            card = Card(path, storage=storage)
+            card.mark(5)
+            card.save()
+            storage.close()
+            with Capturing() as cards:
+                run(["list", "-rn", "--no-daemon", sub])
+            self.assertNotIn(path, cards)
+            self.assertFalse(
+                os.path.exists(os.path.join(sub, INDEX_FILE_NAME))
+            )
+            with Capturing():
+                run(["list", "-rn", "--storage", "sqlite", sub])
+            self.assertFalse(
+                os.path.exists(os.path.join(sub, SQLITE_FILE_NAME))
+            )
+
+    def test_server_marks_through_storage(self):
+        with TempBox() as box:
+            storage = SqliteStorage(box)
+            path = os.path.join(box, "test-card.md")
+            file_header = read_header(path)
+            server = DeckServer(box, storage=storage)
+            server.load()
+            response = server.handle(
+                {
+                    "id": 1,
+                    "method": "mark",
+                    "params": {"path": path, "quality": 5},
+                }
+            )
+            self.assertEqual(storage.read(path), response["result"])
+            self.assertEqual(read_header(path), file_header)
+            storage.close()
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from sbx.core import card, study
+from sbx.core.study import CardStack
+from sbx.core.trace import STDERR, Tracer, tracer_from_settings
+
+from .utility import BOX_PATH
+
+
+class TestTracer(TestCase):
+    def test_spans_recorded_and_restored(self):
+        original = card.Card._load_headers
+        tracer = Tracer()
+        tracer.start()
+        try:
+            self.assertIsNot(card.Card._load_headers, original)
+            cards = list(
+                CardStack(BOX_PATH, True, True, use_index=False).iter()
+            )
+        finally:
+            tracer.stop()
+        self.assertIs(card.Card._load_headers, original)
+        self.assertIs(study.read_header, card.read_header)
+        names = {x[0]: x[1] for x in tracer.summary()}
+        self.assertEqual(names["scan.get_files"], 1)
+        self.assertEqual(names["card.load_headers"], len(cards))
+        self.assertEqual(names["scan.read_header"], len(cards))
+
+    def test_chrome_trace(self):
+        with tempfile.TemporaryDirectory() as root:
+            output = os.path.join(root, "trace.json")
+            tracer = Tracer(output)
+            tracer.start()
+            try:
+                list(CardStack(BOX_PATH, True, True, use_index=False).iter())
+            finally:
+                tracer.stop()
+            tracer.write()
+            with open(output, "r", encoding="utf-8") as h:
+                trace = json.load(h)
+        events = trace["traceEvents"]
+        self.assertTrue(events)
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertIn("scan.get_files", {x["name"] for x in events})
+
+    def test_tracer_from_settings(self):
+        self.assertIsNone(tracer_from_settings(None, None))
+        self.assertIsNone(tracer_from_settings(None, "0"))
+        self.assertEqual(tracer_from_settings(None, "1")._output, STDERR)
+        self.assertEqual(
+            tracer_from_settings(None, "x.json")._output, "x.json"
+        )
+        self.assertEqual(tracer_from_settings("a.txt", "1")._output, "a.txt")
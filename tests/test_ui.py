@@ -1,7 +1,15 @@
 from unittest import TestCase
 from unittest.mock import MagicMock, PropertyMock, patch
 
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from sbx.core.study import CardStack
 from sbx.ui.controls import MarkdownArea
+from sbx.ui.study import StudyInterface
+
+from .utility import BOX_PATH
 
 
 class UiTestCase(TestCase):
@@ -29,3 +37,17 @@ class UiTestCase(TestCase):
                 "call.paste_clipboard_data"
                 not in str(mock_document.mock_calls)
             )
+
+
+class StudyInterfaceTestCase(TestCase):
+    def test_streaming_session(self):
+        with create_pipe_input() as pipe_input:
+            with create_app_session(input=pipe_input, output=DummyOutput()):
+                stack = CardStack(BOX_PATH, True, True, use_index=False)
+                study = StudyInterface(stack, streaming=True)
+                self.assertTrue(
+                    study._get_label_text().endswith("1 due / scanning…")
+                )
+                # Run the background scan in current thread
+                study._scan_rest(study._pending)
+                self.assertTrue(study._get_label_text().endswith("9 due"))
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from sbx.core.study import CardStack
+from sbx.core.walk import PathFilter, read_ignore_file, walk_cards
+
+from .utility import BOX_PATH, ChangeDir, TempBox
+
+
+class TestWalk(TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.root = self._temp.name
+        for name in [
+            "a.md",
+            "b.txt",
+            "notes/c.md",
+            "notes/draft/d.md",
+            ".git/e.md",
+            "node_modules/pkg/f.md",
+            "build/g.md",
+        ]:
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as h:
+                h.write("x\n")
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _walk(self, recursive=True, exclude=None, include=None):
+        files = walk_cards(self.root, recursive, PathFilter(exclude, include))
+        return sorted(os.path.relpath(x, self.root) for x in files)
+
+    def test_non_recursive(self):
+        self.assertEqual(self._walk(recursive=False), ["a.md"])
+
+    def test_exclude_directory_names(self):
+        self.assertEqual(
+            self._walk(exclude=[".git", "node_modules", "build"]),
+            ["a.md", "notes/c.md", "notes/draft/d.md"],
+        )
+
+    def test_exclude_relative_path(self):
+        self.assertEqual(
+            self._walk(exclude=["notes/draft", "*/pkg", ".*", "build/"]),
+            ["a.md", "notes/c.md"],
+        )
+
+    def test_include(self):
+        self.assertEqual(
+            self._walk(exclude=[".git"], include=["notes/*", "g.md"]),
+            ["build/g.md", "notes/c.md", "notes/draft/d.md"],
+        )
+
+    def test_ignore_file(self):
+        with open(os.path.join(self.root, ".sbxignore"), "w") as h:
+            h.write("# comment\n\nbuild\nnotes/draft/\n")
+        self.assertEqual(
+            read_ignore_file(os.path.join(self.root, ".sbxignore")),
+            ["build", "notes/draft/"],
+        )
+
+    def test_paths_relative_to_current_directory(self):
+        with ChangeDir(BOX_PATH):
+            files = list(walk_cards(".", True))
+        self.assertIn("test-card.md", files)
+        self.assertIn(os.path.join("python", "leech-python-card.md"), files)
+
+
+class TestCardStackPatterns(TestCase):
+    def test_exclude_and_ignore_file(self):
+        with TempBox() as box:
+            stack = CardStack(box, True, True, exclude=["python"])
+            self.assertEqual(len(list(stack.iter())), 8)
+            with open(os.path.join(box, ".sbxignore"), "w") as h:
+                h.write("c\n*-leech*\n")
+            stack = CardStack(box, True, True, exclude=["python"])
+            self.assertEqual(len(list(stack.iter())), 5)
+
+    def test_include(self):
+        stack = CardStack(
+            BOX_PATH, True, True, use_index=False, include=["*zero*"]
+        )
+        self.assertEqual(len(list(stack.iter())), 3)
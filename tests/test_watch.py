@@ -0,0 +1,88 @@
+import os
+import shutil
+import unittest
+from unittest import TestCase
+
+from sbx.core.card import Card
+from sbx.core.daemon import DeckServer
+from sbx.core.index import HeaderIndex
+from sbx.core.study import CardStack
+from sbx.core.watch import is_supported
+
+from .utility import TempBox
+
+
+@unittest.skipUnless(is_supported(), "needs Linux inotify")
+class TestDeckWatcher(TestCase):
+    def setUp(self):
+        self._box = TempBox()
+        self.box = self._box.__enter__()
+        self.stack = CardStack(self.box, True, True)
+        self.watcher = self.stack.watch()
+
+    def tearDown(self):
+        self.watcher.close()
+        self._box.__exit__(None, None, None)
+
+    def _path(self, *parts):
+        return os.path.join(self.box, *parts)
+
+    def test_changes(self):
+        card = Card(self._path("test-card.md"))
+        card.mark(4)
+        card.save()
+        open(self._path("notes.txt"), "w").close()
+        changes = self.watcher.poll(1)
+        self.assertEqual(changes.paths, {card.path})
+        self.assertFalse(changes.overflow)
+
+        os.makedirs(self._path("added"))
+        self.watcher.poll(1)
+        shutil.copy(card.path, self._path("added", "copy.md"))
+        changes = self.watcher.poll(1)
+        self.assertEqual(changes.paths, {self._path("added", "copy.md")})
+
+        shutil.move(self._path("python"), self._path("moved"))
+        changes = self.watcher.poll(1)
+        self.assertEqual(changes.directories, {self._path("python")})
+        self.assertEqual(
+            changes.paths, {self._path("moved", "leech-python-card.md")}
+        )
+        self.assertFalse(self.watcher.poll(0))
+
+    def test_refresh_updates_index(self):
+        list(self.stack.iter())
+        path = self._path("test-card-ok.md")
+        card = Card(path)
+        card.mark(0)
+        card.save()
+        os.remove(self._path("test-card.md"))
+        changes = self.watcher.poll(1)
+        cards = list(self.stack.refresh(changes.paths))
+        self.assertEqual([x.path for x in cards], [path])
+        index = HeaderIndex(self.box)
+        self.assertEqual(len(index), 8)
+        self.assertEqual(
+            index.lookup(path, os.stat(path))[1]["pastq"][-1], "0"
+        )
+
+    def test_server_applies_changes(self):
+        server = DeckServer(self.box)
+        server.load()
+        os.remove(self._path("test-card.md"))
+        shutil.rmtree(self._path("python"))
+        shutil.copy(self._path("c", "test-c-card-zero.md"), self._path("x.md"))
+        server.apply(self.watcher.poll(1))
+        response = server.handle(
+            {
+                "id": 1,
+                "method": "list",
+                "params": {"include_unscheduled": True},
+            }
+        )
+        expected = CardStack(self.box, True, True, use_index=False)
+        self.assertCountEqual(
+            [self._path(x) for x, _ in response["result"]],
+            [x.path for x in expected.iter()],
+        )
+        self.assertEqual(len(server), 8)
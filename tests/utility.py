@@ -1,6 +1,13 @@
 import os
+import random
+import shutil
 import sys
+import tempfile
 from io import StringIO
+from unittest.mock import patch
+
+from sbx.core.card import ALGO_SM2, CardMeta, get_algorithm
+from sbx.core.utility import DAY_IN_SECONDS, unix_time
 
 BOX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "box")
 
@@ -23,10 +30,42 @@ class Capturing(list):
 class ChangeDir:
     def __init__(self, path):
         self._path = path
-        self._prev_path = os.curdir
+        self._prev_path = os.getcwd()
 
     def __enter__(self):
+        self._prev_path = os.getcwd()
         os.chdir(self._path)
 
     def __exit__(self, *args):
         os.chdir(self._prev_path)
+
+
+class TempBox:
+    """Copy of the test box in a temporary directory"""
+
+    def __enter__(self):
+        self._temp = tempfile.TemporaryDirectory()
+        path = os.path.join(self._temp.name, "box")
+        shutil.copytree(BOX_PATH, path)
+        return path
+
+    def __exit__(self, *args):
+        self._temp.cleanup()
+
+
+def random_metas(count, algos=(ALGO_SM2,), seed=42):
+    """Card meta data marked randomly, algorithms of `algos` take turns"""
+    rnd = random.Random(seed)
+    now = unix_time()
+    metas = []
+    for number in range(count):
+        meta = CardMeta()
+        meta.algo = algos[number % len(algos)]
+        algorithm = get_algorithm(meta.algo)
+        time = now - rnd.randint(0, 120) * DAY_IN_SECONDS
+        for _ in range(rnd.randint(0, 25)):
+            with patch("sbx.core.card.unix_time", return_value=time):
+                algorithm.mark(meta, rnd.randint(0, 5))
+            time += rnd.randint(0, 20) * DAY_IN_SECONDS
+        metas.append(meta)
+    return metas